@@ -0,0 +1,154 @@
+"""
+Background Cache for ISKCON-Broadcast
+
+This module keeps the decoded background image in memory. The file is
+decoded once and again only when its modification time changes, and a
+pristine copy is kept so the canvas can be reset with a single copy (or
+only the regions no tile covers) at every mode switch instead of
+re-reading the PNG from disk. For a YUV canvas the copy is converted to
+the canvas pixel format once, at decode time.
+"""
+
+import logging
+import os
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from pixel_format import PIXEL_FORMAT_BGR, Region, check_pixel_format, copy_region, from_bgr
+
+logger = logging.getLogger(__name__)
+
+
+def uncovered_regions(canvas_size: Tuple[int, int], rects: Sequence[Tuple[int, int, int, int]]) -> List[Region]:
+    """
+    Split the part of a canvas not covered by rectangles into regions
+
+    Args:
+        canvas_size: (width, height) of the canvas
+        rects: Covered rectangles as (x, y, width, height)
+
+    Returns:
+        Non-overlapping (rows, cols) slices covering everything else
+    """
+    width, height = canvas_size
+    boxes = [(max(0, x), max(0, y), min(width, x + w), min(height, y + h)) for x, y, w, h in rects]
+    boxes = [box for box in boxes if box[0] < box[2] and box[1] < box[3]]
+    xs = sorted({0, width} | {x for box in boxes for x in (box[0], box[2])})
+    ys = sorted({0, height} | {y for box in boxes for y in (box[1], box[3])})
+
+    regions = []
+    previous_spans, previous_region_start = None, 0
+    for top, bottom in zip(ys, ys[1:]):
+        # Uncovered column spans of this band, adjacent cells merged
+        spans = []
+        for left, right in zip(xs, xs[1:]):
+            covered = any(x0 <= left and right <= x1 and y0 <= top and bottom <= y1
+                          for x0, y0, x1, y1 in boxes)
+            if covered:
+                continue
+            if spans and spans[-1][1] == left:
+                spans[-1] = (spans[-1][0], right)
+            else:
+                spans.append((left, right))
+
+        # Extend the previous band's regions when the spans line up
+        if spans == previous_spans:
+            for i in range(len(spans)):
+                rows, cols = regions[previous_region_start + i]
+                regions[previous_region_start + i] = (slice(rows.start, bottom), cols)
+            continue
+        previous_spans, previous_region_start = spans, len(regions)
+        regions.extend((slice(top, bottom), slice(left, right)) for left, right in spans)
+    return regions
+
+
+class BackgroundCache:
+    """
+    Decoded background image, reloaded only when the file changes
+
+    ``image`` is read-only and must never be drawn on; draw on a canvas
+    obtained from ``new_canvas()`` and reset it with ``reset()``.
+    """
+
+    def __init__(self, path: str, pixel_format: str = PIXEL_FORMAT_BGR):
+        """
+        Args:
+            path: Background image file
+            pixel_format: Pixel format of the canvases it resets (YUV
+                formats need an even-sized image)
+
+        Raises:
+            FileNotFoundError: If the image cannot be read
+            ValueError: If the pixel format is unknown
+        """
+        self.path = path
+        self.pixel_format = check_pixel_format(pixel_format)
+        self.size: Optional[Tuple[int, int]] = None
+        self._image: Optional[np.ndarray] = None
+        self._mtime = None
+        self.decodes = 0
+        self._refresh()
+        if self._image is None:
+            raise FileNotFoundError(f"Cannot read background image {path}")
+
+    def _refresh(self) -> None:
+        """Re-decode the image if the file changed since the last decode"""
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError as e:
+            if self._image is not None:
+                logger.warning(f"Background image {self.path} unavailable, keeping cached copy: {e}")
+            return
+        if mtime == self._mtime:
+            return
+
+        image = cv2.imread(self.path)
+        if image is None:
+            logger.error(f"Cannot decode background image {self.path}")
+            return
+        size = (image.shape[1], image.shape[0])
+        if self._image is not None and size != self.size:
+            logger.error(f"Background image {self.path} changed size {self.size} -> {size}, "
+                         f"keeping cached copy")
+            self._mtime = mtime
+            return
+        image = from_bgr(image, self.pixel_format)
+        image.flags.writeable = False
+        self._image = image
+        self.size = size
+        self._mtime = mtime
+        self.decodes += 1
+        logger.info(f"Loaded background image {self.path}")
+
+    @property
+    def image(self) -> np.ndarray:
+        """Pristine background image in the canvas pixel format (read-only)"""
+        return self._image
+
+    def new_canvas(self) -> np.ndarray:
+        """Get a writable copy of the background to draw on"""
+        return self._image.copy()
+
+    def reset(self, canvas: np.ndarray, regions: Optional[Sequence[Region]] = None) -> np.ndarray:
+        """
+        Restore the background on a canvas
+
+        Checks the file's modification time first, so an edited background
+        shows up at the next mode switch.
+
+        Args:
+            canvas: Canvas of the background's shape
+            regions: Regions to restore, or None for the whole canvas
+
+        Returns:
+            The canvas
+        """
+        self._refresh()
+        if regions is None:
+            np.copyto(canvas, self._image)
+        else:
+            for region in regions:
+                copy_region(canvas, self._image, region, self.pixel_format)
+        return canvas
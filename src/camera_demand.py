@@ -0,0 +1,134 @@
+"""
+Camera Demand Tracking for ISKCON-Broadcast
+
+This module works out which cameras a display mode actually shows and
+switches the remaining cameras to low-rate keepalive capture, so long
+full-screen segments do not pay for decoding streams nobody sees.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from camera_interface import CameraInterface
+from layout_plan import LayoutPlan
+
+logger = logging.getLogger(__name__)
+
+# Seconds before a mode starts that its cameras resume full-rate decoding.
+# Roughly one GOP at the cameras' default keyframe interval, so the decoder
+# has a keyframe in hand when the tile first appears.
+DEFAULT_PREROLL_SECONDS = 2.0
+
+
+def get_mode_camera_ids(layout: Optional[LayoutPlan]) -> Set[int]:
+    """
+    Get the camera indices a display mode shows
+
+    Args:
+        layout: The mode's compiled layout (None for an unknown mode)
+
+    Returns:
+        Set of indices into the cameras list
+    """
+    return set(layout.camera_ids) if layout is not None else set()
+
+
+class CameraDemand:
+    """
+    Publishes which cameras the compositor needs and toggles the rest
+
+    The compositor calls ``apply()`` when a mode starts and ``prepare()``
+    shortly before the next one, so cameras needed next are already decoding
+    when their tile appears. Both optionally pass the frame size each camera
+    is drawn at, so plugins can decode near tile size.
+
+    Cameras on an always-on monitor (the operator multiview) never drop to
+    keepalive, and are never sized below the monitor's cell.
+    """
+
+    def __init__(self, cameras: List[CameraInterface], preroll: float = DEFAULT_PREROLL_SECONDS,
+                 monitor_sizes: Optional[Dict[int, Tuple[int, int]]] = None):
+        """
+        Args:
+            cameras: Camera list indexed the same way as mode settings
+            preroll: Seconds before a mode switch to resume upcoming cameras
+            monitor_sizes: (width, height) a monitor draws each camera at,
+                for cameras that must stay live whatever the mode shows
+        """
+        self.cameras = cameras
+        self.preroll = preroll
+        self.monitor_sizes = dict(monitor_sizes or {})
+        self._active_ids = set(range(len(cameras)))
+        self._target_sizes: Dict[int, Tuple[int, int]] = {}
+
+    @property
+    def active_ids(self) -> Set[int]:
+        """Indices of cameras currently capturing at full rate"""
+        return set(self._active_ids)
+
+    def apply(self, needed_ids: Iterable[int],
+              target_sizes: Optional[Dict[int, Tuple[int, int]]] = None) -> None:
+        """
+        Run exactly the needed cameras at full rate
+
+        Args:
+            needed_ids: Camera indices shown by the current mode
+            target_sizes: (width, height) each needed camera is drawn at
+        """
+        self._set_active(set(needed_ids) | set(self.monitor_sizes))
+        if target_sizes is not None or self.monitor_sizes:
+            self._set_target_sizes(_cover(dict(target_sizes or {}), self.monitor_sizes))
+
+    def prepare(self, upcoming_ids: Iterable[int],
+                target_sizes: Optional[Dict[int, Tuple[int, int]]] = None) -> None:
+        """
+        Resume cameras needed by the next mode without pausing current ones
+
+        Cameras in both modes get a size covering both, so they are not
+        shrunk while still on screen.
+
+        Args:
+            upcoming_ids: Camera indices shown by the next mode
+            target_sizes: (width, height) each upcoming camera is drawn at
+        """
+        current_ids = set(self._active_ids)
+        self._set_active(current_ids | set(upcoming_ids))
+        if target_sizes is not None:
+            sizes = {i: size for i, size in self._target_sizes.items() if i in current_ids}
+            self._set_target_sizes(_cover(sizes, target_sizes))
+
+    def activate_all(self) -> None:
+        """Return every camera to full-rate capture"""
+        self._set_active(set(range(len(self.cameras))))
+
+    @property
+    def target_sizes(self) -> Dict[int, Tuple[int, int]]:
+        """Frame size hint last given to each camera"""
+        return dict(self._target_sizes)
+
+    def _set_target_sizes(self, sizes: Dict[int, Tuple[int, int]]) -> None:
+        for index, size in sizes.items():
+            if 0 <= index < len(self.cameras) and self._target_sizes.get(index) != size:
+                self.cameras[index].set_target_size(size)
+        self._target_sizes.update(sizes)
+
+    def _set_active(self, ids: Set[int]) -> None:
+        ids = {i for i in ids if 0 <= i < len(self.cameras)}
+        for index, camera in enumerate(self.cameras):
+            camera.set_active(index in ids)
+            if index in ids and index not in self._active_ids:
+                # Resumed from keepalive: drop what its source buffered
+                camera.flush()
+        if ids != self._active_ids:
+            logger.info(f"Active cameras: {sorted(ids)}")
+        self._active_ids = ids
+
+
+def _cover(sizes: Dict[int, Tuple[int, int]],
+           extra: Dict[int, Tuple[int, int]]) -> Dict[int, Tuple[int, int]]:
+    """Merge extra sizes into sizes, keeping the larger width and height of each camera"""
+    for index, (width, height) in extra.items():
+        if index in sizes:
+            width, height = max(width, sizes[index][0]), max(height, sizes[index][1])
+        sizes[index] = (width, height)
+    return sizes
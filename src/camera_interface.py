@@ -7,16 +7,58 @@ ONVIF cameras, USB cameras, etc.).
 """
 
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 import numpy as np
+import asyncio
 import logging
+import threading
+
+from frame_buffer import TripleBuffer
 
 logger = logging.getLogger(__name__)
 
+# Seconds between keepalive reads while a camera is not used by the layout
+DEFAULT_KEEPALIVE_INTERVAL = 1.0
+
+# Integer factors a decoder may divide the native frame size by; a small set
+# keeps layout changes from restarting the decoder for every tile size
+DOWNSCALE_FACTORS = (1, 2, 3, 4)
+
+
+def downscaled_size(native_size: Tuple[int, int],
+                    target_size: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+    """
+    Get the smallest downscaled frame size that still covers a target size
+
+    Args:
+        native_size: (width, height) the source is decoded at
+        target_size: (width, height) the layout draws the camera at, or None
+
+    Returns:
+        (width, height) of native_size divided by the largest factor in
+        DOWNSCALE_FACTORS that keeps both sides at least the target's
+        (rounded down to even sizes for chroma-subsampled decoders)
+    """
+    width, height = native_size
+    if not target_size:
+        return native_size
+    target_width, target_height = target_size
+    for factor in sorted(DOWNSCALE_FACTORS, reverse=True):
+        if factor == 1:
+            break
+        scaled = (width // factor) & ~1, (height // factor) & ~1
+        if scaled[0] >= target_width and scaled[1] >= target_height:
+            return scaled
+    return native_size
+
 
 class CameraInterface(ABC):
     """Abstract base class for all camera implementations"""
     
+    # Pixel format of the frames get_frame() returns (see pixel_format.py);
+    # plugins that deliver the decoder's native YUV 4:2:0 override it
+    pixel_format = 'bgr'
+    
     def __init__(self, camera_id: int, config: Dict[str, Any]):
         """
         Initialize camera with ID and configuration
@@ -29,6 +71,11 @@ class CameraInterface(ABC):
         self.config = config
         self.running = False
         self.frame = None
+        self.frame_buffer = TripleBuffer()
+        self.keepalive_interval = config.get('keepalive_interval', DEFAULT_KEEPALIVE_INTERVAL)
+        self._active = threading.Event()
+        self._active.set()
+        self._target_size: Optional[Tuple[int, int]] = None
         
     @abstractmethod
     def get_frame(self) -> Optional[np.ndarray]:
@@ -55,6 +102,40 @@ class CameraInterface(ABC):
         """
         pass
     
+    async def send_ptz_command_async(self, command: str, parameter: str, id: int = 0) -> bool:
+        """
+        Send PTZ command without blocking the event loop
+        
+        The default runs send_ptz_command() in a worker thread; plugins with
+        a native asynchronous transport should override this.
+        
+        Args:
+            command: Command type (e.g., "PtzCtrl")
+            parameter: Command parameter (e.g., "Left", "Right", "ZoomInc", "ToPos")
+            id: Additional identifier for command (e.g., preset position)
+            
+        Returns:
+            True if command was sent successfully, False otherwise
+        """
+        return await asyncio.to_thread(self.send_ptz_command, command, parameter, id)
+    
+    async def send_ptz_commands_async(self, commands: List[Tuple[str, str, int]]) -> List[bool]:
+        """
+        Send several PTZ commands back to back
+        
+        Plugins whose transport can coalesce or batch commands (e.g. a Stop
+        immediately followed by a new direction) should override this; the
+        default sends them one at a time, in order.
+        
+        Args:
+            commands: (command, parameter, id) tuples in send order
+            
+        Returns:
+            Success flag per command
+        """
+        return [await self.send_ptz_command_async(command, parameter, id)
+                for command, parameter, id in commands]
+    
     @abstractmethod
     def capture_frames(self) -> None:
         """
@@ -80,6 +161,86 @@ class CameraInterface(ABC):
         """
         pass
     
+    @property
+    def frame_sequence(self) -> int:
+        """
+        Sequence number of the newest published frame
+        
+        Increases by one for every frame the capture thread publishes, so
+        consumers can skip work when it has not advanced since their last read.
+        """
+        return self.frame_buffer.sequence
+    
+    @property
+    def frame_timestamp(self) -> float:
+        """Capture time of the frame last returned by get_frame()"""
+        return self.frame_buffer.read_timestamp
+    
+    @property
+    def active(self) -> bool:
+        """Whether the current layout needs full-rate frames from this camera"""
+        return self._active.is_set()
+    
+    def set_active(self, active: bool) -> None:
+        """
+        Switch between full-rate capture and low-rate keepalive
+        
+        Capture loops should stop decoding while inactive and only touch the
+        source every keepalive_interval seconds to keep the connection alive.
+        
+        Args:
+            active: True if a layout tile shows this camera (or will shortly)
+        """
+        if active == self.active:
+            return
+        if active:
+            self._active.set()
+        else:
+            self._active.clear()
+        logger.info(f"Camera {self.camera_id} {'resumed full-rate capture' if active else 'switched to keepalive'}")
+    
+    def flush(self) -> None:
+        """
+        Drop input buffered while the camera was in keepalive
+        
+        Called when a camera resumes (normally during the preroll before its
+        layout appears). Plugins whose source queues frames while they are
+        only touched every keepalive_interval should override this so the
+        first frames after resuming are current; the default does nothing.
+        """
+        pass
+    
+    @property
+    def target_size(self) -> Optional[Tuple[int, int]]:
+        """(width, height) the current layout draws this camera at, if known"""
+        return self._target_size
+    
+    def set_target_size(self, size: Optional[Tuple[int, int]]) -> None:
+        """
+        Hint the size the layout draws this camera's frames at
+        
+        Plugins that can deliver smaller frames cheaply (a sub-stream, or
+        scaling inside the decoder) should override this and publish frames
+        near that size; the default only records the hint.
+        
+        Args:
+            size: (width, height) of the largest tile showing this camera,
+                or None for full resolution
+        """
+        self._target_size = tuple(size) if size else None
+    
+    def wait_for_activation(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block the capture thread while the camera is inactive
+        
+        Args:
+            timeout: Maximum seconds to wait (usually keepalive_interval)
+            
+        Returns:
+            True if the camera is active
+        """
+        return self._active.wait(timeout)
+    
     def get_camera_info(self) -> Dict[str, Any]:
         """
         Get camera information and status
@@ -92,6 +253,9 @@ class CameraInterface(ABC):
             'type': self.__class__.__name__,
             'running': self.running,
             'connected': self.is_connected(),
+            'active': self.active,
+            'target_size': self.target_size,
+            'frame_sequence': self.frame_sequence,
             'config': self.config
         }
     
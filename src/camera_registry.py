@@ -6,12 +6,18 @@ for creating camera instances. It supports automatic plugin discovery
 and registration through decorators.
 """
 
-from typing import Dict, Type, List
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Type, List, Optional
 import logging
 from camera_interface import CameraInterface
+from deferred_camera import DeferredCamera
+from process_camera import ProcessCamera, CAPTURE_BACKENDS
 
 logger = logging.getLogger(__name__)
 
+# Seconds create_cameras_from_config waits before starting slow cameras degraded
+DEFAULT_STARTUP_DEADLINE = 15.0
+
 
 class CameraRegistry:
     """Registry for camera plugin types"""
@@ -138,15 +144,24 @@ def register_camera(camera_type: str):
     return decorator
 
 
-def create_cameras_from_config(cameras_config: List[dict]) -> List[CameraInterface]:
+def create_cameras_from_config(cameras_config: List[dict],
+                               startup_deadline: Optional[float] = None) -> List[CameraInterface]:
     """
     Create multiple cameras from configuration
     
+    Cameras are constructed concurrently, so slow logins and stream opens
+    overlap instead of adding up. Cameras still initializing when the
+    startup deadline expires are returned as DeferredCamera placeholders
+    that become live in the background. Cameras configured with
+    ``capture_backend: process`` run in their own capture process and
+    publish frames through shared memory (see ProcessCamera).
+    
     Args:
         cameras_config: List of camera configuration dictionaries
+        startup_deadline: Seconds to wait for all cameras (None waits for all)
         
     Returns:
-        List of camera instances
+        List of camera instances, in configuration order
         
     Example:
         cameras_config = [
@@ -154,15 +169,37 @@ def create_cameras_from_config(cameras_config: List[dict]) -> List[CameraInterfa
             {"id": 1, "type": "mock", "source": "video", "video_path": "test.mp4"}
         ]
     """
-    cameras = []
+    if not cameras_config:
+        return []
+    
+    executor = ThreadPoolExecutor(max_workers=len(cameras_config), thread_name_prefix="CameraInit")
+    pending = []
     
     for i, cam_config in enumerate(cameras_config):
         camera_id = cam_config.get('id', i)
         camera_type = cam_config.get('type', 'ip_camera')  # Default to existing type
-        
+        backend = cam_config.get('capture_backend', 'thread')
+        if backend not in CAPTURE_BACKENDS:
+            logger.error(f"Unknown capture backend '{backend}' for camera {camera_id}, using 'thread'")
+            backend = 'thread'
+        if backend == 'process':
+            future = executor.submit(ProcessCamera, camera_type, camera_id, cam_config)
+        else:
+            future = executor.submit(CameraRegistry.create_camera, camera_type, camera_id, cam_config)
+        pending.append((camera_id, cam_config, future))
+    
+    wait([future for _, _, future in pending], timeout=startup_deadline)
+    # Let late cameras finish in the background
+    executor.shutdown(wait=False)
+    
+    cameras = []
+    for camera_id, cam_config, future in pending:
+        if not future.done():
+            logger.warning(f"Camera {camera_id} missed the {startup_deadline}s startup deadline, starting degraded")
+            cameras.append(DeferredCamera(camera_id, cam_config, future))
+            continue
         try:
-            camera = CameraRegistry.create_camera(camera_type, camera_id, cam_config)
-            cameras.append(camera)
+            cameras.append(future.result())
         except Exception as e:
             logger.error(f"Failed to create camera {camera_id}: {e}")
             # Continue with other cameras rather than failing completely
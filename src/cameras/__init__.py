@@ -8,7 +8,8 @@ using the @register_camera decorator.
 
 # Import all camera implementations to trigger registration
 import cameras.ip_camera
+import cameras.ffmpeg_camera
 import cameras.mock_camera
 
 # Make camera types available at package level
-__all__ = ['ip_camera', 'mock_camera'] 
\ No newline at end of file
+__all__ = ['ip_camera', 'ffmpeg_camera', 'mock_camera'] 
\ No newline at end of file
@@ -0,0 +1,483 @@
+"""
+FFmpeg Camera Plugin for ISKCON-Broadcast
+
+This module decodes a camera stream in an ``ffmpeg`` subprocess instead of
+``cv2.VideoCapture``, whose internal buffering (and therefore latency) we
+cannot control. ffmpeg runs with low-latency input flags, optionally
+scales to the size the layout needs, and writes raw BGR frames to its
+stdout, which the capture thread reads straight into the preallocated
+frame buffers. Any source ffmpeg understands works, so a local video file
+stands in for the RTSP camera offline.
+"""
+
+import logging
+import random
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+
+from camera_interface import CameraInterface, downscaled_size
+from pixel_format import FFMPEG_PIXEL_FORMATS, PIXEL_FORMAT_BGR, YUV_FORMATS, check_pixel_format, frame_shape
+from camera_registry import register_camera
+from ptz_auth import TokenManager, DEFAULT_REFRESH_MARGIN
+from ptz_client import AsyncPTZClient, DEFAULT_PTZ_MAX_BATCH
+
+logger = logging.getLogger(__name__)
+
+# Executables used unless the camera config names others
+DEFAULT_FFMPEG_PATH = 'ffmpeg'
+DEFAULT_FFPROBE_PATH = 'ffprobe'
+
+# Seconds ffprobe may take to report the stream size
+PROBE_TIMEOUT = 15.0
+
+# Restart backoff bounds in seconds (overridable per camera in config)
+RESTART_INITIAL_DELAY = 0.5
+RESTART_MAX_DELAY = 30.0
+
+# Seconds stop() waits for ffmpeg to exit before killing it
+STOP_TIMEOUT = 5.0
+
+
+def is_network_source(source: str) -> bool:
+    """Check whether a source is a network stream rather than a local file"""
+    return '://' in source and not source.startswith('file://')
+
+
+def probe_frame_size(source: str, ffprobe_path: str = DEFAULT_FFPROBE_PATH) -> Tuple[int, int]:
+    """
+    Get the size of a source's first video stream with ffprobe
+
+    Args:
+        source: Stream URL or file path
+        ffprobe_path: ffprobe executable
+
+    Returns:
+        (width, height)
+
+    Raises:
+        ValueError: If ffprobe is unavailable or reports no video stream
+    """
+    command = [ffprobe_path, '-v', 'error']
+    if source.startswith('rtsp://'):
+        command += ['-rtsp_transport', 'tcp']
+    command += ['-select_streams', 'v:0', '-show_entries', 'stream=width,height',
+                '-of', 'csv=p=0:s=x', source]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, timeout=PROBE_TIMEOUT, check=True).stdout
+        width, height = output.strip().splitlines()[0].split('x')[:2]
+        return int(width), int(height)
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError) as e:
+        raise ValueError(f"Cannot probe frame size of {source}: {e}")
+
+
+def build_ffmpeg_command(source: str, size: Optional[Tuple[int, int]] = None,
+                         ffmpeg_path: str = DEFAULT_FFMPEG_PATH, realtime: bool = False,
+                         loop: bool = False, threads: Optional[int] = None,
+                         pixel_format: str = PIXEL_FORMAT_BGR) -> List[str]:
+    """
+    Build the ffmpeg command line decoding a source to raw frames on stdout
+
+    Args:
+        source: Stream URL or file path
+        size: (width, height) to scale to in the decoder, or None for native
+        ffmpeg_path: ffmpeg executable
+        realtime: Read the input at its native frame rate (-re), for files
+        loop: Loop the input forever (files only)
+        threads: Decoder thread count, or None for ffmpeg's default
+        pixel_format: Output pixel format (see pixel_format.PIXEL_FORMATS)
+
+    Returns:
+        Argument list for subprocess
+    """
+    command = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-nostdin',
+               '-fflags', 'nobuffer', '-flags', 'low_delay']
+    if source.startswith('rtsp://'):
+        command += ['-rtsp_transport', 'tcp']
+    if threads:
+        command += ['-threads', str(threads)]
+    if realtime:
+        command += ['-re']
+    if loop:
+        command += ['-stream_loop', '-1']
+    command += ['-i', source, '-an']
+    if size is not None:
+        command += ['-vf', f'scale={size[0]}:{size[1]}']
+    command += ['-f', 'rawvideo', '-pix_fmt', FFMPEG_PIXEL_FORMATS[pixel_format], 'pipe:1']
+    return command
+
+
+@register_camera("ffmpeg")
+class FFmpegCamera(CameraInterface):
+    """
+    Camera decoded by an ffmpeg subprocess piping raw frames
+
+    Inactive cameras keep draining the pipe (so ffmpeg never stalls and
+    the stream stays current) but frames are not published. PTZ commands
+    use the same HTTPS API as IPCamera when an ``https`` section is given.
+    """
+
+    def __init__(self, camera_id: int, config: Dict[str, Any]):
+        """
+        Initialize FFmpeg camera
+
+        Args:
+            camera_id: Unique identifier for this camera
+            config: Configuration dictionary containing:
+                - source: Stream URL or video file (default: rtsp_url)
+                - width, height: Output frame size; ffmpeg scales to it.
+                  Probed with ffprobe when omitted
+                - realtime: Read at native frame rate (default True for
+                  local files, False for network streams)
+                - loop: Loop a local file (default True for files)
+                - threads: ffmpeg decoder threads (default: ffmpeg's choice)
+                - decoder_downscale: Scale to the layout's target size hint
+                  in the decoder (default True)
+                - pixel_format: 'bgr' (default), or 'i420'/'nv12' to deliver
+                  the decoder's YUV 4:2:0 for a YUV compositor canvas
+                - ffmpeg_path, ffprobe_path: Executables (default on PATH)
+                - https: Optional dictionary with ip, username, password
+                  enabling PTZ control
+                - restart_initial_delay: First restart backoff in seconds
+                  (default 0.5)
+                - restart_max_delay: Backoff ceiling in seconds (default 30)
+
+        Raises:
+            ValueError: If no source is configured, its size is unknown or
+                the pixel format is not supported
+        """
+        super().__init__(camera_id, config)
+
+        self.source = config.get('source') or config.get('rtsp_url', '')
+        if not self.source:
+            raise ValueError(f"FFmpeg camera {camera_id} needs a source or rtsp_url")
+        self.ffmpeg_path = config.get('ffmpeg_path', DEFAULT_FFMPEG_PATH)
+        local = not is_network_source(self.source)
+        self.realtime = config.get('realtime', local)
+        self.loop = config.get('loop', local)
+        self.threads = config.get('threads')
+        self.pixel_format = check_pixel_format(config.get('pixel_format', PIXEL_FORMAT_BGR))
+
+        if config.get('width') and config.get('height'):
+            self.width, self.height = int(config['width']), int(config['height'])
+            self._scale = True
+        else:
+            self.width, self.height = probe_frame_size(self.source, config.get('ffprobe_path', DEFAULT_FFPROBE_PATH))
+            self._scale = False
+        self.decoder_downscale = config.get('decoder_downscale', True)
+        self._frame_size = (self.width, self.height)
+        if self.pixel_format in YUV_FORMATS and (self.width % 2 or self.height % 2):
+            raise ValueError(f"FFmpeg camera {camera_id} needs an even frame size for {self.pixel_format}, "
+                             f"got {self.width}x{self.height}")
+        self.frame_buffer.preallocate(frame_shape(self.width, self.height, self.pixel_format))
+
+        # Optional PTZ control over the camera's HTTPS API
+        https_config = config.get('https')
+        self.token_manager = None
+        self.ptz_client = None
+        if https_config:
+            ip = https_config.get('ip', '')
+            self.token_manager = TokenManager(
+                base_url=f"https://{ip}/api.cgi",
+                username=https_config.get('username', ''),
+                password=https_config.get('password', ''),
+                camera_id=camera_id,
+                refresh_margin=config.get('token_refresh_margin', DEFAULT_REFRESH_MARGIN)
+            )
+            self.ptz_client = AsyncPTZClient(
+                base_url=f"https://{ip}/api.cgi",
+                token_getter=self.token_manager.get_token,
+                camera_id=camera_id,
+                max_concurrency=config.get('ptz_concurrency', 1),
+                max_batch=config.get('ptz_max_batch', DEFAULT_PTZ_MAX_BATCH),
+                token_refresher=self.token_manager.renew
+            )
+
+        self.restart_initial_delay = config.get('restart_initial_delay', RESTART_INITIAL_DELAY)
+        self.restart_max_delay = config.get('restart_max_delay', RESTART_MAX_DELAY)
+        self._process: Optional[subprocess.Popen] = None
+        self._capture_thread = None
+        self._stop_requested = threading.Event()
+        self._stream_ok = False
+        self._frames_read = 0
+        self._frames_skipped = 0
+        self._restarts = 0
+        self._resizes = 0
+        logger.info(f"Created FFmpeg camera {camera_id} for {self.source} at {self.width}x{self.height}")
+
+    @property
+    def frame_size(self) -> Tuple[int, int]:
+        """(width, height) of the frames the decoder is asked for"""
+        return self._frame_size
+
+    @property
+    def command(self) -> List[str]:
+        """ffmpeg command line for the current frame size"""
+        return self._command(self._frame_size)
+
+    def _command(self, size: Tuple[int, int]) -> List[str]:
+        scale = self._scale or size != (self.width, self.height)
+        return build_ffmpeg_command(self.source, size if scale else None, self.ffmpeg_path,
+                                    self.realtime, self.loop, self.threads, self.pixel_format)
+
+    def set_target_size(self, size: Optional[Tuple[int, int]]) -> None:
+        """
+        Scale frames in the decoder to just cover the layout's tile size
+
+        A running camera switches over to a second decoder at the new size
+        once that one delivers its first frame, so the tile never freezes.
+        """
+        super().set_target_size(size)
+        if not self.decoder_downscale:
+            return
+        frame_size = downscaled_size((self.width, self.height), self.target_size)
+        if frame_size != self._frame_size:
+            logger.info(f"FFmpeg camera {self.camera_id} decoding at {frame_size[0]}x{frame_size[1]} "
+                        f"for {self.target_size or 'full size'}")
+            self._frame_size = frame_size
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """
+        Get current frame from camera
+
+        Returns:
+            Newest complete frame (no copy) or None if no frame available
+        """
+        frame, _, _ = self.frame_buffer.latest()
+        return frame
+
+    def send_ptz_command(self, command: str, parameter: str, id: int = 0) -> bool:
+        """Send PTZ command over the HTTPS API (False if none is configured)"""
+        if self.ptz_client is None:
+            logger.warning(f"FFmpeg camera {self.camera_id} has no PTZ control, dropping {command} {parameter}")
+            return False
+        return self.ptz_client.send_sync(command, parameter, id)
+
+    async def send_ptz_command_async(self, command: str, parameter: str, id: int = 0) -> bool:
+        """Send PTZ command over the pooled transport without blocking the loop"""
+        if self.ptz_client is None:
+            return self.send_ptz_command(command, parameter, id)
+        return await self.ptz_client.send(command, parameter, id)
+
+    async def send_ptz_commands_async(self, commands: List[Tuple[str, str, int]]) -> List[bool]:
+        """Send several PTZ commands as one coalesced, batched request"""
+        if self.ptz_client is None:
+            return await super().send_ptz_commands_async(commands)
+        return await self.ptz_client.send_many(commands)
+
+    def capture_frames(self) -> None:
+        """Start ffmpeg and the thread reading its frames"""
+        if self.running:
+            logger.warning(f"Camera {self.camera_id} is already capturing frames")
+            return
+
+        self.running = True
+        if self.token_manager:
+            self.token_manager.start()
+        self._stop_requested.clear()
+        self._capture_thread = threading.Thread(
+            target=self._capture_loop,
+            name=f"FFmpegCamera-{self.camera_id}-Capture"
+        )
+        self._capture_thread.daemon = True
+        self._capture_thread.start()
+        logger.info(f"Started frame capture for FFmpeg camera {self.camera_id}")
+
+    def _start_process(self, size: Tuple[int, int]) -> Optional[subprocess.Popen]:
+        """Launch ffmpeg at a frame size, or None if the executable cannot be started"""
+        try:
+            process = subprocess.Popen(self._command(size), stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                                       stderr=subprocess.PIPE, bufsize=0)
+        except OSError as e:
+            logger.error(f"Cannot start ffmpeg for camera {self.camera_id}: {e}")
+            return None
+        threading.Thread(target=self._log_stderr, args=(process,), daemon=True,
+                         name=f"FFmpegCamera-{self.camera_id}-Stderr").start()
+        return process
+
+    def _log_stderr(self, process: subprocess.Popen) -> None:
+        """Forward ffmpeg's error output to our log (keeps its pipe drained)"""
+        for line in process.stderr:
+            logger.warning(f"ffmpeg (camera {self.camera_id}): {line.decode(errors='replace').rstrip()}")
+
+    def _read_into(self, pipe, buffer: np.ndarray) -> bool:
+        """Fill a buffer from the pipe; False on end of stream"""
+        view = memoryview(buffer).cast('B')
+        filled = 0
+        while filled < len(view):
+            count = pipe.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+
+    def _capture_loop(self) -> None:
+        """Read raw frames from ffmpeg, restarting it when the stream ends"""
+        attempt = 0
+        while self.running:
+            size = self._frame_size
+            process = self._start_process(size)
+            if process is not None:
+                self._process = process
+                if self._read_frames(process, size):
+                    attempt = 0
+                self._stop_process(self._process)
+
+            self._stream_ok = False
+            if not self.running:
+                break
+            delay = self._backoff_delay(attempt)
+            attempt += 1
+            logger.warning(f"ffmpeg for camera {self.camera_id} ended, restarting in {delay:.1f}s")
+            if self._stop_requested.wait(delay):
+                break
+            self._restarts += 1
+
+    def _read_frames(self, process: subprocess.Popen, size: Tuple[int, int]) -> bool:
+        """
+        Read frames until the stream ends or the camera stops
+
+        When the wanted frame size changes, a standby decoder is started at
+        the new size and replaces this one after its first frame.
+
+        Returns:
+            True if any frame was read
+        """
+        scratch = None
+        standby = None
+        failed_size = None
+        got_frame = False
+        while self.running:
+            wanted = self._frame_size
+            if standby is None and wanted != size and wanted != failed_size:
+                standby = self._start_standby(wanted)
+            if standby is not None and standby.done.is_set():
+                if standby.frame is not None:
+                    self._stop_process(process)
+                    process, size = standby.process, standby.size
+                    self._process = process
+                    self._resizes += 1
+                    self.frame_buffer.publish(standby.frame, standby.timestamp)
+                else:
+                    logger.warning(f"Camera {self.camera_id} decoder at {standby.size} failed, keeping {size}")
+                    failed_size = standby.size
+                    self._stop_process(standby.process)
+                standby = None
+
+            active = self.active
+            shape = frame_shape(size[0], size[1], self.pixel_format)
+            if active:
+                buffer = self.frame_buffer.writable(shape)
+            else:
+                if scratch is None or scratch.shape != shape:
+                    scratch = np.empty(shape, dtype=np.uint8)
+                buffer = scratch
+            timestamp = time.time()
+            if not self._read_into(process.stdout, buffer):
+                break
+            self._stream_ok = True
+            got_frame = True
+            self._frames_read += 1
+            if active:
+                self.frame_buffer.publish(buffer, timestamp)
+            else:
+                self._frames_skipped += 1
+
+        if standby is not None:
+            self._stop_process(standby.process)
+        return got_frame
+
+    def _start_standby(self, size: Tuple[int, int]) -> Optional['_StandbyDecoder']:
+        """Start a decoder at a new size that reads its first frame in the background"""
+        process = self._start_process(size)
+        if process is None:
+            return None
+        standby = _StandbyDecoder(process, size, frame_shape(size[0], size[1], self.pixel_format))
+        threading.Thread(target=standby.read_first, args=(self._read_into,), daemon=True,
+                         name=f"FFmpegCamera-{self.camera_id}-Standby").start()
+        return standby
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Jittered exponential backoff delay for the given attempt (0-based)"""
+        delay = min(self.restart_max_delay, self.restart_initial_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+
+    def _stop_process(self, process: subprocess.Popen) -> None:
+        """Terminate ffmpeg and reap it"""
+        if process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(timeout=STOP_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        process.stdout.close()
+
+    def stop(self) -> None:
+        """Stop capture and the ffmpeg process"""
+        if self.token_manager:
+            self.token_manager.stop()
+        if not self.running:
+            return
+
+        self.running = False
+        self._stop_requested.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            # Unblocks the capture thread's read
+            process.terminate()
+
+        if self._capture_thread and self._capture_thread.is_alive():
+            self._capture_thread.join(timeout=STOP_TIMEOUT)
+            if self._capture_thread.is_alive():
+                logger.warning(f"Camera {self.camera_id} capture thread did not stop gracefully")
+
+        logger.info(f"Stopped FFmpeg camera {self.camera_id}")
+
+    def is_connected(self) -> bool:
+        """Check that ffmpeg is running and delivering frames"""
+        process = self._process
+        return self._stream_ok and process is not None and process.poll() is None
+
+    def get_camera_info(self) -> Dict[str, Any]:
+        """Get camera information including decoder details"""
+        info = super().get_camera_info()
+        info.update({
+            'source': self.source,
+            'native_size': (self.width, self.height),
+            'frame_size': self._frame_size,
+            'pixel_format': self.pixel_format,
+            'resizes': self._resizes,
+            'command': self.command,
+            'pid': self._process.pid if self._process else None,
+            'frames_read': self._frames_read,
+            'frames_skipped': self._frames_skipped,
+            'restarts': self._restarts,
+            'stream_connected': self._stream_ok,
+            'frame_pool': self.frame_buffer.get_stats(),
+        })
+        if self.ptz_client:
+            info['ptz'] = self.ptz_client.get_stats()
+            info['auth'] = self.token_manager.get_stats()
+        return info
+
+
+class _StandbyDecoder:
+    """Decoder started at a new frame size, waiting for its first frame"""
+
+    def __init__(self, process: subprocess.Popen, size: Tuple[int, int], shape: Tuple[int, ...]):
+        self.process = process
+        self.size = size
+        self.shape = shape
+        self.frame: Optional[np.ndarray] = None
+        self.timestamp = 0.0
+        self.done = threading.Event()
+
+    def read_first(self, read_into) -> None:
+        frame = np.empty(self.shape, dtype=np.uint8)
+        self.timestamp = time.time()
+        if read_into(self.process.stdout, frame):
+            self.frame = frame
+        self.done.set()
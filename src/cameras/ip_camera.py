@@ -6,17 +6,29 @@ to make it compatible with the plugin interface without modifying
 the original camera.py file.
 """
 
+import cv2
+import random
 import threading
+import time
 import logging
-from typing import Optional
+from typing import List, Optional, Tuple
 import numpy as np
 
 from camera_interface import CameraInterface
 from camera_registry import register_camera
 from camera import Camera  # Import the existing Camera class
+from ptz_auth import TokenManager, DEFAULT_REFRESH_MARGIN
+from ptz_client import AsyncPTZClient, DEFAULT_PTZ_MAX_BATCH
 
 logger = logging.getLogger(__name__)
 
+# Reconnect backoff bounds in seconds (overridable per camera in config)
+RECONNECT_INITIAL_DELAY = 0.5
+RECONNECT_MAX_DELAY = 30.0
+
+# Resolution of the camera's sub-stream (Reolink h264Preview_01_sub default)
+DEFAULT_SUB_STREAM_SIZE = (640, 360)
+
 
 @register_camera("ip_camera")
 class IPCamera(CameraInterface):
@@ -36,6 +48,22 @@ class IPCamera(CameraInterface):
             config: Configuration dictionary containing:
                 - rtsp_url: RTSP stream URL
                 - https: Dictionary with ip, username, password
+                - capture_mode: 'decode_all' (default) decodes every frame;
+                  'on_demand' grabs every packet but only decodes when a
+                  consumer has asked for a newer frame
+                - reconnect_initial_delay: First reconnect backoff in seconds
+                  (default 0.5)
+                - reconnect_max_delay: Backoff ceiling in seconds (default 30)
+                - ptz_concurrency: Maximum PTZ requests in flight (default 1,
+                  which keeps commands strictly ordered)
+                - ptz_max_batch: Maximum PTZ commands per api.cgi request
+                  (default 8, 1 disables batching)
+                - token_refresh_margin: Seconds before the login token's
+                  lease ends that it is renewed in the background (default 60)
+                - sub_stream_url: Optional low-resolution stream, used while
+                  every tile showing the camera fits within sub_stream_size
+                - sub_stream_size: [width, height] of the sub-stream
+                  (default [640, 360])
         """
         super().__init__(camera_id, config)
         
@@ -67,20 +95,71 @@ class IPCamera(CameraInterface):
             logger.error(f"Failed to create IP camera {camera_id}: {e}")
             raise
         
+        # Cached login token, renewed before its lease runs out
+        self.token_manager = TokenManager(
+            base_url=f"https://{ip}/api.cgi",
+            username=username,
+            password=password,
+            camera_id=camera_id,
+            token=self._camera.token,
+            refresh_margin=config.get('token_refresh_margin', DEFAULT_REFRESH_MARGIN)
+        )
+        self.token_manager.start()
+        
+        # Pooled, non-blocking PTZ transport
+        self.ptz_client = AsyncPTZClient(
+            base_url=f"https://{ip}/api.cgi",
+            token_getter=self.token_manager.get_token,
+            camera_id=camera_id,
+            max_concurrency=config.get('ptz_concurrency', 1),
+            max_batch=config.get('ptz_max_batch', DEFAULT_PTZ_MAX_BATCH),
+            token_refresher=self.token_manager.renew
+        )
+        
+        self.capture_mode = config.get('capture_mode', 'decode_all')
+        if self.capture_mode not in ('decode_all', 'on_demand'):
+            raise ValueError(f"Unknown capture_mode for IP camera {camera_id}: {self.capture_mode}")
+        
         self._capture_thread = None
+        self._frame_wanted = threading.Event()
+        self._grabbed = 0
+        self._retrieved = 0
+        
+        # Stream supervision
+        self.reconnect_initial_delay = config.get('reconnect_initial_delay', RECONNECT_INITIAL_DELAY)
+        self.reconnect_max_delay = config.get('reconnect_max_delay', RECONNECT_MAX_DELAY)
+        self._stop_requested = threading.Event()
+        self._stream_ok = True
+        self._reconnects = 0
+        self._reconnect_failures = 0
+        self._last_reconnect_latency = None
+        self._max_reconnect_latency = 0.0
+        self._total_downtime = 0.0
+        
+        # Main/sub-stream selection from the layout's target size
+        self.sub_stream_url = config.get('sub_stream_url')
+        self.sub_stream_size = tuple(config.get('sub_stream_size', DEFAULT_SUB_STREAM_SIZE))
+        self._stream_url = rtsp_url
+        self._wanted_url = rtsp_url
+        self._standby = None
+        self._standby_lock = threading.Lock()
+        self._stream_switches = 0
     
     def get_frame(self) -> Optional[np.ndarray]:
         """
         Get current frame from camera
         
         Returns:
-            Current frame as numpy array or None if no frame available
+            Newest complete frame (no copy) or None if no frame available
         """
-        return self._camera.get_frame()
+        # Ask the capture thread to decode the next grabbed packet
+        self._frame_wanted.set()
+        frame, _, _ = self.frame_buffer.latest()
+        return frame
     
     def send_ptz_command(self, command: str, parameter: str, id: int = 0) -> bool:
         """
-        Send PTZ command to camera
+        Send PTZ command to camera (blocking)
         
         Args:
             command: Command type (e.g., "PtzCtrl")
@@ -90,13 +169,39 @@ class IPCamera(CameraInterface):
         Returns:
             True if command was sent successfully, False otherwise
         """
-        try:
-            self._camera.send_ptz_command(command, parameter, id)
+        success = self.ptz_client.send_sync(command, parameter, id)
+        if success:
             logger.debug(f"Sent PTZ command to camera {self.camera_id}: {command} {parameter}")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to send PTZ command to camera {self.camera_id}: {e}")
-            return False
+        return success
+    
+    async def send_ptz_command_async(self, command: str, parameter: str, id: int = 0) -> bool:
+        """
+        Send PTZ command over the pooled transport without blocking the loop
+        
+        Args:
+            command: Command type (e.g., "PtzCtrl")
+            parameter: Command parameter (e.g., "Left", "Right", "ZoomInc", "ToPos")
+            id: Additional identifier for command (e.g., preset position)
+            
+        Returns:
+            True if command was sent successfully, False otherwise
+        """
+        success = await self.ptz_client.send(command, parameter, id)
+        if success:
+            logger.debug(f"Sent PTZ command to camera {self.camera_id}: {command} {parameter}")
+        return success
+    
+    async def send_ptz_commands_async(self, commands: List[Tuple[str, str, int]]) -> List[bool]:
+        """
+        Send several PTZ commands as one coalesced, batched request
+        
+        Args:
+            commands: (command, parameter, id) tuples in send order
+            
+        Returns:
+            Success flag per command (coalesced-away commands count as sent)
+        """
+        return await self.ptz_client.send_many(commands)
     
     def capture_frames(self) -> None:
         """
@@ -107,22 +212,222 @@ class IPCamera(CameraInterface):
             return
         
         self.running = True
+        self.token_manager.start()
+        self._stop_requested.clear()
+        self._frame_wanted.set()  # Always decode a first frame
         self._capture_thread = threading.Thread(
-            target=self._camera.capture_frames,
+            target=self._capture_loop,
             name=f"IPCamera-{self.camera_id}-Capture"
         )
         self._capture_thread.daemon = True
         self._capture_thread.start()
         logger.info(f"Started frame capture for IP camera {self.camera_id}")
     
+    def set_target_size(self, size: Optional[Tuple[int, int]]) -> None:
+        """
+        Use the sub-stream while the layout draws this camera small enough
+        
+        The new stream is opened in the background and swapped in once it
+        delivers a packet, like a reconnect, so the tile never goes blank.
+        """
+        super().set_target_size(size)
+        if not self.sub_stream_url:
+            return
+        size = self.target_size
+        fits = size is not None and size[0] <= self.sub_stream_size[0] and size[1] <= self.sub_stream_size[1]
+        wanted = self.sub_stream_url if fits else self.config['rtsp_url']
+        if wanted == self._wanted_url:
+            return
+        with self._standby_lock:
+            self._wanted_url = wanted
+            switched_back = wanted == self._stream_url
+            standby = None
+            if switched_back:
+                standby, self._standby = self._standby, None
+        if switched_back:
+            # Switched back before the other stream was swapped in
+            if standby is not None:
+                standby[1].release()
+            return
+        logger.info(f"Camera {self.camera_id} switching to {'sub' if fits else 'main'} stream for {size}")
+        if self.running:
+            self._open_standby(wanted)
+    
+    def flush(self) -> None:
+        """
+        Reopen the stream to skip the packets queued during keepalive
+        
+        Keepalive grabs one packet per keepalive_interval, so the open
+        capture falls far behind live. A fresh capture starts at the live
+        edge; it is swapped in once it delivers a packet, like a stream
+        switch, which the resume preroll leaves time for.
+        """
+        if self.running:
+            self._open_standby(self._wanted_url)
+    
+    def _open_standby(self, url: str) -> None:
+        """Open a stream in the background and hand it to the capture loop"""
+        def open_stream():
+            standby = cv2.VideoCapture(url)
+            if standby.isOpened() and standby.grab():
+                with self._standby_lock:
+                    current = url == self._wanted_url and self.running
+                    if current:
+                        previous, self._standby = self._standby, (url, standby)
+                if current:
+                    if previous is not None:
+                        previous[1].release()
+                    return
+            if url == self._wanted_url:
+                logger.warning(f"Camera {self.camera_id} could not open {url}, keeping current stream")
+            standby.release()
+        
+        threading.Thread(target=open_stream, name=f"IPCamera-{self.camera_id}-Standby", daemon=True).start()
+    
+    def _switch_stream(self, old_cap):
+        """Swap in a stream opened by _open_standby, if one is ready"""
+        with self._standby_lock:
+            standby, self._standby = self._standby, None
+            if standby is None:
+                return old_cap
+            url, cap = standby
+            self._stream_url = url
+        self._camera.cap = cap
+        old_cap.release()
+        self._stream_switches += 1
+        self._preallocate_frame_pool(cap)
+        self._frame_wanted.set()
+        logger.info(f"Camera {self.camera_id} now capturing {url}")
+        return cap
+    
+    def _preallocate_frame_pool(self, cap) -> None:
+        """Size the frame pool from the stream so the first reads do not allocate"""
+        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH) or 0)
+        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT) or 0)
+        if width <= 0 or height <= 0:
+            return
+        self.frame_buffer.preallocate((height, width, 3))
+    
+    def _capture_loop(self) -> None:
+        """Decode RTSP frames straight into the triple buffer's write slot"""
+        cap = self._camera.cap
+        self._preallocate_frame_pool(cap)
+        read_frame = self._grab_frame if self.capture_mode == 'on_demand' else self._read_frame
+        if self._wanted_url != self._stream_url:
+            self._open_standby(self._wanted_url)
+        while self.running and self._camera.running:
+            if self._standby is not None:
+                cap = self._switch_stream(cap)
+            if not self.active:
+                # Keepalive: touch the stream occasionally without decoding
+                # (flush() drops the backlog this leaves when resuming)
+                ok = cap.grab()
+                if ok:
+                    self._grabbed += 1
+                    self.wait_for_activation(self.keepalive_interval)
+            else:
+                ok = read_frame(cap)
+            if not ok:
+                logger.warning(f"Camera {self.camera_id} failed to capture frame.")
+                cap = self._reconnect(cap)
+        cap.release()
+    
+    def _open_capture(self):
+        """Open a new RTSP capture for the camera's current stream"""
+        return cv2.VideoCapture(self._stream_url)
+    
+    def _backoff_delay(self, attempt: int) -> float:
+        """Jittered exponential backoff delay for the given attempt (0-based)"""
+        delay = min(self.reconnect_max_delay, self.reconnect_initial_delay * (2 ** attempt))
+        return random.uniform(delay / 2, delay)
+    
+    def _reconnect(self, old_cap):
+        """
+        Re-open the RTSP stream with jittered exponential backoff
+        
+        A standby capture is opened and must deliver a packet before the old
+        one is released, so the compositor keeps showing the last good frame
+        until the replacement is live.
+        
+        Args:
+            old_cap: Capture that just failed
+            
+        Returns:
+            The replacement capture, or old_cap if the camera was stopped
+        """
+        self._stream_ok = False
+        started = time.monotonic()
+        attempt = 0
+        
+        while self.running and self._camera.running:
+            if self._stop_requested.wait(self._backoff_delay(attempt)):
+                break
+            
+            standby = self._open_capture()
+            if standby.isOpened() and standby.grab():
+                self._camera.cap = standby
+                old_cap.release()
+                self._preallocate_frame_pool(standby)
+                self._frame_wanted.set()
+                
+                latency = time.monotonic() - started
+                self._stream_ok = True
+                self._reconnects += 1
+                self._last_reconnect_latency = latency
+                self._max_reconnect_latency = max(self._max_reconnect_latency, latency)
+                self._total_downtime += latency
+                logger.info(f"Camera {self.camera_id} reconnected after {attempt + 1} attempt(s) in {latency:.2f}s")
+                return standby
+            
+            standby.release()
+            self._reconnect_failures += 1
+            attempt += 1
+            logger.warning(f"Camera {self.camera_id} reconnect attempt {attempt} failed")
+        
+        return old_cap
+    
+    def _read_frame(self, cap) -> bool:
+        """Decode every frame into the write buffer and publish it"""
+        ret, frame = cap.read(self.frame_buffer.writable())
+        if not ret:
+            return False
+        self._grabbed += 1
+        self._retrieved += 1
+        self.frame_buffer.publish(frame)
+        return True
+    
+    def _grab_frame(self, cap) -> bool:
+        """
+        Drain one packet from the RTSP buffer, decoding it only if wanted
+        
+        grab() keeps the stream current; the expensive retrieve() (decode and
+        colour conversion) only runs when get_frame() has been called since
+        the last retrieve, so frames nobody looks at are never decoded.
+        """
+        timestamp = time.time()
+        if not cap.grab():
+            return False
+        self._grabbed += 1
+        if not self._frame_wanted.is_set():
+            return True
+        self._frame_wanted.clear()
+        ret, frame = cap.retrieve(self.frame_buffer.writable())
+        if not ret:
+            return False
+        self._retrieved += 1
+        self.frame_buffer.publish(frame, timestamp)
+        return True
+    
     def stop(self) -> None:
         """
         Stop camera capture and cleanup
         """
+        self.token_manager.stop()
         if not self.running:
             return
         
         self.running = False
+        self._stop_requested.set()
         self._camera.stop()
         
         if self._capture_thread and self._capture_thread.is_alive():
@@ -130,6 +435,11 @@ class IPCamera(CameraInterface):
             if self._capture_thread.is_alive():
                 logger.warning(f"Camera {self.camera_id} capture thread did not stop gracefully")
         
+        with self._standby_lock:
+            standby, self._standby = self._standby, None
+        if standby is not None:
+            standby[1].release()
+        
         logger.info(f"Stopped IP camera {self.camera_id}")
     
     def is_connected(self) -> bool:
@@ -139,7 +449,7 @@ class IPCamera(CameraInterface):
         Returns:
             True if camera has a valid token (is authenticated), False otherwise
         """
-        return hasattr(self._camera, 'token') and self._camera.token is not None
+        return self.token_manager.is_valid()
     
     def get_camera_info(self) -> dict:
         """
@@ -152,6 +462,22 @@ class IPCamera(CameraInterface):
         info.update({
             'ip': self.config.get('https', {}).get('ip', ''),
             'rtsp_url': self.config.get('rtsp_url', ''),
-            'has_token': hasattr(self._camera, 'token') and self._camera.token is not None
+            'stream_url': self._stream_url,
+            'stream_switches': self._stream_switches,
+            'has_token': self.token_manager.is_valid(),
+            'auth': self.token_manager.get_stats(),
+            'frame_pool': self.frame_buffer.get_stats(),
+            'capture_mode': self.capture_mode,
+            'frames_grabbed': self._grabbed,
+            'frames_decoded': self._retrieved,
+            'stream_connected': self._stream_ok,
+            'ptz': self.ptz_client.get_stats(),
+            'reconnects': {
+                'count': self._reconnects,
+                'failed_attempts': self._reconnect_failures,
+                'last_latency': self._last_reconnect_latency,
+                'max_latency': self._max_reconnect_latency,
+                'total_downtime': self._total_downtime
+            }
         })
         return info 
\ No newline at end of file
@@ -100,6 +100,8 @@ class MockCamera(CameraInterface):
             self.image_paths = [self._create_test_image()]
         
         self.current_image = 0
+        self._images = {}  # Decoded images by path
+        self._shown_image = None  # Index of the image last published
         logger.info(f"Loaded {len(self.image_paths)} images")
     
     def _init_webcam_source(self):
@@ -139,8 +141,9 @@ class MockCamera(CameraInterface):
         return test_image_path
     
     def get_frame(self) -> Optional[np.ndarray]:
-        """Get current frame from mock camera"""
-        return self.frame
+        """Get newest complete frame from mock camera (no copy)"""
+        frame, _, _ = self.frame_buffer.latest()
+        return frame
     
     @property
     def frame_count(self) -> int:
@@ -182,17 +185,27 @@ class MockCamera(CameraInterface):
         frame_interval = 1.0 / self.fps
         
         while self.running:
+            if not self.active:
+                # Not shown by the current layout - nothing to keep alive
+                self.wait_for_activation(self.keepalive_interval)
+                continue
+            
             start_time = time.time()
             
-            # Generate frame based on source type
+            # Fill the triple buffer's write slot based on source type
             if self.source == 'video':
-                self.frame = self._get_video_frame()
+                frame = self._get_video_frame()
             elif self.source == 'images':
-                self.frame = self._get_image_frame()
+                frame = self._get_image_frame()
             elif self.source == 'webcam':
-                self.frame = self._get_webcam_frame()
+                frame = self._get_webcam_frame()
             elif self.source == 'generated':
-                self.frame = self._get_generated_frame()
+                frame = self._get_generated_frame()
+            else:
+                frame = None
+            
+            if frame is not None:
+                self.frame_buffer.publish(frame, start_time)
             
             self._frame_count += 1
             
@@ -203,54 +216,63 @@ class MockCamera(CameraInterface):
                 time.sleep(sleep_time)
     
     def _get_video_frame(self) -> Optional[np.ndarray]:
-        """Get frame from video file"""
+        """Decode next video frame into the write buffer"""
         if not self._cap or not self._cap.isOpened():
             return None
         
-        ret, frame = self._cap.read()
+        ret, frame = self._cap.read(self.frame_buffer.writable())
         if not ret:
             if self.loop:
                 # Restart video from beginning
                 self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                ret, frame = self._cap.read()
+                ret, frame = self._cap.read(self.frame_buffer.writable())
             if not ret:
                 return None
         
         return frame
     
     def _get_image_frame(self) -> Optional[np.ndarray]:
-        """Get frame from image sequence"""
+        """Copy the next image into the write buffer, or None if it is unchanged"""
         if not self.image_paths:
             return None
         
-        image_path = self.image_paths[self.current_image]
-        frame = cv2.imread(image_path)
-        
+        index = self.current_image
+        if self.loop:
+            self.current_image = (index + 1) % len(self.image_paths)
+        if index == self._shown_image:
+            # Still image: the published frame is already current
+            return None
+        self._shown_image = index
+        
+        image_path = self.image_paths[index]
+        if image_path not in self._images:
+            self._images[image_path] = cv2.imread(image_path)
+            if self._images[image_path] is None:
+                logger.warning(f"Could not load image: {image_path}")
+        frame = self._images[image_path]
         if frame is None:
-            logger.warning(f"Could not load image: {image_path}")
             return None
         
-        # Move to next image
-        if self.loop:
-            self.current_image = (self.current_image + 1) % len(self.image_paths)
-        
-        return frame
+        buffer = self.frame_buffer.writable(frame.shape)
+        np.copyto(buffer, frame)
+        return buffer
     
     def _get_webcam_frame(self) -> Optional[np.ndarray]:
-        """Get frame from webcam"""
+        """Read webcam frame into the write buffer"""
         if not self._cap or not self._cap.isOpened():
             return None
         
-        ret, frame = self._cap.read()
+        ret, frame = self._cap.read(self.frame_buffer.writable())
         return frame if ret else None
     
     def _get_generated_frame(self) -> np.ndarray:
-        """Generate a synthetic frame"""
+        """Render a synthetic frame into the write buffer"""
         # Create frame with changing colors
         hue = (self._frame_count * 2) % 180
         color = cv2.cvtColor(np.uint8([[[hue, 255, 200]]]), cv2.COLOR_HSV2BGR)[0][0]
         
-        frame = np.full((self.height, self.width, 3), color, dtype=np.uint8)
+        frame = self.frame_buffer.writable((self.height, self.width, 3))
+        frame[:] = color
         
         # Add camera info text
         text_lines = [
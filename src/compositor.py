@@ -0,0 +1,297 @@
+"""
+Compositor Engine for ISKCON-Broadcast
+
+This module runs compositing and output on a dedicated thread that owns
+the canvas and publishes it to the output sinks. The asyncio orchestration only
+posts lightweight commands (switch layout, show a full frame, set an
+overlay) to its queue, so PTZ calls, audio loading and schedule checks no
+longer compete with frame rendering, and render cadence no longer depends
+on event-loop jitter. The canvas is composed in the background's pixel
+format, so an encoder can be fed YUV 4:2:0 without a per-frame conversion;
+only the preview window converts back to BGR. Each changed canvas is
+copied once and shared by reference with every sink, each of which drains
+its own queue on its own thread (see frame_fanout.py); unchanged ticks are
+sent as repeats, so an encoder keeps a constant frame rate. An optional
+operator multiview (see multiview.py) is composed on the same thread from
+the camera reductions the programme shares with it, and published to its
+own outputs.
+"""
+
+import logging
+import queue
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from background_cache import BackgroundCache
+from frame_clock import FrameClock, DEFAULT_OUTPUT_FPS
+from frame_fanout import FrameFanOut
+from layout_plan import LayoutPlan
+from multiview import Multiview
+from output_sink import OutputSink
+from pixel_format import YUV_FORMATS, from_bgr, paste
+
+logger = logging.getLogger(__name__)
+
+
+class Compositor:
+    """
+    Render thread owning the canvas and feeding the output sinks
+
+    Commands are applied at the start of each tick in the order they were
+    posted. All methods except ``run()`` are safe to call from any thread.
+    """
+
+    def __init__(self, cameras: Sequence[Any], layouts: Dict[str, LayoutPlan],
+                 background: BackgroundCache, fps: float = DEFAULT_OUTPUT_FPS,
+                 sinks: Sequence[OutputSink] = (), multiview: Optional[Multiview] = None,
+                 multiview_sinks: Sequence[OutputSink] = ()):
+        """
+        Args:
+            cameras: Camera list indexed by the layouts' tiles
+            layouts: Compiled layouts by mode name
+            background: Background cache the canvas is reset from
+            fps: Output frame rate
+            sinks: Outputs fed the canvas on every tick, each on its own
+                thread (started and stopped with the compositor; none
+                renders without output)
+            multiview: Operator multiview composed after the programme, if any
+            multiview_sinks: Outputs fed the multiview canvas
+        """
+        self.cameras = cameras
+        self.layouts = layouts
+        self.background = background
+        self.sinks = list(sinks)
+        self.clock = FrameClock(fps)
+        self.pixel_format = background.pixel_format
+        self.canvas = background.new_canvas()
+
+        self.quit_requested = threading.Event()
+        self.fanout = FrameFanOut(self.sinks, self.canvas.shape, self.quit_requested)
+        self.multiview = multiview
+        self.multiview_fanout = (FrameFanOut(multiview_sinks, multiview.canvas.shape, self.quit_requested)
+                                 if multiview is not None else None)
+        self._commands: queue.Queue = queue.Queue()
+        self._stop_requested = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Render state, touched only by the compositor thread
+        self._layout: Optional[LayoutPlan] = None
+        self._full_frame: Optional[np.ndarray] = None
+        self._overlay: Optional[Tuple[np.ndarray, Tuple[int, int]]] = None
+        self._changed = True
+        self._ticks_missed = 0
+        self._multiview_ticks = 0
+        self._programme_changed = False
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+    # Commands (any thread)
+
+    def switch_layout(self, mode: Optional[str]) -> None:
+        """
+        Show a compiled layout from the next tick
+
+        Args:
+            mode: Mode name, or None for the plain background
+        """
+        self._commands.put(('layout', mode))
+
+    def show_frame(self, frame: Optional[np.ndarray]) -> None:
+        """
+        Show a canvas-sized frame (e.g. video playback) instead of the layout
+
+        The frame must not be modified after it is posted.
+
+        Args:
+            frame: BGR frame of the canvas size, or None to return to the layout
+        """
+        self._commands.put(('frame', frame))
+
+    def set_overlay(self, image: Optional[np.ndarray], pos: Tuple[int, int] = (0, 0)) -> None:
+        """
+        Draw an image on top of every output frame
+
+        Args:
+            image: BGR overlay image, or None to remove the overlay
+            pos: [x, y] position of the overlay on the canvas
+        """
+        self._commands.put(('overlay', (image, tuple(pos)) if image is not None else None))
+
+    def set_next_layout(self, mode: Optional[str]) -> None:
+        """
+        Preview the layout that goes on air next in the multiview
+
+        Args:
+            mode: Mode name, or None for the plain background
+        """
+        self._commands.put(('next_layout', mode))
+
+    # Thread control
+
+    def start(self) -> None:
+        """Start the render thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_requested.clear()
+        self.fanout.start()
+        if self.multiview_fanout is not None:
+            self.multiview_fanout.start()
+        self._thread = threading.Thread(target=self.run, name="Compositor", daemon=True)
+        self._thread.start()
+        logger.info(f"Compositor started at {self.clock.fps} fps")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the render thread, then let the sinks drain and stop"""
+        self._stop_requested.set()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logger.warning("Compositor thread did not stop gracefully")
+        self.fanout.stop()
+        if self.multiview_fanout is not None:
+            self.multiview_fanout.stop()
+
+    def run(self) -> None:
+        """Render loop; runs on the compositor thread"""
+        self.clock.start()
+        tick = self.clock.tick
+        try:
+            while not self._stop_requested.is_set():
+                self._apply_commands()
+                try:
+                    self._render()
+                except Exception as e:
+                    # Keep the output alive; a bad frame must not take us off air
+                    logger.error(f"Compositor render failed: {e}")
+                self._output()
+                next_tick = self.clock.wait()
+                self._ticks_missed = next_tick - tick - 1
+                tick = next_tick
+        finally:
+            logger.info("Compositor stopped")
+
+    # Render thread internals
+
+    def _apply_commands(self) -> None:
+        """Apply every command posted since the last tick"""
+        while True:
+            try:
+                command, argument = self._commands.get_nowait()
+            except queue.Empty:
+                return
+            if command == 'layout':
+                self._start_layout(argument)
+            elif command == 'frame':
+                self._full_frame = argument
+                if argument is None:
+                    self._reset_canvas()
+                self._changed = True
+            elif command == 'overlay':
+                self._overlay = self._convert_overlay(argument) if argument is not None else None
+                self._reset_canvas()
+            elif command == 'next_layout':
+                if self.multiview is not None:
+                    self.multiview.set_next_layout(argument)
+
+    def _convert_overlay(self, overlay: Tuple[np.ndarray, Tuple[int, int]]) -> Tuple[np.ndarray, Tuple[int, int]]:
+        """Convert an overlay to the canvas format once, at even size and position for YUV"""
+        image, (x, y) = overlay
+        if self.pixel_format in YUV_FORMATS:
+            x, y = x - x % 2, y - y % 2
+            image = image[:image.shape[0] - image.shape[0] % 2, :image.shape[1] - image.shape[1] % 2]
+        return from_bgr(np.ascontiguousarray(image), self.pixel_format), (x, y)
+
+    def _start_layout(self, mode: Optional[str]) -> None:
+        """Switch to a layout, logging the previous one's statistics"""
+        if self._layout is not None:
+            self._log_stats(self._layout.name)
+        self._layout = self.layouts.get(mode) if mode else None
+        if mode and self._layout is None:
+            logger.error(f"Unknown display mode: {mode}")
+        self._full_frame = None
+        self._reset_canvas()
+        self.clock.reset_stats()
+        self.frames_shown = 0
+        self.frames_skipped = 0
+
+    def _reset_canvas(self) -> None:
+        """Restore the background under anything not redrawn next tick"""
+        layout = self._layout
+        regions = layout.background_regions if layout and self._overlay is None else None
+        self.background.reset(self.canvas, regions)
+        if layout is not None:
+            layout.invalidate()
+        self._changed = True
+
+    def _render(self) -> None:
+        """Bring the canvas up to date for this tick"""
+        if self._full_frame is not None:
+            if self._changed:
+                from_bgr(self._full_frame, self.pixel_format, dst=self.canvas)
+        elif self._layout is not None:
+            # Share camera reductions only on ticks the multiview is composed
+            pyramid = self.multiview.pyramid if self._multiview_due() else None
+            if self._layout.update(self.canvas, self.cameras, self.background.image, pyramid):
+                self._changed = True
+        if self._changed and self._overlay is not None:
+            image, pos = self._overlay
+            paste(self.canvas, image, pos, self.pixel_format)
+
+    def _output(self) -> None:
+        """Publish the canvas if it changed (else a repeat) to every sink"""
+        if self._ticks_missed:
+            # Ticks dropped by the clock still take a frame slot in the output
+            self.fanout.repeat(self._ticks_missed)
+        if self._changed:
+            self.fanout.publish(self.canvas)
+            self.frames_shown += 1
+            self._programme_changed = True
+            self._changed = False
+        else:
+            self.fanout.repeat()
+            self.frames_skipped += 1
+        if self.multiview is not None:
+            self._output_multiview()
+
+    def _multiview_due(self) -> bool:
+        """Whether the multiview is composed at the end of this tick"""
+        return self.multiview is not None and self._multiview_ticks + 1 >= self.multiview.interval
+
+    def _output_multiview(self) -> None:
+        """Compose and publish the multiview every multiview.interval ticks"""
+        if not self._multiview_due():
+            self._multiview_ticks += 1
+            return
+        self._multiview_ticks = 0
+        try:
+            changed = self.multiview.update(self.canvas, self._programme_changed)
+        except Exception as e:
+            # The operator monitor must never take the programme down
+            logger.error(f"Multiview render failed: {e}")
+            return
+        self._programme_changed = False
+        if changed:
+            self.multiview_fanout.publish(self.multiview.canvas)
+        else:
+            self.multiview_fanout.repeat()
+
+    def _log_stats(self, name: str) -> None:
+        stats = self.clock.get_stats()
+        logger.info(f"Layout {name}: {self.frames_shown} frames shown, {self.frames_skipped} unchanged skipped; "
+                    f"{stats['achieved_fps']:.1f}/{stats['fps']} fps, {stats['dropped']} ticks dropped, "
+                    f"{stats['late']} late, max lateness {stats['max_lateness'] * 1000:.1f}ms")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get output counters and frame clock statistics for the current layout"""
+        return {
+            'layout': self._layout.name if self._layout else None,
+            'frames_shown': self.frames_shown,
+            'frames_skipped': self.frames_skipped,
+            'pending_commands': self._commands.qsize(),
+            'outputs': self.fanout.get_stats(),
+            'multiview': ({**self.multiview.get_stats(), 'outputs': self.multiview_fanout.get_stats()}
+                          if self.multiview is not None else None),
+            **self.clock.get_stats(),
+        }
@@ -0,0 +1,171 @@
+"""
+Deferred Camera for ISKCON-Broadcast
+
+This module provides a placeholder camera used when a camera misses the
+startup deadline (e.g. its HTTPS login is still retrying). It holds the
+camera's slot in the cameras list in a degraded state and forwards to the
+real camera as soon as construction finishes in the background.
+"""
+
+import threading
+import logging
+from concurrent.futures import Future
+from typing import Optional, Dict, Any, List, Tuple
+import numpy as np
+
+from camera_interface import CameraInterface
+
+logger = logging.getLogger(__name__)
+
+
+class DeferredCamera(CameraInterface):
+    """
+    Stand-in for a camera whose construction is still in progress
+
+    Until the real camera is available, get_frame() returns None, PTZ
+    commands fail and is_connected() is False. Calls to capture_frames(),
+    set_active() and set_target_size() are remembered and replayed once it
+    arrives.
+    """
+
+    def __init__(self, camera_id: int, config: Dict[str, Any], future: Future):
+        """
+        Initialize deferred camera
+
+        Args:
+            camera_id: Unique identifier for this camera
+            config: Camera configuration dictionary
+            future: Future resolving to the constructed camera
+        """
+        super().__init__(camera_id, config)
+        self._camera = None
+        self._failed = False
+        self._lock = threading.Lock()
+        future.add_done_callback(self._on_ready)
+
+    @property
+    def camera(self) -> Optional[CameraInterface]:
+        """The real camera, or None while it is still being created"""
+        return self._camera
+
+    @property
+    def state(self) -> str:
+        """'ready', 'pending' or 'failed'"""
+        if self._camera is not None:
+            return 'ready'
+        return 'failed' if self._failed else 'pending'
+
+    def _on_ready(self, future: Future) -> None:
+        """Attach the real camera when background construction finishes"""
+        try:
+            camera = future.result()
+        except Exception as e:
+            logger.error(f"Deferred camera {self.camera_id} failed to start: {e}")
+            self._failed = True
+            return
+
+        with self._lock:
+            camera.set_active(self.active)
+            if self.target_size:
+                camera.set_target_size(self.target_size)
+            if self.running:
+                camera.capture_frames()
+            self._camera = camera
+        logger.info(f"Deferred camera {self.camera_id} is now available: {camera}")
+
+    @property
+    def frame_sequence(self) -> int:
+        """Sequence number of the real camera's newest frame (0 while pending)"""
+        camera = self._camera
+        return camera.frame_sequence if camera else 0
+
+    @property
+    def frame_timestamp(self) -> float:
+        """Capture time of the real camera's last read frame (0.0 while pending)"""
+        camera = self._camera
+        return camera.frame_timestamp if camera else 0.0
+
+    @property
+    def pixel_format(self) -> str:
+        """Pixel format of the real camera's frames"""
+        camera = self._camera
+        return camera.pixel_format if camera else CameraInterface.pixel_format
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """Get current frame, or None while the camera is unavailable"""
+        camera = self._camera
+        return camera.get_frame() if camera else None
+
+    def send_ptz_command(self, command: str, parameter: str, id: int = 0) -> bool:
+        """Forward PTZ command, failing while the camera is unavailable"""
+        camera = self._camera
+        if camera is None:
+            logger.warning(f"Camera {self.camera_id} not available ({self.state}), dropping {command} {parameter}")
+            return False
+        return camera.send_ptz_command(command, parameter, id)
+
+    async def send_ptz_command_async(self, command: str, parameter: str, id: int = 0) -> bool:
+        """Forward asynchronous PTZ command, failing while the camera is unavailable"""
+        camera = self._camera
+        if camera is None:
+            logger.warning(f"Camera {self.camera_id} not available ({self.state}), dropping {command} {parameter}")
+            return False
+        return await camera.send_ptz_command_async(command, parameter, id)
+
+    async def send_ptz_commands_async(self, commands: List[Tuple[str, str, int]]) -> List[bool]:
+        """Forward a PTZ command sequence, failing while the camera is unavailable"""
+        camera = self._camera
+        if camera is None:
+            logger.warning(f"Camera {self.camera_id} not available ({self.state}), dropping {len(commands)} command(s)")
+            return [False] * len(commands)
+        return await camera.send_ptz_commands_async(commands)
+
+    def capture_frames(self) -> None:
+        """Start capture now, or as soon as the camera becomes available"""
+        with self._lock:
+            self.running = True
+            camera = self._camera
+        if camera:
+            camera.capture_frames()
+
+    def stop(self) -> None:
+        """Stop the real camera if it exists"""
+        with self._lock:
+            self.running = False
+            camera = self._camera
+        if camera:
+            camera.stop()
+
+    def set_active(self, active: bool) -> None:
+        """Forward demand changes, remembering them while pending"""
+        with self._lock:
+            super().set_active(active)
+            camera = self._camera
+        if camera:
+            camera.set_active(active)
+
+    def flush(self) -> None:
+        """Forward a flush to the real camera (nothing is buffered while pending)"""
+        camera = self._camera
+        if camera:
+            camera.flush()
+
+    def set_target_size(self, size: Optional[Tuple[int, int]]) -> None:
+        """Forward the frame size hint, remembering it while pending"""
+        with self._lock:
+            super().set_target_size(size)
+            camera = self._camera
+        if camera:
+            camera.set_target_size(size)
+
+    def is_connected(self) -> bool:
+        """Check connection of the real camera (False while unavailable)"""
+        camera = self._camera
+        return camera.is_connected() if camera else False
+
+    def get_camera_info(self) -> Dict[str, Any]:
+        """Get the real camera's information plus the deferred state"""
+        camera = self._camera
+        info = camera.get_camera_info() if camera else super().get_camera_info()
+        info['deferred_state'] = self.state
+        return info
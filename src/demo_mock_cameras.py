@@ -7,6 +7,7 @@ the display helpers to show multiple mock cameras in different layouts.
 """
 
 import cv2
+import numpy as np
 import time
 import logging
 import sys
@@ -1,12 +1,14 @@
 import cv2
 import logging
-import numpy as np
-from display_constants import (
-    PERCENTAGE_DIVISOR,
-    ASPECT_RATIO_HEIGHT_FACTOR,
-    CROP_CENTER_DIVISOR,
-    calculate_scaled_dimensions,
-    get_center_crop_offset
+from display_constants import calculate_scaled_dimensions
+from layout_plan import (
+    FIT_COVER,
+    FIT_COVER_AREA,
+    FIT_FULLSCREEN,
+    TileSpec,
+    draw_tile,
+    fit_frame,
+    plan_tile
 )
 
 def resize_frame_to_fit(frame, target_width, target_height):
@@ -20,30 +22,22 @@ def resize_frame_to_fit(frame, target_width, target_height):
 def fullscreen_display(background, camera, pos, scale):
     """Displays the camera feed in fullscreen mode with 4:3 aspect ratio adjustment."""
     frame = camera.get_frame()
+    if frame is None:
+        # Camera not delivering yet (starting up or degraded) - keep background
+        return background
     
-    # Target dimensions to fit the background scale
-    target_width, target_height = calculate_scaled_dimensions(
-        background.shape[1], background.shape[0], scale
-    )
-    
-    # Resize the frame to target width while maintaining the 4:3 aspect ratio
-    resized_width = target_width
-    resized_height = int(target_width * ASPECT_RATIO_HEIGHT_FACTOR)
-
-    # Resize the frame to fit the target width with 4:3 ratio
-    frame_resized = cv2.resize(frame, (resized_width, resized_height), interpolation=cv2.INTER_AREA)
-
-    # Calculate cropping height to center the frame vertically on the background
-    if resized_height > target_height:
-        crop_top = get_center_crop_offset(resized_height, target_height)
-        crop_bottom = crop_top + target_height
-        frame_resized = frame_resized[crop_top:crop_bottom, :]
-    
-    # Place the resized and cropped frame into the background
-    h_resized, w_resized = frame_resized.shape[:2]
-    background[pos[1]:pos[1] + h_resized, pos[0]:pos[0] + w_resized] = frame_resized
+    # Target dimensions to fit the background scale; the frame is resized to
+    # the target width with a 4:3 ratio and centred vertically
+    target_size = calculate_scaled_dimensions(background.shape[1], background.shape[0], scale)
+    _draw_frame(background, frame, TileSpec(0, tuple(pos), target_size, FIT_FULLSCREEN))
     return background
 
+def _draw_frame(background, frame, spec):
+    """Draw a frame into the background using the cached plan for its tile."""
+    plan = plan_tile(spec, (frame.shape[1], frame.shape[0]), (background.shape[1], background.shape[0]))
+    if plan is not None:
+        draw_tile(background, frame, plan)
+
 def dual_capture_display(
     background, 
     cameras, 
@@ -76,27 +70,22 @@ def dual_capture_display(
         frame_bottom_right = cameras[cam_bottom_right].get_frame()
 
         # Calculate target dimensions for each frame
-        top_left_width, top_left_height = calculate_scaled_dimensions(
+        top_left_size = calculate_scaled_dimensions(
             background.shape[1], background.shape[0], scale_top_left
         )
-        bottom_right_width, bottom_right_height = calculate_scaled_dimensions(
+        bottom_right_size = calculate_scaled_dimensions(
             background.shape[1], background.shape[0], scale_bottom_right
         )
 
-        # Resize and crop frames while maintaining their aspect ratios
-        frame_top_left_resized = crop_and_resize(frame_top_left, top_left_width, top_left_height)
-        frame_bottom_right_resized = crop_and_resize(frame_bottom_right, bottom_right_width, bottom_right_height)
-
-        # Position the resized frames on the background
-        background[
-            pos_top_left[1]:pos_top_left[1] + top_left_height,
-            pos_top_left[0]:pos_top_left[0] + top_left_width
-        ] = frame_top_left_resized
+        # Resize, crop and position frames while maintaining their aspect ratios
+        # (cameras without a frame yet leave their tile showing the background)
+        if frame_top_left is not None:
+            _draw_frame(background, frame_top_left,
+                        TileSpec(cam_top_left, tuple(pos_top_left), top_left_size, FIT_COVER))
 
-        background[
-            pos_bottom_right[1]:pos_bottom_right[1] + bottom_right_height,
-            pos_bottom_right[0]:pos_bottom_right[0] + bottom_right_width
-        ] = frame_bottom_right_resized
+        if frame_bottom_right is not None:
+            _draw_frame(background, frame_bottom_right,
+                        TileSpec(cam_bottom_right, tuple(pos_bottom_right), bottom_right_size, FIT_COVER))
 
         return background
 
@@ -118,32 +107,8 @@ def crop_and_resize(frame, target_width, target_height):
     - The resized and cropped frame.
     """
     try:
-        # Get original dimensions
-        original_height, original_width = frame.shape[:2]
-
-        # Compute aspect ratios
-        aspect_ratio_original = original_width / original_height
-        aspect_ratio_target = target_width / target_height
-
-        # Resize while preserving aspect ratio
-        if aspect_ratio_original > aspect_ratio_target:
-            # Wider than target: match height and crop width
-            new_height = target_height
-            new_width = int(target_height * aspect_ratio_original)
-        else:
-            # Taller than target: match width and crop height
-            new_width = target_width
-            new_height = int(target_width / aspect_ratio_original)
-
-        frame_resized = cv2.resize(frame, (new_width, new_height))
-
-        # Crop to target dimensions
-        x_crop = get_center_crop_offset(new_width, target_width)
-        y_crop = get_center_crop_offset(new_height, target_height)
-
-        frame_cropped = frame_resized[y_crop:y_crop + target_height, x_crop:x_crop + target_width]
-
-        return frame_cropped
+        # Crop the source first and resize the view in a single pass
+        return fit_frame(frame, target_width, target_height, FIT_COVER)
 
     except Exception as e:
         logging.error(f"Error in crop_and_resize: {e}")
@@ -151,33 +116,8 @@ def crop_and_resize(frame, target_width, target_height):
 
 def resize_and_crop(frame, target_width, target_height):
     """Resize the frame to fit the target dimensions while preserving the aspect ratio, and crop any excess."""
-    # Get original dimensions
-    original_height, original_width = frame.shape[:2]
-    
-    # Calculate aspect ratios
-    target_aspect_ratio = target_width / target_height
-    frame_aspect_ratio = original_width / original_height
-
-    # Resize the frame while preserving aspect ratio
-    if frame_aspect_ratio > target_aspect_ratio:
-        # Wider than target, fit height and crop width
-        scale = target_height / original_height
-        new_width = int(original_width * scale)
-        new_height = target_height
-    else:
-        # Taller than target, fit width and crop height
-        scale = target_width / original_width
-        new_width = target_width
-        new_height = int(original_height * scale)
-    
-    resized_frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
-
-    # Crop the resized frame to the target dimensions
-    start_x = get_center_crop_offset(new_width, target_width)
-    start_y = get_center_crop_offset(new_height, target_height)
-    cropped_frame = resized_frame[start_y:start_y + target_height, start_x:start_x + target_width]
-
-    return cropped_frame
+    # Crop the source first and resize the view in a single pass
+    return fit_frame(frame, target_width, target_height, FIT_COVER_AREA)
 
 def left_column_right_main(
     background, 
@@ -212,31 +152,24 @@ def left_column_right_main(
     frame_right = cameras[cam_right].get_frame()
 
     # Calculate target dimensions based on scaling percentages
-    left_width, left_height = calculate_scaled_dimensions(
+    left_size = calculate_scaled_dimensions(
         background.shape[1], background.shape[0], scale_left
     )
     right_width, _ = calculate_scaled_dimensions(
         background.shape[1], background.shape[0], scale_right
     )
-    right_height = background.shape[0]  # Full height for the right camera
-
-    # Resize and crop frames to fit exactly within their designated areas
-    frame_left_top_resized = resize_and_crop(frame_left_top, left_width, left_height)
-    frame_left_bottom_resized = resize_and_crop(frame_left_bottom, left_width, left_height)
-    frame_right_resized = resize_and_crop(frame_right, right_width, right_height)
-
-    # Overlay resized frames on the background
-    background[
-        pos_left_top[1]:pos_left_top[1] + left_height,
-        pos_left_top[0]:pos_left_top[0] + left_width
-    ] = frame_left_top_resized
-    background[
-        pos_left_bottom[1]:pos_left_bottom[1] + left_height,
-        pos_left_bottom[0]:pos_left_bottom[0] + left_width
-    ] = frame_left_bottom_resized
-    background[
-        pos_right[1]:pos_right[1] + right_height,
-        pos_right[0]:pos_right[0] + right_width
-    ] = frame_right_resized
+    right_size = (right_width, background.shape[0])  # Full height for the right camera
+
+    # Resize and crop frames to fit exactly within their designated areas and
+    # overlay them (cameras without a frame yet leave the background visible)
+    if frame_left_top is not None:
+        _draw_frame(background, frame_left_top,
+                    TileSpec(cam_left_top, tuple(pos_left_top), left_size, FIT_COVER_AREA))
+    if frame_left_bottom is not None:
+        _draw_frame(background, frame_left_bottom,
+                    TileSpec(cam_left_bottom, tuple(pos_left_bottom), left_size, FIT_COVER_AREA))
+    if frame_right is not None:
+        _draw_frame(background, frame_right,
+                    TileSpec(cam_right, tuple(pos_right), right_size, FIT_COVER_AREA))
 
     return background
\ No newline at end of file
@@ -0,0 +1,367 @@
+"""
+Encoder Pipe for ISKCON-Broadcast
+
+This module streams the composited programme by writing raw canvas frames
+into the stdin of an ffmpeg encoder subprocess, replacing screen capture
+of the preview window. Encoder settings follow ``utils/ffmpeg.sh``
+(libx264 ultrafast/zerolatency, 15 Mbit/s, GOP 60, FLV to RTMP). The
+encoder runs on its own output thread with a small bounded queue (see
+frame_fanout.py), so the compositor never waits for it: when ffmpeg or
+the network falls behind, the oldest queued frame is dropped. The
+destination may be an RTMP URL, a local file or a ``tcp://`` listener, so
+tests and rehearsals need no YouTube stream. The file recorder is the same
+pipe writing a timestamped archive file. Both are output sinks (see
+output_sink.py) selected in the 'outputs' section of the mode config.
+"""
+
+import logging
+import os
+import random
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from output_sink import DEFAULT_QUEUE_SIZE, OutputSink, register_sink
+from pixel_format import FFMPEG_PIXEL_FORMATS, PIXEL_FORMAT_BGR, check_pixel_format, frame_shape
+
+logger = logging.getLogger(__name__)
+
+# Executable used unless the stream config names another
+DEFAULT_FFMPEG_PATH = 'ffmpeg'
+
+# Recordings ride out longer disk stalls before dropping frames
+DEFAULT_RECORDER_QUEUE_SIZE = 10
+
+# Recording file name (strftime fields are filled in each time ffmpeg starts)
+DEFAULT_RECORDING_PATH = 'recordings/programme_%Y%m%d_%H%M%S.mp4'
+
+# Encoder settings from utils/ffmpeg.sh
+DEFAULT_VIDEO_BITRATE = '15M'
+DEFAULT_BUFFER_SIZE = '30M'
+DEFAULT_GOP = 60
+DEFAULT_PRESET = 'ultrafast'
+
+# Silent audio track for destinations that expect one (YouTube does)
+SILENT_AUDIO_SOURCE = 'anullsrc=channel_layout=stereo:sample_rate=44100'
+
+# Container used for each network protocol (files: from the extension)
+OUTPUT_FORMATS = {
+    'rtmp': 'flv',
+    'rtmps': 'flv',
+    'tcp': 'mpegts',
+    'udp': 'mpegts',
+    'srt': 'mpegts',
+}
+
+# Restart backoff bounds in seconds
+RESTART_INITIAL_DELAY = 0.5
+RESTART_MAX_DELAY = 30.0
+
+# Seconds stop() gives ffmpeg to finish the output before killing it
+STOP_TIMEOUT = 5.0
+
+
+def output_format(destination: str) -> Optional[str]:
+    """ffmpeg container for a destination, or None to let ffmpeg pick from the file name"""
+    if '://' not in destination:
+        return None
+    return OUTPUT_FORMATS.get(destination.split('://', 1)[0].lower())
+
+
+def build_encoder_command(destination: str, width: int, height: int, fps: float,
+                          pixel_format: str = PIXEL_FORMAT_BGR,
+                          ffmpeg_path: str = DEFAULT_FFMPEG_PATH,
+                          bitrate: str = DEFAULT_VIDEO_BITRATE, bufsize: str = DEFAULT_BUFFER_SIZE,
+                          gop: int = DEFAULT_GOP, preset: str = DEFAULT_PRESET,
+                          silent_audio: bool = False, container: Optional[str] = None) -> List[str]:
+    """
+    Build the ffmpeg command line encoding raw frames from stdin
+
+    Args:
+        destination: RTMP URL, output file or other ffmpeg output URL
+        width: Frame width
+        height: Frame height
+        fps: Frame rate of the raw input
+        pixel_format: Pixel format of the frames written (see pixel_format.PIXEL_FORMATS)
+        ffmpeg_path: ffmpeg executable
+        bitrate: Video bitrate (also the rate ceiling)
+        bufsize: Rate control buffer size
+        gop: Keyframe interval in frames
+        preset: libx264 preset
+        silent_audio: Add a silent AAC track
+        container: Output format, or None to choose from the destination
+
+    Returns:
+        Argument list for subprocess
+    """
+    command = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y',
+               '-f', 'rawvideo', '-pix_fmt', FFMPEG_PIXEL_FORMATS[pixel_format],
+               '-s', f'{width}x{height}', '-r', str(fps), '-i', 'pipe:0']
+    if silent_audio:
+        command += ['-f', 'lavfi', '-i', SILENT_AUDIO_SOURCE]
+    command += ['-vcodec', 'libx264', '-preset', preset, '-tune', 'zerolatency',
+                '-b:v', bitrate, '-maxrate', bitrate, '-bufsize', bufsize,
+                '-pix_fmt', 'yuv420p', '-g', str(gop)]
+    if silent_audio:
+        command += ['-c:a', 'aac', '-b:a', '128k', '-ar', '44100', '-shortest']
+    container = container or output_format(destination)
+    if container:
+        command += ['-f', container]
+    command += [destination]
+    return command
+
+
+@register_sink('encoder')
+class EncoderPipe(OutputSink):
+    """
+    Raw-frame writer feeding an ffmpeg encoder
+
+    Runs on its own output thread, so ``write()`` may block on ffmpeg or
+    the network; the fan-out drops this sink's oldest queued frames when
+    it falls behind. ``repeat()`` writes the previous frame again, keeping
+    the encoder at a constant frame rate without copying. If ffmpeg exits
+    it is restarted with backoff; frames arriving before the restart is
+    due are dropped and counted.
+    """
+
+    def __init__(self, destination: str, width: int, height: int, fps: float,
+                 pixel_format: str = PIXEL_FORMAT_BGR, queue_size: int = DEFAULT_QUEUE_SIZE,
+                 ffmpeg_path: str = DEFAULT_FFMPEG_PATH, command: Optional[List[str]] = None,
+                 restart_initial_delay: float = RESTART_INITIAL_DELAY,
+                 restart_max_delay: float = RESTART_MAX_DELAY, **encoder_options: Any):
+        """
+        Args:
+            destination: RTMP URL, output file or other ffmpeg output URL
+            width: Canvas width
+            height: Canvas height
+            fps: Output frame rate
+            pixel_format: Canvas pixel format
+            queue_size: Frames that may wait before the oldest is dropped
+            ffmpeg_path: ffmpeg executable
+            command: Full encoder command line (default: build_encoder_command)
+            restart_initial_delay: First restart backoff in seconds
+            restart_max_delay: Backoff ceiling in seconds
+            **encoder_options: Passed to build_encoder_command (bitrate,
+                bufsize, gop, preset, silent_audio, container)
+
+        Raises:
+            ValueError: If the pixel format or queue size is invalid
+        """
+        super().__init__(width, height, fps, check_pixel_format(pixel_format), queue_size)
+        self.destination = destination
+        self.shape = frame_shape(width, height, pixel_format)
+        self.ffmpeg_path = ffmpeg_path
+        self.encoder_options = encoder_options
+        self.command = command or build_encoder_command(destination, width, height, fps, pixel_format,
+                                                        ffmpeg_path, **encoder_options)
+        self.restart_initial_delay = restart_initial_delay
+        self.restart_max_delay = restart_max_delay
+        self.running = False
+
+        self._process: Optional[subprocess.Popen] = None
+        self._last: Optional[np.ndarray] = None
+        self._attempt = 0
+        self._next_start = 0.0
+
+        self._written = 0
+        self._repeated = 0
+        self._dropped = 0
+        self._bytes_written = 0
+        self._total_write_time = 0.0
+        self._max_write_time = 0.0
+        self._restarts = 0
+
+    def start(self) -> None:
+        """Start ffmpeg"""
+        if self.running:
+            return
+        self.running = True
+        self._attempt = 0
+        self._next_start = 0.0
+        self._ensure_process()
+        logger.info(f"Encoder pipe started: {self.destination}")
+
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Write a frame to the encoder
+
+        Args:
+            frame: Canvas frame, kept by reference for repeat()
+
+        Raises:
+            ValueError: If the frame is not the canvas shape
+        """
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match encoder shape {self.shape}")
+        self._last = frame
+        self._write_frame(frame, repeat=False)
+
+    def repeat(self, count: int = 1) -> None:
+        """Write the previous frame again (unchanged programme or missed ticks)"""
+        if self._last is None:
+            return
+        for _ in range(count):
+            self._write_frame(self._last, repeat=True)
+
+    def _write_frame(self, frame: np.ndarray, repeat: bool) -> None:
+        """Write one frame, dropping it while ffmpeg is down"""
+        process = self._ensure_process()
+        if process is None:
+            self._dropped += 1
+            return
+        started = time.monotonic()
+        try:
+            process.stdin.write(memoryview(frame).cast('B'))
+        except (BrokenPipeError, OSError, ValueError):
+            self._dropped += 1
+            self._encoder_ended()
+            return
+        elapsed = time.monotonic() - started
+        self._attempt = 0
+        self._written += 1
+        if repeat:
+            self._repeated += 1
+        self._bytes_written += frame.nbytes
+        self._total_write_time += elapsed
+        self._max_write_time = max(self._max_write_time, elapsed)
+
+    def _ensure_process(self) -> Optional[subprocess.Popen]:
+        """The running encoder, (re)starting it once its backoff has passed"""
+        if not self.running:
+            return None
+        if self._process is not None:
+            if self._process.poll() is None:
+                return self._process
+            self._encoder_ended()
+        if time.monotonic() < self._next_start:
+            return None
+        if self._next_start:
+            self._restarts += 1
+        self._process = self._start_process()
+        if self._process is None:
+            self._schedule_restart()
+        return self._process
+
+    def _encoder_ended(self) -> None:
+        """Reap an encoder that exited or stopped reading, and schedule its restart"""
+        if self._process is not None:
+            self._finish_process(self._process)
+            self._process = None
+        self._schedule_restart()
+
+    def _schedule_restart(self) -> None:
+        delay = min(self.restart_max_delay, self.restart_initial_delay * (2 ** self._attempt))
+        delay = random.uniform(delay / 2, delay)
+        self._attempt += 1
+        self._next_start = time.monotonic() + delay
+        logger.warning(f"Encoder for {self.destination} ended, restarting in {delay:.1f}s")
+
+    def _next_command(self) -> List[str]:
+        """Command line for the next encoder launch"""
+        return self.command
+
+    def _start_process(self) -> Optional[subprocess.Popen]:
+        """Launch the encoder, or None if the executable cannot be started"""
+        try:
+            process = subprocess.Popen(self._next_command(), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.PIPE, bufsize=0)
+        except OSError as e:
+            logger.error(f"Cannot start encoder for {self.destination}: {e}")
+            return None
+        threading.Thread(target=self._log_stderr, args=(process,), daemon=True,
+                         name="EncoderPipe-Stderr").start()
+        return process
+
+    def _log_stderr(self, process: subprocess.Popen) -> None:
+        """Forward ffmpeg's error output to our log (keeps its pipe drained)"""
+        for line in process.stderr:
+            logger.warning(f"ffmpeg (encoder): {line.decode(errors='replace').rstrip()}")
+
+    def _finish_process(self, process: subprocess.Popen) -> None:
+        """Close ffmpeg's input so it finalises the output, killing it if it hangs"""
+        try:
+            process.stdin.close()
+        except OSError:
+            pass
+        try:
+            process.wait(timeout=STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+    def stop(self) -> None:
+        """Close ffmpeg's input and wait for it to finish the output"""
+        if not self.running:
+            return
+        self.running = False
+        self._last = None
+        if self._process is not None:
+            self._finish_process(self._process)
+            self._process = None
+        logger.info(f"Encoder pipe stopped: {self._written} frames written, {self._dropped} dropped")
+
+    def is_connected(self) -> bool:
+        """Check that the encoder process is running"""
+        process = self._process
+        return self.running and process is not None and process.poll() is None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get throughput statistics
+
+        Returns:
+            Dict with destination, connected, written, repeated, dropped
+            (while ffmpeg was down), bytes_written, mean_write_time,
+            max_write_time (seconds per frame) and restarts
+        """
+        return {
+            'destination': self.destination,
+            'connected': self.is_connected(),
+            'written': self._written,
+            'repeated': self._repeated,
+            'dropped': self._dropped,
+            'bytes_written': self._bytes_written,
+            'mean_write_time': self._total_write_time / self._written if self._written else 0.0,
+            'max_write_time': self._max_write_time,
+            'restarts': self._restarts,
+        }
+
+
+@register_sink('recorder')
+class FileRecorder(EncoderPipe):
+    """
+    Encoder pipe archiving the programme to a file
+
+    The path is a strftime pattern expanded each time ffmpeg starts, so a
+    restarted encoder opens a new file instead of overwriting the last one.
+    """
+
+    def __init__(self, width: int, height: int, fps: float, pixel_format: str = PIXEL_FORMAT_BGR,
+                 path: str = DEFAULT_RECORDING_PATH, queue_size: int = DEFAULT_RECORDER_QUEUE_SIZE,
+                 **options: Any):
+        """
+        Args:
+            width: Canvas width
+            height: Canvas height
+            fps: Output frame rate
+            pixel_format: Canvas pixel format
+            path: Recording file name pattern (container from its extension)
+            queue_size: Frames that may wait before the oldest is dropped
+            **options: Passed to EncoderPipe (ffmpeg_path, bitrate, ...)
+        """
+        super().__init__(path, width, height, fps, pixel_format, queue_size, **options)
+        self.path = path
+
+    def _next_command(self) -> List[str]:
+        destination = time.strftime(self.path)
+        directory = os.path.dirname(destination)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.destination = destination
+        self.command = build_encoder_command(destination, self.width, self.height, self.fps, self.pixel_format,
+                                             self.ffmpeg_path, **self.encoder_options)
+        logger.info(f"Recording programme to {destination}")
+        return self.command
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Stand-in camera HTTP API for ISKCON-Broadcast
+
+This module emulates the Reolink-style ``api.cgi`` Login and PtzCtrl
+endpoints of our IP cameras on a local plain-HTTP port, so the PTZ
+transport can be tested and benchmarked without hardware. It records every
+command it receives and can add artificial latency or expire tokens.
+
+Run standalone with: python fake_camera_api.py --port 8080
+"""
+
+import argparse
+import json
+import logging
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Reolink response code for a missing or expired token ("please login first")
+RSP_CODE_LOGIN_REQUIRED = -6
+
+
+class _APIRequestHandler(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive handler for POST /api.cgi"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.api._connection_opened()
+
+    def log_message(self, format, *args):
+        logger.debug("fake camera api: " + format % args)
+
+    def do_POST(self):
+        api = self.server.api
+        parsed = urlparse(self.path)
+        if parsed.path != '/api.cgi':
+            self._reply(404, {'error': 'not found'})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b'[]')
+        except ValueError:
+            self._reply(400, {'error': 'invalid json'})
+            return
+
+        query = parse_qs(parsed.query)
+        token = query.get('token', [None])[0]
+        if api.latency:
+            time.sleep(api.latency)
+        self._reply(200, api.handle(body, token))
+
+    def _reply(self, status: int, payload: Any):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class FakeCameraAPI:
+    """
+    Local emulation of a camera's api.cgi endpoint
+
+    Attributes:
+        commands: Received PTZ commands as dicts with cmd, op, id, speed,
+            time and batch (index of the HTTP request they arrived in)
+        requests: Number of HTTP requests handled
+        connections: Number of TCP connections accepted
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 lease_time: int = 3600, username: str = 'admin', password: str = 'admin'):
+        """
+        Args:
+            host: Interface to listen on
+            port: TCP port (0 picks a free port)
+            latency: Seconds to delay every response (emulates the camera CPU)
+            lease_time: Token lease reported by Login, in seconds
+            username: Accepted login user
+            password: Accepted login password
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.lease_time = lease_time
+        self.username = username
+        self.password = password
+        self.commands: List[Dict[str, Any]] = []
+        self.requests = 0
+        self.connections = 0
+        self.logins = 0
+        self._tokens: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the emulated api.cgi"""
+        return f"http://{self.host}:{self.port}/api.cgi"
+
+    def start(self) -> 'FakeCameraAPI':
+        """Start serving in a background thread"""
+        self._server = ThreadingHTTPServer((self.host, self.port), _APIRequestHandler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever,
+                                        kwargs={'poll_interval': 0.05},
+                                        name="FakeCameraAPI", daemon=True)
+        self._thread.start()
+        logger.info(f"Fake camera API listening on {self.url}")
+        return self
+
+    def stop(self) -> None:
+        """Stop serving"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def expire_tokens(self) -> None:
+        """Invalidate every issued token, as a camera does when a lease runs out"""
+        with self._lock:
+            self._tokens.clear()
+
+    def _connection_opened(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def handle(self, body: List[Dict[str, Any]], token: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Process one api.cgi request body
+
+        Args:
+            body: JSON array of {"cmd": ..., "param": {...}} entries
+            token: Token from the query string
+
+        Returns:
+            JSON array with one response entry per command
+        """
+        with self._lock:
+            self.requests += 1
+            batch = self.requests
+            now = time.time()
+            responses = []
+            for entry in body:
+                cmd = entry.get('cmd')
+                param = entry.get('param', {})
+                if cmd == 'Login':
+                    responses.append(self._login(param))
+                elif token not in self._tokens or self._tokens[token] < now:
+                    responses.append({'cmd': cmd, 'code': 1,
+                                      'error': {'detail': 'please login first',
+                                                'rspCode': RSP_CODE_LOGIN_REQUIRED}})
+                elif cmd == 'PtzCtrl':
+                    self.commands.append({
+                        'cmd': cmd,
+                        'op': param.get('op'),
+                        'id': param.get('id'),
+                        'speed': param.get('speed'),
+                        'time': now,
+                        'batch': batch,
+                    })
+                    responses.append({'cmd': cmd, 'code': 0, 'value': {'rspCode': 200}})
+                else:
+                    responses.append({'cmd': cmd, 'code': 1,
+                                      'error': {'detail': 'not supported', 'rspCode': -9}})
+            return responses
+
+    def _login(self, param: Dict[str, Any]) -> Dict[str, Any]:
+        user = param.get('User', {})
+        if user.get('userName') != self.username or user.get('password') != self.password:
+            return {'cmd': 'Login', 'code': 1, 'error': {'detail': 'login failed', 'rspCode': -7}}
+        token = uuid.uuid4().hex[:16]
+        self._tokens[token] = time.time() + self.lease_time
+        self.logins += 1
+        return {'cmd': 'Login', 'code': 0,
+                'value': {'Token': {'leaseTime': self.lease_time, 'name': token}}}
+
+
+def main():
+    """Run the stand-in API until interrupted"""
+    parser = argparse.ArgumentParser(description='Emulate a camera api.cgi endpoint locally.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds added to every response")
+    parser.add_argument('--lease-time', type=int, default=3600, help="Token lease in seconds")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    api = FakeCameraAPI(args.host, args.port, args.latency, args.lease_time).start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,189 @@
+"""
+Triple-Buffered Frame Slot for ISKCON-Broadcast
+
+This module provides the frame hand-off used between a camera's capture
+thread (single producer) and the compositor (single consumer). Three
+preallocated buffers rotate between the roles write/ready/read so the
+producer never writes into the array the consumer is reading, and neither
+side allocates once the buffers have been sized.
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+
+class TripleBuffer:
+    """
+    Single-producer / single-consumer triple buffer with sequence numbers
+
+    The producer fills ``writable()`` (e.g. ``cap.read(image=...)``) and calls
+    ``publish()``; the consumer calls ``latest()`` to obtain the newest
+    complete frame. Only index swaps happen under the lock - pixel data is
+    never copied - so the critical section is a few attribute assignments.
+
+    A frame returned by ``latest()`` stays valid until the consumer's next
+    call to ``latest()``.
+    """
+
+    def __init__(self):
+        self._buffers = [None, None, None]
+        self._sequences = [0, 0, 0]
+        self._timestamps = [0.0, 0.0, 0.0]
+        self._write = 0
+        self._ready = 1
+        self._read = 2
+        self._fresh = False
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._allocations = 0
+        self._reused = 0
+        self._dropped = 0
+        self._write_allocated = False
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the most recently published frame (0 = none yet)"""
+        return self._sequence
+
+    @property
+    def read_sequence(self) -> int:
+        """Sequence number of the frame currently held by the consumer"""
+        return self._sequences[self._read]
+
+    @property
+    def read_timestamp(self) -> float:
+        """Capture timestamp of the frame currently held by the consumer"""
+        return self._timestamps[self._read]
+
+    def has_new_frame(self) -> bool:
+        """Check whether a frame newer than the consumer's one is ready"""
+        return self._fresh
+
+    def writable(self, shape: Optional[Tuple[int, ...]] = None,
+                 dtype=np.uint8) -> Optional[np.ndarray]:
+        """
+        Get the buffer the producer should fill next
+
+        Args:
+            shape: If given, (re)allocate the write buffer to this shape when
+                it is missing or has a different shape/dtype
+            dtype: Element type used when allocating
+
+        Returns:
+            The write buffer, or None if it has not been sized yet and no
+            shape was given (callers such as ``VideoCapture.read`` then
+            allocate one, which ``publish`` adopts for reuse)
+        """
+        buffer = self._buffers[self._write]
+        if shape is not None and (buffer is None or buffer.shape != tuple(shape)
+                                  or buffer.dtype != dtype):
+            buffer = np.empty(shape, dtype=dtype)
+            self._buffers[self._write] = buffer
+            self._allocations += 1
+            self._write_allocated = True
+        return buffer
+
+    def preallocate(self, shape: Tuple[int, ...], dtype=np.uint8) -> None:
+        """
+        Allocate all three buffers up front
+
+        Args:
+            shape: Frame shape, e.g. (height, width, 3)
+            dtype: Element type
+        """
+        with self._lock:
+            for index in (self._write, self._ready, self._read):
+                buffer = self._buffers[index]
+                if buffer is None or buffer.shape != tuple(shape) or buffer.dtype != dtype:
+                    self._buffers[index] = np.empty(shape, dtype=dtype)
+                    self._allocations += 1
+
+    def publish(self, frame: Optional[np.ndarray] = None,
+                timestamp: Optional[float] = None) -> int:
+        """
+        Publish the write buffer as the newest complete frame
+
+        Args:
+            frame: Array that was filled. Normally the array returned by
+                ``writable()``; any other array is adopted into the write slot
+                so it is reused from then on
+            timestamp: Capture time (``time.time()`` if omitted)
+
+        Returns:
+            Sequence number assigned to the published frame
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self._lock:
+            if frame is not None and frame is not self._buffers[self._write]:
+                self._buffers[self._write] = frame
+                self._allocations += 1
+            elif not self._write_allocated:
+                self._reused += 1
+            self._write_allocated = False
+            if self._fresh:
+                self._dropped += 1
+            self._sequence += 1
+            self._sequences[self._write] = self._sequence
+            self._timestamps[self._write] = timestamp
+            self._write, self._ready = self._ready, self._write
+            self._fresh = True
+            self._published.notify_all()
+            return self._sequence
+
+    def wait_for_frame(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a frame newer than ``sequence`` has been published
+
+        Args:
+            sequence: Sequence number of the last frame the caller handled
+            timeout: Maximum seconds to wait (None waits forever)
+
+        Returns:
+            True if a newer frame is available, False on timeout
+        """
+        with self._published:
+            return self._published.wait_for(lambda: self._sequence != sequence, timeout)
+
+    def latest(self) -> Tuple[Optional[np.ndarray], int, float]:
+        """
+        Get the newest complete frame without copying
+
+        Returns:
+            Tuple of (frame, sequence, timestamp); frame is None and sequence
+            is 0 if nothing has been published yet
+        """
+        if self._fresh:
+            with self._lock:
+                if self._fresh:
+                    self._read, self._ready = self._ready, self._read
+                    self._fresh = False
+        index = self._read
+        return self._buffers[index], self._sequences[index], self._timestamps[index]
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        Get buffer pool statistics
+
+        Returns:
+            Dictionary with counts of buffer allocations, frames published into
+            an already-allocated buffer, and frames overwritten before the
+            consumer read them
+        """
+        return {
+            'allocations': self._allocations,
+            'reused': self._reused,
+            'dropped': self._dropped,
+            'sequence': self._sequence,
+        }
+
+    def clear(self) -> None:
+        """Drop all buffers (e.g. after a resolution change or on stop)"""
+        with self._lock:
+            self._buffers = [None, None, None]
+            self._sequences = [0, 0, 0]
+            self._timestamps = [0.0, 0.0, 0.0]
+            self._fresh = False
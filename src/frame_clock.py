@@ -0,0 +1,152 @@
+"""
+Frame Clock for ISKCON-Broadcast
+
+This module paces the compositor at a fixed output rate. Tick deadlines
+are computed from a ``time.monotonic()`` start time (tick n is due at
+start + n / fps), so cadence never drifts with compositing cost. Ticks
+that are overrun entirely are dropped rather than bunched up, and every
+tick's lateness is recorded for monitoring.
+"""
+
+import asyncio
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default output rate in frames per second (PAL broadcast rate)
+DEFAULT_OUTPUT_FPS = 25
+
+# Output rates the downstream encoder is set up for
+STANDARD_OUTPUT_RATES = (25, 30, 50)
+
+
+class FrameClock:
+    """
+    Deadline-based ticker at a fixed frame rate
+
+    The cadence starts at construction (or the latest ``start()``); call
+    ``wait()`` (or ``await wait_async()``) after rendering each frame. A
+    tick whose deadline passed before the previous frame finished is
+    dropped and counted; a tick that starts after its deadline plus
+    ``late_threshold`` is counted as late.
+    """
+
+    def __init__(self, fps: float = DEFAULT_OUTPUT_FPS, late_threshold: Optional[float] = None):
+        """
+        Args:
+            fps: Output frame rate
+            late_threshold: Seconds past its deadline before a tick counts as
+                late (default: half a frame interval)
+
+        Raises:
+            ValueError: If fps is not positive
+        """
+        if fps <= 0:
+            raise ValueError(f"Output frame rate must be positive, got {fps}")
+        if fps not in STANDARD_OUTPUT_RATES:
+            logger.warning(f"Output frame rate {fps} is not one of {STANDARD_OUTPUT_RATES}")
+        self.fps = fps
+        self.interval = 1.0 / fps
+        self.late_threshold = self.interval / 2 if late_threshold is None else late_threshold
+        self.start()
+
+    def start(self) -> None:
+        """Restart the cadence from now and clear the statistics"""
+        self._start = time.monotonic()
+        self._tick = 0
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """Clear the statistics without shifting the cadence"""
+        self._stats_start = time.monotonic()
+        self._frames = 0
+        self._dropped = 0
+        self._late = 0
+        self._total_lateness = 0.0
+        self._max_lateness = 0.0
+
+    @property
+    def tick(self) -> int:
+        """Index of the current tick (0 is the start)"""
+        return self._tick
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds since start()"""
+        return time.monotonic() - self._start
+
+    def deadline(self, tick: int) -> float:
+        """Monotonic time at which a tick is due"""
+        return self._start + tick * self.interval
+
+    def _next_deadline(self) -> float:
+        """Advance to the next tick that has not been overrun, counting drops"""
+        tick = self._tick + 1
+        behind = time.monotonic() - self.deadline(tick)
+        if behind >= self.interval:
+            # Whole frame slots went by while rendering - skip them
+            missed = int(math.floor(behind / self.interval))
+            self._dropped += missed
+            tick += missed
+        self._tick = tick
+        return self.deadline(tick)
+
+    def _record(self, deadline: float) -> None:
+        """Record how late the current tick started"""
+        lateness = max(0.0, time.monotonic() - deadline)
+        self._frames += 1
+        self._total_lateness += lateness
+        self._max_lateness = max(self._max_lateness, lateness)
+        if lateness > self.late_threshold:
+            self._late += 1
+
+    def wait(self) -> int:
+        """
+        Block until the next tick is due
+
+        Returns:
+            Index of the new tick
+        """
+        deadline = self._next_deadline()
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        self._record(deadline)
+        return self._tick
+
+    async def wait_async(self) -> int:
+        """
+        Wait for the next tick without blocking the event loop
+
+        Returns:
+            Index of the new tick
+        """
+        deadline = self._next_deadline()
+        delay = deadline - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._record(deadline)
+        return self._tick
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cadence statistics since start() or reset_stats()
+
+        Returns:
+            Dict with fps, ticks (waited for), dropped, late, mean_lateness,
+            max_lateness and achieved_fps
+        """
+        ticks = self._frames
+        elapsed = time.monotonic() - self._stats_start
+        return {
+            'fps': self.fps,
+            'ticks': ticks,
+            'dropped': self._dropped,
+            'late': self._late,
+            'mean_lateness': self._total_lateness / ticks if ticks else 0.0,
+            'max_lateness': self._max_lateness,
+            'achieved_fps': ticks / elapsed if elapsed > 0 else 0.0,
+        }
@@ -0,0 +1,290 @@
+"""
+Frame Fan-Out for ISKCON-Broadcast
+
+This module delivers each finished canvas to several output sinks at once
+(preview window, stream encoder, recorder) without one slow output holding
+up the others or the compositor. The canvas is copied once per changed
+frame into a pooled, reference-counted, read-only frame. Every sink gets
+the same frame by reference. Each sink drains its own bounded queue on its
+own thread. When a queue is full its oldest entry is dropped and counted
+for that sink only, and the buffer goes back to the pool once the last
+sink has let go of it.
+"""
+
+import collections
+import logging
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from output_sink import OutputSink
+
+logger = logging.getLogger(__name__)
+
+# Longest a sink thread waits for an entry before polling its sink again
+SINK_POLL_INTERVAL = 0.04
+
+# Seconds stop() waits for a sink thread to drain and exit
+SINK_STOP_TIMEOUT = 10.0
+
+
+class SharedFrame:
+    """
+    Reference-counted read-only frame handed to every sink
+
+    The publisher holds one reference; each queue holding the frame holds
+    another. When the count drops to zero the buffer returns to its pool.
+    """
+
+    def __init__(self, buffer: np.ndarray, pool: 'FramePool'):
+        self._buffer = buffer
+        self._pool = pool
+        self._refs = 1
+        self._lock = threading.Lock()
+        self.array = buffer.view()
+        self.array.flags.writeable = False
+
+    def retain(self) -> 'SharedFrame':
+        """Take another reference"""
+        with self._lock:
+            self._refs += 1
+        return self
+
+    def release(self) -> None:
+        """Drop a reference, recycling the buffer after the last one"""
+        with self._lock:
+            self._refs -= 1
+            last = self._refs == 0
+        if last:
+            self._pool.recycle(self._buffer)
+
+
+class FramePool:
+    """Canvas-sized buffers reused across published frames"""
+
+    def __init__(self, shape: Tuple[int, ...]):
+        """
+        Args:
+            shape: Canvas array shape
+        """
+        self.shape = tuple(shape)
+        self._free: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        self.allocations = 0
+
+    def frame_from(self, canvas: np.ndarray) -> SharedFrame:
+        """
+        Copy a canvas into a pooled buffer
+
+        Returns:
+            The frame, with one reference owned by the caller
+        """
+        with self._lock:
+            buffer = self._free.pop() if self._free else None
+        if buffer is None:
+            buffer = np.empty(self.shape, dtype=np.uint8)
+            self.allocations += 1
+        np.copyto(buffer, canvas)
+        return SharedFrame(buffer, self)
+
+    def recycle(self, buffer: np.ndarray) -> None:
+        with self._lock:
+            self._free.append(buffer)
+
+
+class SinkWorker:
+    """
+    Thread and bounded queue driving one output sink
+
+    Queue entries are a new frame or a run of repeats; consecutive repeats
+    merge into one entry, so an unchanged programme does not fill the
+    queue. The worker keeps a reference to the last frame it wrote, so the
+    sink may keep using that array until its next ``write()``.
+    """
+
+    def __init__(self, sink: OutputSink, quit_requested: threading.Event,
+                 poll_interval: float = SINK_POLL_INTERVAL):
+        """
+        Args:
+            sink: Output to drive; its queue_size bounds the queue
+            quit_requested: Set when the sink's poll() asks to quit
+            poll_interval: Longest wait between poll() calls when idle
+        """
+        self.sink = sink
+        self.name = type(sink).__name__
+        self.queue_size = sink.queue_size
+        self.poll_interval = poll_interval
+        self._quit_requested = quit_requested
+        self._queue: Deque[List[Any]] = collections.deque()  # [SharedFrame or None, repeats]
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+
+        self._delivered = 0
+        self._repeated = 0
+        self._dropped = 0
+        self._errors = 0
+        self._max_queue_depth = 0
+        self._busy_time = 0.0
+
+    def start(self) -> None:
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name=f"Output-{self.name}", daemon=True)
+        self._thread.start()
+
+    def put(self, frame: Optional[SharedFrame], repeats: int = 0) -> None:
+        """
+        Queue a new frame (taking a reference) or repeats of the previous one
+
+        Never blocks; a full queue drops its oldest entry.
+        """
+        with self._condition:
+            if frame is None and self._queue and self._queue[-1][0] is None:
+                self._queue[-1][1] += repeats
+                return
+            if len(self._queue) >= self.queue_size:
+                dropped, dropped_repeats = self._queue.popleft()
+                if dropped is not None:
+                    dropped.release()
+                self._dropped += (1 if dropped is not None else 0) + dropped_repeats
+            self._queue.append([frame.retain() if frame is not None else None, repeats])
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._condition.notify()
+
+    def _next_entry(self) -> Optional[List[Any]]:
+        """Wait up to poll_interval for an entry; None when idle or stopping"""
+        with self._condition:
+            if not self._queue and not self._stopping:
+                self._condition.wait(self.poll_interval)
+            return self._queue.popleft() if self._queue else None
+
+    def _run(self) -> None:
+        """Deliver queued entries, polling the sink between them"""
+        last: Optional[SharedFrame] = None
+        try:
+            self.sink.start()
+            while True:
+                entry = self._next_entry()
+                if entry is None:
+                    if self._stopping:
+                        break
+                else:
+                    frame, repeats = entry
+                    started = time.monotonic()
+                    try:
+                        if frame is not None:
+                            previous, last = last, frame
+                            try:
+                                self.sink.write(frame.array)
+                                self._delivered += 1
+                            finally:
+                                if previous is not None:
+                                    previous.release()
+                        if repeats:
+                            self.sink.repeat(repeats)
+                            self._repeated += repeats
+                    except Exception as e:
+                        self._errors += 1
+                        logger.error(f"Output {self.name} failed: {e}")
+                    self._busy_time += time.monotonic() - started
+                if self.sink.poll():
+                    self._quit_requested.set()
+        except Exception as e:
+            logger.error(f"Output {self.name} stopped: {e}")
+        finally:
+            if last is not None:
+                last.release()
+            with self._condition:
+                while self._queue:
+                    frame, _ = self._queue.popleft()
+                    if frame is not None:
+                        frame.release()
+            try:
+                self.sink.stop()
+            except Exception as e:
+                logger.error(f"Stopping output {self.name} failed: {e}")
+
+    def request_stop(self) -> None:
+        """Ask the thread to deliver what is queued, then stop the sink"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+
+    def stop(self, timeout: float = SINK_STOP_TIMEOUT) -> None:
+        """Deliver what is queued, then stop the sink and wait for the thread"""
+        self.request_stop()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+            if self._thread.is_alive():
+                logger.warning(f"Output {self.name} did not stop gracefully")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get delivery statistics
+
+        Returns:
+            Dict with the sink name, delivered/repeated/dropped/errors
+            counts, queue_depth and max_queue_depth gauges, busy_time
+            (seconds spent in the sink) and the sink's own statistics
+        """
+        with self._condition:
+            queue_depth = len(self._queue)
+        return {
+            'name': self.name,
+            'delivered': self._delivered,
+            'repeated': self._repeated,
+            'dropped': self._dropped,
+            'errors': self._errors,
+            'queue_depth': queue_depth,
+            'max_queue_depth': self._max_queue_depth,
+            'busy_time': self._busy_time,
+            'sink': self.sink.get_stats(),
+        }
+
+
+class FrameFanOut:
+    """Publishes each canvas once to every sink's worker"""
+
+    def __init__(self, sinks: Sequence[OutputSink], shape: Tuple[int, ...],
+                 quit_requested: threading.Event):
+        """
+        Args:
+            sinks: Outputs to feed
+            shape: Canvas array shape
+            quit_requested: Set when any sink asks to quit
+        """
+        self.pool = FramePool(shape)
+        self.workers = [SinkWorker(sink, quit_requested) for sink in sinks]
+        self.frames_published = 0
+
+    def start(self) -> None:
+        for worker in self.workers:
+            worker.start()
+
+    def publish(self, canvas: np.ndarray) -> None:
+        """Copy the canvas once and queue it for every sink"""
+        if not self.workers:
+            return
+        frame = self.pool.frame_from(canvas)
+        for worker in self.workers:
+            worker.put(frame)
+        frame.release()
+        self.frames_published += 1
+
+    def repeat(self, count: int = 1) -> None:
+        """Queue repeats of the previous frame for every sink"""
+        for worker in self.workers:
+            worker.put(None, count)
+
+    def stop(self) -> None:
+        """Stop every sink, letting them drain in parallel"""
+        for worker in self.workers:
+            worker.request_stop()
+        for worker in self.workers:
+            worker.stop()
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """Per-sink statistics, in sink order"""
+        return [worker.get_stats() for worker in self.workers]
@@ -0,0 +1,117 @@
+"""
+Shared Frame Pyramid for ISKCON-Broadcast
+
+This module keeps one low-resolution level of each camera's newest frame:
+the camera reduced once to the operator multiview's cell size (half the
+programme's width and height, a quarter of its pixels). The multiview
+cells, its next-layout preview and any programme tile of the same size
+(e.g. a 50% dual-view tile) all copy that level, so each camera frame is
+reduced at most once however many of them show it. A level is a single
+resize with the tile's own interpolation: at exactly 2:1 both
+``INTER_LINEAR`` and ``INTER_AREA`` average the 2x2 blocks a
+``cv2.pyrDown`` would smooth, at several times its speed. YUV 4:2:0
+frames are reduced plane by plane.
+"""
+
+import logging
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from pixel_format import (
+    YUV_FORMATS, Region, frame_shape, image_size, plane_factors, planes, scale_region
+)
+
+logger = logging.getLogger(__name__)
+
+
+def half_size(width: int, height: int, pixel_format: str) -> Tuple[int, int]:
+    """(width, height) of a frame's half-size reduction (even for YUV formats)"""
+    if pixel_format in YUV_FORMATS:
+        return (width // 2) & ~1, (height // 2) & ~1
+    return max(1, width // 2), max(1, height // 2)
+
+
+def reduce_region(frame: np.ndarray, pixel_format: str, source: Region, size: Tuple[int, int],
+                  dst: Optional[np.ndarray] = None, interpolation: int = cv2.INTER_AREA) -> np.ndarray:
+    """
+    Reduce a region of a frame to a size
+
+    Args:
+        frame: Frame in pixel_format
+        pixel_format: Format of the frame (and the result)
+        source: (rows, cols) slices of the frame to reduce
+        size: (width, height) of the result
+        dst: Optional preallocated result
+        interpolation: cv2 interpolation flag
+
+    Returns:
+        The reduced frame
+    """
+    width, height = size
+    if dst is None:
+        dst = np.empty(frame_shape(width, height, pixel_format), dtype=np.uint8)
+    for factor, frame_plane, plane in zip(plane_factors(pixel_format), planes(frame, pixel_format),
+                                          planes(dst, pixel_format)):
+        cv2.resize(frame_plane[scale_region(source, factor)], (width // factor, height // factor),
+                   dst=plane, interpolation=interpolation)
+    return dst
+
+
+def reduce_half(frame: np.ndarray, pixel_format: str, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """Reduce a whole frame to half width and height"""
+    width, height = image_size(frame, pixel_format)
+    size = half_size(width, height, pixel_format)
+    return reduce_region(frame, pixel_format, (slice(0, size[1] * 2), slice(0, size[0] * 2)), size, dst)
+
+
+class FramePyramid:
+    """
+    One reduced level per camera, reduced once per camera frame
+
+    Used from the compositor thread only. A level stays valid until the
+    same camera is reduced again (its buffer is reused), so callers copy
+    it out before the next tick.
+    """
+
+    def __init__(self, size: Tuple[int, int]):
+        """
+        Args:
+            size: (width, height) of every level
+        """
+        self.size = tuple(size)
+        self._levels: Dict[Hashable, Tuple[Any, Region, int, np.ndarray]] = {}
+        self.reductions = 0
+        self.hits = 0
+
+    def level(self, key: Hashable, sequence: Any, frame: np.ndarray, pixel_format: str,
+              source: Region, interpolation: int = cv2.INTER_AREA) -> np.ndarray:
+        """
+        Get a camera frame reduced to the level size, reducing it only once
+
+        Args:
+            key: Source identity (the camera)
+            sequence: Frame sequence number of the frame (None: never reused)
+            frame: The frame
+            pixel_format: Format of the frame
+            source: (rows, cols) slices of the frame the level shows
+            interpolation: cv2 interpolation flag used if the frame is reduced
+
+        Returns:
+            The reduced frame (valid until this camera is reduced again)
+        """
+        entry = self._levels.get(key)
+        if entry is not None and sequence is not None and entry[:3] == (sequence, source, interpolation):
+            self.hits += 1
+            return entry[3]
+        shape = frame_shape(self.size[0], self.size[1], pixel_format)
+        buffer = entry[3] if entry is not None and entry[3].shape == shape else None
+        level = reduce_region(frame, pixel_format, source, self.size, buffer, interpolation)
+        self._levels[key] = (sequence, source, interpolation, level)
+        self.reductions += 1
+        return level
+
+    def get_stats(self) -> Dict[str, int]:
+        """Reductions made and reuses served"""
+        return {'reductions': self.reductions, 'hits': self.hits}
@@ -0,0 +1,503 @@
+"""
+Layout Plans for ISKCON-Broadcast
+
+This module compiles the display modes in mode_config.yaml into immutable
+plans. All layout math (scaled tile sizes, aspect-ratio fitting, centre
+crops and clipping to the canvas) runs once per mode and source
+resolution, so the per-frame compositor only resizes pixels: each tile is
+a crop of the source (a view) resized straight into its canvas ROI, with no
+intermediate full-size arrays. Layouts can also compose a YUV 4:2:0 canvas
+for the encoder, resizing YUV camera frames plane by plane. A tile of the
+frame pyramid's level size copies the camera's shared reduction (see
+frame_pyramid.py) instead of resizing the frame again.
+"""
+
+import logging
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+from background_cache import uncovered_regions
+from display_constants import (
+    ASPECT_RATIO_HEIGHT_FACTOR,
+    calculate_scaled_dimensions,
+    get_center_crop_offset
+)
+from frame_pyramid import FramePyramid
+from pixel_format import (
+    PIXEL_FORMAT_BGR, YUV_FORMATS, camera_pixel_format, check_pixel_format, copy_region,
+    from_bgr, frame_shape, image_size, plane_factors, planes, scale_region, to_bgr
+)
+
+logger = logging.getLogger(__name__)
+
+# How a tile fits a source frame into its target size
+FIT_FULLSCREEN = 'fullscreen'      # force 4:3 at the target width, centre-crop rows
+FIT_COVER = 'cover'                # fill the target, centre-crop the excess
+FIT_COVER_AREA = 'cover_area'      # as FIT_COVER, rounding as resize_and_crop does
+
+# Interpolation used by each fit, matching the original display helpers
+FIT_INTERPOLATION = {
+    FIT_FULLSCREEN: cv2.INTER_AREA,
+    FIT_COVER: cv2.INTER_LINEAR,
+    FIT_COVER_AREA: cv2.INTER_AREA,
+}
+
+
+@dataclass(frozen=True)
+class TileSpec:
+    """Source-independent description of one tile of a layout"""
+
+    camera: int
+    pos: Tuple[int, int]
+    size: Tuple[int, int]
+    fit: str
+
+    @property
+    def rect(self) -> Tuple[int, int, int, int]:
+        """(x, y, width, height) the tile draws over, for any source"""
+        width, height = self.size
+        if self.fit == FIT_FULLSCREEN:
+            height = min(height, int(width * ASPECT_RATIO_HEIGHT_FACTOR))
+        return self.pos[0], self.pos[1], width, height
+
+    @property
+    def source_size(self) -> Tuple[int, int]:
+        """(width, height) a source needs so the tile never upscales it"""
+        width, height = self.size
+        if self.fit == FIT_FULLSCREEN:
+            return width, int(width * ASPECT_RATIO_HEIGHT_FACTOR)
+        return width, height
+
+
+@dataclass(frozen=True)
+class TilePlan:
+    """
+    Everything needed to draw one tile for one source resolution
+
+    Attributes:
+        camera: Index into the cameras list
+        roi: (rows, cols) slices of the canvas the tile covers
+        source: (rows, cols) slices of the camera frame shown in the tile
+        size: (width, height) of the ROI, as passed to cv2.resize
+        interpolation: cv2 interpolation flag
+    """
+
+    camera: int
+    roi: Tuple[slice, slice]
+    source: Tuple[slice, slice]
+    size: Tuple[int, int]
+    interpolation: int
+
+
+def _fit_size(fit: str, source_size: Tuple[int, int], target_size: Tuple[int, int]) -> Tuple[int, int]:
+    """Resized (width, height) of a source frame for a fit policy"""
+    source_width, source_height = source_size
+    target_width, target_height = target_size
+    if fit == FIT_FULLSCREEN:
+        return target_width, int(target_width * ASPECT_RATIO_HEIGHT_FACTOR)
+
+    # Never undershoot the target through float rounding, so the tile always
+    # covers its rect
+    source_aspect = source_width / source_height
+    if source_aspect > target_width / target_height:
+        # Wider than target: match height and crop width
+        if fit == FIT_COVER_AREA:
+            return max(target_width, int(source_width * (target_height / source_height))), target_height
+        return max(target_width, int(target_height * source_aspect)), target_height
+    # Taller than target: match width and crop height
+    if fit == FIT_COVER_AREA:
+        return target_width, max(target_height, int(source_height * (target_width / source_width)))
+    return target_width, max(target_height, int(target_width / source_aspect))
+
+
+@lru_cache(maxsize=256)
+def plan_tile(spec: TileSpec, source_size: Tuple[int, int],
+              canvas_size: Tuple[int, int]) -> Optional[TilePlan]:
+    """
+    Compile a tile for a source resolution
+
+    The fit is worked out on the resized frame (scale to cover, centre
+    crop) and the visible rectangle is mapped back to source pixels, so
+    drawing needs a single resize from a source view. The tile is clipped
+    to the canvas, so positions near the edge draw the visible part instead
+    of failing.
+
+    Args:
+        spec: Tile description
+        source_size: (width, height) of the camera frames
+        canvas_size: (width, height) of the canvas
+
+    Returns:
+        Tile plan, or None if the tile lies entirely outside the canvas
+    """
+    resized_width, resized_height = _fit_size(spec.fit, source_size, spec.size)
+    target_width, target_height = spec.size
+    if spec.fit == FIT_FULLSCREEN:
+        # Only rows are cropped; the width already matches the target
+        target_width = resized_width
+    crop_x = get_center_crop_offset(resized_width, target_width)
+    crop_y = get_center_crop_offset(resized_height, target_height)
+    width = min(target_width, resized_width - crop_x)
+    height = min(target_height, resized_height - crop_y)
+
+    # Clip to the canvas
+    x, y = spec.pos
+    canvas_width, canvas_height = canvas_size
+    left, top = max(0, -x), max(0, -y)
+    right = min(width, canvas_width - x)
+    bottom = min(height, canvas_height - y)
+    if right <= left or bottom <= top:
+        return None
+
+    # Visible part of the resized frame, in source pixels
+    source_width, source_height = source_size
+    scale_x = source_width / resized_width
+    scale_y = source_height / resized_height
+    source_left = round((crop_x + left) * scale_x)
+    source_right = max(source_left + 1, round((crop_x + right) * scale_x))
+    source_top = round((crop_y + top) * scale_y)
+    source_bottom = max(source_top + 1, round((crop_y + bottom) * scale_y))
+
+    return TilePlan(
+        camera=spec.camera,
+        roi=(slice(y + top, y + bottom), slice(x + left, x + right)),
+        source=(slice(source_top, source_bottom), slice(source_left, source_right)),
+        size=(right - left, bottom - top),
+        interpolation=FIT_INTERPOLATION[spec.fit]
+    )
+
+
+def draw_tile(canvas: np.ndarray, frame: np.ndarray, plan: TilePlan) -> np.ndarray:
+    """
+    Resize the planned source view of a frame straight into its canvas ROI
+
+    Returns:
+        The ROI view that was written
+    """
+    return cv2.resize(frame[plan.source], plan.size, dst=canvas[plan.roi],
+                      interpolation=plan.interpolation)
+
+
+def align_plan(plan: TilePlan, canvas_size: Tuple[int, int]) -> TilePlan:
+    """
+    Grow a tile's ROI to even rows and columns for a 4:2:0 canvas
+
+    Chroma planes are half size, so a tile must start and end on even
+    pixels to map exactly onto them; the ROI grows by at most one pixel
+    per edge and the source view is unchanged.
+    """
+    rows, cols = plan.roi
+    canvas_width, canvas_height = canvas_size
+    top, left = rows.start - rows.start % 2, cols.start - cols.start % 2
+    bottom = min(canvas_height - canvas_height % 2, rows.stop + rows.stop % 2)
+    right = min(canvas_width - canvas_width % 2, cols.stop + cols.stop % 2)
+    if (top, bottom, left, right) == (rows.start, rows.stop, cols.start, cols.stop):
+        return plan
+    return TilePlan(plan.camera, (slice(top, bottom), slice(left, right)), plan.source,
+                    (right - left, bottom - top), plan.interpolation)
+
+
+def draw_tile_planes(canvas: np.ndarray, frame: np.ndarray, plan: TilePlan, pixel_format: str) -> None:
+    """
+    Resize a YUV frame into a YUV canvas of the same format, plane by plane
+
+    The plan must be aligned with align_plan().
+    """
+    for factor, canvas_plane, frame_plane in zip(plane_factors(pixel_format), planes(canvas, pixel_format),
+                                                 planes(frame, pixel_format)):
+        size = (plan.size[0] // factor, plan.size[1] // factor)
+        cv2.resize(frame_plane[scale_region(plan.source, factor)], size,
+                   dst=canvas_plane[scale_region(plan.roi, factor)], interpolation=plan.interpolation)
+
+
+def fit_frame(frame: np.ndarray, target_width: int, target_height: int, fit: str) -> np.ndarray:
+    """
+    Fit a frame into a new target-sized array in a single resize
+
+    Args:
+        frame: Source frame
+        target_width: Width of the result
+        target_height: Height of the result
+        fit: Fit policy (FIT_COVER or FIT_COVER_AREA)
+
+    Returns:
+        The fitted frame
+    """
+    plan = plan_tile(TileSpec(0, (0, 0), (target_width, target_height), fit),
+                     (frame.shape[1], frame.shape[0]), (target_width, target_height))
+    result = np.empty((plan.size[1], plan.size[0]) + frame.shape[2:], dtype=frame.dtype)
+    return cv2.resize(frame[plan.source], plan.size, dst=result, interpolation=plan.interpolation)
+
+
+def compile_tiles(mode_settings: Dict[str, Any], canvas_size: Tuple[int, int]) -> Tuple[TileSpec, ...]:
+    """
+    Turn one entry of mode_config['modes'] into tile specs
+
+    Args:
+        mode_settings: Mode settings with 'type' and its tile keys
+        canvas_size: (width, height) of the canvas
+
+    Returns:
+        Tile specs in drawing order
+
+    Raises:
+        ValueError: If the mode type is unknown
+    """
+    width, height = canvas_size
+    mode_type = mode_settings.get('type')
+    if mode_type == 'full_screen':
+        return (TileSpec(0, tuple(mode_settings['pos']),
+                         calculate_scaled_dimensions(width, height, mode_settings['scale']), FIT_FULLSCREEN),)
+    if mode_type == 'dual_view':
+        return tuple(
+            TileSpec(mode_settings[f'cam_{corner}'], tuple(mode_settings[f'pos_{corner}']),
+                     calculate_scaled_dimensions(width, height, mode_settings[f'scale_{corner}']), FIT_COVER)
+            for corner in ('top_left', 'bottom_right')
+        )
+    if mode_type == 'left_column_right_main':
+        left_size = calculate_scaled_dimensions(width, height, mode_settings['scale_left'])
+        right_width, _ = calculate_scaled_dimensions(width, height, mode_settings['scale_right'])
+        return (
+            TileSpec(mode_settings['cam_left_top'], tuple(mode_settings['pos_left_top']), left_size, FIT_COVER_AREA),
+            TileSpec(mode_settings['cam_left_bottom'], tuple(mode_settings['pos_left_bottom']), left_size, FIT_COVER_AREA),
+            TileSpec(mode_settings['cam_right'], tuple(mode_settings['pos_right']), (right_width, height), FIT_COVER_AREA),
+        )
+    raise ValueError(f"Unknown display mode type: {mode_type}")
+
+
+class LayoutPlan:
+    """
+    Compiled display mode
+
+    Tile specs and the background regions no tile covers are fixed at
+    construction; per-tile plans are built the first time a source
+    resolution is seen and reused afterwards. ``update()`` remembers the
+    frame sequence each tile last drew and skips tiles whose camera has
+    not produced a new frame since.
+    """
+
+    def __init__(self, name: str, mode_settings: Dict[str, Any], canvas_shape: Sequence[int],
+                 pixel_format: str = PIXEL_FORMAT_BGR, tiles: Optional[Sequence[TileSpec]] = None,
+                 interpolation: Optional[int] = None):
+        """
+        Args:
+            name: Mode name from mode_config['modes']
+            mode_settings: Settings of that mode
+            canvas_shape: Picture shape of the canvas (height, width[, channels])
+            pixel_format: Canvas pixel format (see pixel_format.PIXEL_FORMATS)
+            tiles: Tile specs to use instead of compiling mode_settings
+                (for layouts that are not display modes, e.g. the multiview)
+            interpolation: cv2 interpolation for every tile instead of each
+                fit's own (e.g. a cheaper one for low-resolution previews)
+
+        Raises:
+            ValueError: If the mode type or pixel format is unknown
+        """
+        self.name = name
+        self.pixel_format = check_pixel_format(pixel_format)
+        self.canvas_size = (canvas_shape[1], canvas_shape[0])
+        self.tiles = tuple(tiles) if tiles is not None else compile_tiles(mode_settings, self.canvas_size)
+        self.interpolation = interpolation
+        self.background_regions = uncovered_regions(self.canvas_size, [tile.rect for tile in self.tiles])
+        self._plans: Dict[Tuple[int, int, int], Optional[TilePlan]] = {}
+        self._drawn: List[Optional[int]] = [None] * len(self.tiles)
+        # Per-tile BGR and converted tiles for BGR cameras on a YUV canvas
+        self._scratch: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+    @property
+    def camera_ids(self) -> List[int]:
+        """Camera indices drawn by this layout, in drawing order"""
+        return [tile.camera for tile in self.tiles]
+
+    @property
+    def target_sizes(self) -> Dict[int, Tuple[int, int]]:
+        """
+        Frame size each camera is needed at, for decoder-side downscaling
+
+        Returns:
+            (width, height) per camera index, covering every tile it feeds
+        """
+        sizes: Dict[int, Tuple[int, int]] = {}
+        for tile in self.tiles:
+            width, height = tile.source_size
+            if tile.camera in sizes:
+                width = max(width, sizes[tile.camera][0])
+                height = max(height, sizes[tile.camera][1])
+            sizes[tile.camera] = (width, height)
+        return sizes
+
+    def plan_for(self, index: int, source_shape: Sequence[int]) -> Optional[TilePlan]:
+        """
+        Get the plan of a tile for a source frame shape
+
+        Args:
+            index: Tile index
+            source_shape: Shape of the camera frame (height, width[, channels])
+
+        Returns:
+            Tile plan, or None if the tile is not visible on the canvas
+        """
+        key = (index, source_shape[1], source_shape[0])
+        try:
+            return self._plans[key]
+        except KeyError:
+            plan = plan_tile(self.tiles[index], key[1:], self.canvas_size)
+            if plan is not None and self.interpolation is not None:
+                plan = replace(plan, interpolation=self.interpolation)
+            if plan is not None and self.pixel_format in YUV_FORMATS:
+                plan = align_plan(plan, self.canvas_size)
+            self._plans[key] = plan
+            return plan
+
+    def render(self, canvas: np.ndarray, cameras: Sequence[Any],
+               background: Optional[np.ndarray] = None,
+               pyramid: Optional[FramePyramid] = None) -> np.ndarray:
+        """
+        Draw every tile's newest camera frame onto the canvas
+
+        Cameras without a frame yet leave their tile showing the background
+        if one is given, otherwise whatever the canvas holds.
+
+        Args:
+            canvas: Canvas of the shape the layout was compiled for
+            cameras: Camera list (or dict) indexed by tile camera
+            background: Pristine background to restore missing tiles from
+            pyramid: Shared camera reductions for tiles of its level size
+
+        Returns:
+            The canvas
+        """
+        self._draw(canvas, cameras, range(len(self.tiles)), background, pyramid)
+        return canvas
+
+    def invalidate(self, index: Optional[int] = None) -> None:
+        """
+        Forget what was drawn, e.g. after the canvas was reset
+
+        Args:
+            index: Only redraw this tile (default: every tile)
+        """
+        if index is None:
+            self._drawn = [None] * len(self.tiles)
+        else:
+            self._drawn[index] = None
+
+    def update(self, canvas: np.ndarray, cameras: Sequence[Any],
+               background: Optional[np.ndarray] = None,
+               pyramid: Optional[FramePyramid] = None) -> int:
+        """
+        Redraw only tiles whose camera has a new frame
+
+        Tiles are compared by the camera's ``frame_sequence``; cameras
+        without one are always redrawn. Call ``invalidate()`` whenever the
+        canvas was changed by something else.
+
+        Args:
+            canvas: Canvas of the shape the layout was compiled for
+            cameras: Camera list (or dict) indexed by tile camera
+            background: Pristine background to restore missing tiles from
+            pyramid: Shared camera reductions for tiles of its level size
+
+        Returns:
+            Number of tiles redrawn (0 means the canvas is unchanged)
+        """
+        dirty = []
+        for index, tile in enumerate(self.tiles):
+            # Read the sequence before the frame: a newer frame arriving in
+            # between only causes one extra redraw, never a missed one
+            sequence = getattr(cameras[tile.camera], 'frame_sequence', None)
+            if sequence is None or sequence != self._drawn[index]:
+                dirty.append(index)
+                self._drawn[index] = sequence
+        if dirty:
+            self._draw(canvas, cameras, dirty, background, pyramid)
+        return len(dirty)
+
+    def _draw(self, canvas: np.ndarray, cameras: Sequence[Any], indices: Sequence[int],
+              background: Optional[np.ndarray], pyramid: Optional[FramePyramid] = None) -> None:
+        """Draw the given tiles, restoring missing ones from the background first"""
+        # One get_frame() per camera, shared by every tile showing it: a
+        # camera's frame buffer has a single consumer, and a second read
+        # could hand out a newer frame or recycle the first one's slot
+        fetched = {}
+        frames = []
+        for index in indices:
+            key = self.tiles[index].camera
+            if key not in fetched:
+                camera = cameras[key]
+                sequence = getattr(camera, 'frame_sequence', None)
+                fetched[key] = (camera, sequence, camera.get_frame(), camera_pixel_format(camera))
+            frames.append((index,) + fetched[key])
+        if background is not None:
+            for index, _, _, frame, _ in frames:
+                if frame is None:
+                    x, y, width, height = self.tiles[index].rect
+                    region = (slice(max(0, y), max(0, y + height)), slice(max(0, x), max(0, x + width)))
+                    copy_region(canvas, background, region, self.pixel_format)
+        for index, camera, sequence, frame, frame_format in frames:
+            if frame is None:
+                continue
+            converted = frame_format != self.pixel_format and frame_format != PIXEL_FORMAT_BGR
+            if converted:
+                # YUV camera on a BGR (or other YUV) canvas
+                frame, frame_format = to_bgr(frame, frame_format), PIXEL_FORMAT_BGR
+            width, height = image_size(frame, frame_format)
+            plan = self.plan_for(index, (height, width))
+            if plan is None:
+                continue
+            if (pyramid is not None and not converted and plan.size == pyramid.size
+                    and plan.source[1].stop - plan.source[1].start > plan.size[0]):
+                # Copy the camera's shared reduction instead of resizing again
+                frame = pyramid.level(camera, sequence, frame, frame_format, plan.source, plan.interpolation)
+                plan = TilePlan(plan.camera, plan.roi, (slice(0, plan.size[1]), slice(0, plan.size[0])),
+                                plan.size, plan.interpolation)
+            if self.pixel_format == PIXEL_FORMAT_BGR:
+                draw_tile(canvas, frame, plan)
+            elif frame_format == self.pixel_format:
+                draw_tile_planes(canvas, frame, plan, self.pixel_format)
+            else:
+                self._draw_bgr_tile(canvas, frame, index, plan)
+
+    def _draw_bgr_tile(self, canvas: np.ndarray, frame: np.ndarray, index: int, plan: TilePlan) -> None:
+        """Resize a BGR frame to tile size, convert only the tile and copy its planes in"""
+        width, height = plan.size
+        scratch = self._scratch.get(index)
+        if scratch is None or scratch[0].shape[:2] != (height, width):
+            scratch = (np.empty((height, width, 3), dtype=np.uint8),
+                       np.empty(frame_shape(width, height, self.pixel_format), dtype=np.uint8))
+            self._scratch[index] = scratch
+        tile_bgr, tile = scratch
+        cv2.resize(frame[plan.source], plan.size, dst=tile_bgr, interpolation=plan.interpolation)
+        from_bgr(tile_bgr, self.pixel_format, dst=tile)
+        tile_region = (slice(0, height), slice(0, width))
+        for factor, canvas_plane, tile_plane in zip(plane_factors(self.pixel_format),
+                                                    planes(canvas, self.pixel_format),
+                                                    planes(tile, self.pixel_format)):
+            canvas_plane[scale_region(plan.roi, factor)] = tile_plane[scale_region(tile_region, factor)]
+
+
+def compile_layouts(modes: Dict[str, Dict[str, Any]], canvas_shape: Sequence[int],
+                    pixel_format: str = PIXEL_FORMAT_BGR) -> Dict[str, LayoutPlan]:
+    """
+    Compile every display mode of a mode configuration
+
+    Args:
+        modes: mode_config['modes']
+        canvas_shape: Picture shape of the canvas (height, width[, channels])
+        pixel_format: Canvas pixel format
+
+    Returns:
+        Dict of mode name to layout plan (unknown mode types are skipped)
+    """
+    check_pixel_format(pixel_format)
+    layouts = {}
+    for name, mode_settings in modes.items():
+        try:
+            layouts[name] = LayoutPlan(name, mode_settings, canvas_shape, pixel_format)
+        except (ValueError, KeyError) as e:
+            logger.error(f"Cannot compile display mode {name}: {e}")
+    return layouts
@@ -0,0 +1,283 @@
+"""
+Operator Multiview for ISKCON-Broadcast
+
+This module composes a low-resolution monitoring canvas for the operator:
+the programme, a preview of the next layout and every camera, each in a
+grid cell at half the programme's width and height. Camera cells come from
+the shared frame pyramid (see frame_pyramid.py), so a camera frame the
+programme already reduced for a tile of cell size is not reduced again,
+and the next-layout preview is drawn from the same reductions with the
+layouts scaled to half size. The multiview runs on the compositor thread;
+the compositor publishes its canvas to the multiview outputs. A frame only
+redraws cells whose source changed, and frames are seconds apart by
+default (see DEFAULT_MULTIVIEW_INTERVAL) so the multiview adds under 5% to
+the programme's cost even with every camera live. A camera cell whose newest frame is older than STALE_CELL_AGE (a stalled or
+reconnecting camera) is labelled STALE rather than silently frozen;
+CameraDemand keeps every camera live while a multiview runs, so cells of
+cameras off air are not stale.
+"""
+
+import logging
+import math
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from background_cache import BackgroundCache
+from frame_pyramid import FramePyramid, half_size, reduce_half
+from layout_plan import FIT_COVER, LayoutPlan, TileSpec
+from pixel_format import YUV_FORMATS, camera_pixel_format, frame_shape, from_bgr, image_size
+
+logger = logging.getLogger(__name__)
+
+# Multiview outputs used when the multiview config has no 'outputs' section
+DEFAULT_MULTIVIEW_OUTPUTS = [{'type': 'preview', 'window_name': 'Multiview'}]
+
+# Compositor ticks per multiview frame. With every camera live a multiview
+# frame costs about four programme ticks (mostly memory traffic: reductions
+# of off-air cameras, cell copies and publishing the grid), so it is composed
+# this rarely to stay within 5% of the programme's own cost
+DEFAULT_MULTIVIEW_INTERVAL = 100
+
+# Ticks per multiview frame for canvases larger than LARGE_MULTIVIEW_PIXELS
+LARGE_MULTIVIEW_INTERVAL = 150
+LARGE_MULTIVIEW_PIXELS = 1280 * 720
+
+# Seconds without a new frame before a camera cell is labelled stale
+STALE_CELL_AGE = 2.0
+
+# Label text size and colour (luma for YUV canvases)
+LABEL_SCALE = 0.6
+LABEL_COLOR_BGR = (255, 255, 255)
+LABEL_COLOR_LUMA = 235
+
+
+class _CameraSource:
+    """
+    A camera as its multiview cell shows it, for the next-layout preview
+
+    Frames larger than the cell are handed out as the camera's shared
+    reduction; smaller frames (e.g. decoded at tile size) as they are.
+    """
+
+    def __init__(self, camera: Any, layout: LayoutPlan, cell: int, pyramid: FramePyramid):
+        self.camera = camera
+        self.layout = layout
+        self.cell = cell
+        self.pyramid = pyramid
+        self.pixel_format = camera_pixel_format(camera)
+
+    @property
+    def frame_sequence(self) -> Optional[int]:
+        return getattr(self.camera, 'frame_sequence', None)
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        sequence = self.frame_sequence
+        frame = self.camera.get_frame()
+        if frame is None:
+            return None
+        width, height = image_size(frame, self.pixel_format)
+        plan = self.layout.plan_for(self.cell, (height, width))
+        if plan is None or plan.size != self.pyramid.size or width <= plan.size[0]:
+            return frame
+        return self.pyramid.level(self.camera, sequence, frame, self.pixel_format, plan.source,
+                                  plan.interpolation)
+
+
+class _CanvasSource:
+    """A half-size canvas (programme or next layout) shown in a cell"""
+
+    def __init__(self, frame: np.ndarray, pixel_format: str):
+        self.frame = frame
+        self.pixel_format = pixel_format
+        self.frame_sequence = 0
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        return self.frame if self.frame_sequence else None
+
+
+def multiview_interval(width: int, height: int) -> int:
+    """
+    Default compositor ticks per multiview frame for a programme canvas
+
+    Args:
+        width: Programme canvas width
+        height: Programme canvas height
+
+    Returns:
+        DEFAULT_MULTIVIEW_INTERVAL, or LARGE_MULTIVIEW_INTERVAL for canvases
+        above 720p
+    """
+    if width * height > LARGE_MULTIVIEW_PIXELS:
+        return LARGE_MULTIVIEW_INTERVAL
+    return DEFAULT_MULTIVIEW_INTERVAL
+
+
+def scale_layout(layout: LayoutPlan, canvas_shape: Sequence[int]) -> LayoutPlan:
+    """
+    Scale a compiled layout to half size for previewing
+
+    Every tile is drawn with INTER_LINEAR: the preview is fed the cameras'
+    cell-size reductions, which some fits upscale, and INTER_AREA is slow
+    at upscaling.
+
+    Args:
+        layout: Layout compiled for the programme canvas
+        canvas_shape: Picture shape of the half-size canvas (height, width)
+
+    Returns:
+        The layout with every tile at half position and size
+    """
+    tiles = [TileSpec(tile.camera, (tile.pos[0] // 2, tile.pos[1] // 2),
+                      (max(1, tile.size[0] // 2), max(1, tile.size[1] // 2)), tile.fit)
+             for tile in layout.tiles]
+    return LayoutPlan(layout.name, {}, canvas_shape, layout.pixel_format, tiles=tiles,
+                      interpolation=cv2.INTER_LINEAR)
+
+
+class Multiview:
+    """
+    Grid of the programme, the next layout and every camera at half size
+
+    Cells are ordered programme, next layout, then cameras in list order,
+    filling rows left to right. Used from the compositor thread only.
+    """
+
+    def __init__(self, cameras: Sequence[Any], layouts: Dict[str, LayoutPlan],
+                 background: BackgroundCache, columns: Optional[int] = None,
+                 interval: Optional[int] = None):
+        """
+        Args:
+            cameras: Camera list indexed by the layouts' tiles
+            layouts: Compiled layouts by mode name (for the next-layout preview)
+            background: Programme background (the next-layout preview's backdrop)
+            columns: Grid columns (default: the smallest square grid that fits)
+            interval: Compositor ticks per multiview frame (default: see
+                multiview_interval())
+
+        Raises:
+            ValueError: If columns or interval is below 1
+        """
+        self.pixel_format = background.pixel_format
+        programme_width, programme_height = image_size(background.image, self.pixel_format)
+        if interval is None:
+            interval = multiview_interval(programme_width, programme_height)
+        if interval < 1:
+            raise ValueError(f"Multiview interval must be at least 1 tick, got {interval}")
+        cells = len(cameras) + 2
+        columns = columns or math.ceil(math.sqrt(cells))
+        if columns < 1:
+            raise ValueError(f"Multiview needs at least 1 column, got {columns}")
+        rows = math.ceil(cells / columns)
+
+        self.interval = interval
+        self.cell_size = half_size(programme_width, programme_height, self.pixel_format)
+        self.pyramid = FramePyramid(self.cell_size)
+        cell_width, cell_height = self.cell_size
+        cell_shape = frame_shape(cell_width, cell_height, self.pixel_format)
+        self.size = (columns * cell_width, rows * cell_height)
+
+        # Half-size canvases feeding the programme and next-layout cells
+        self._programme = _CanvasSource(np.empty(cell_shape, dtype=np.uint8), self.pixel_format)
+        self._next = _CanvasSource(np.empty(cell_shape, dtype=np.uint8), self.pixel_format)
+        self._next_background = reduce_half(background.image, self.pixel_format)
+        self._next_layouts = {name: scale_layout(layout, (cell_height, cell_width))
+                              for name, layout in layouts.items()}
+        self._next_layout: Optional[LayoutPlan] = None
+
+        tiles = [TileSpec(index, ((index % columns) * cell_width, (index // columns) * cell_height),
+                          self.cell_size, FIT_COVER)
+                 for index in range(cells)]
+        self.layout = LayoutPlan('multiview', {}, (self.size[1], self.size[0]), self.pixel_format, tiles=tiles)
+        self._sources: List[Any] = [self._programme, self._next] + list(cameras)
+        self._cameras = [_CameraSource(camera, self.layout, index + 2, self.pyramid)
+                         for index, camera in enumerate(cameras)]
+        self._labels = ['PGM', 'NEXT'] + [f"CAM {getattr(camera, 'camera_id', index)}"
+                                          for index, camera in enumerate(cameras)]
+        self._stale = [False] * len(self._sources)
+        self._seen: List[Any] = [None] * len(self._sources)
+        self._blank = from_bgr(np.zeros((self.size[1], self.size[0], 3), dtype=np.uint8), self.pixel_format)
+        self.canvas = self._blank.copy()
+        self.frames_composed = 0
+
+    def set_next_layout(self, mode: Optional[str]) -> None:
+        """
+        Preview a layout in the next-layout cell
+
+        Args:
+            mode: Mode name, or None for the plain background
+        """
+        self._next_layout = self._next_layouts.get(mode) if mode else None
+        if mode and self._next_layout is None:
+            logger.error(f"Unknown display mode for the multiview: {mode}")
+        self._labels[1] = f"NEXT {mode}" if mode else 'NEXT'
+        np.copyto(self._next.frame, self._next_background)
+        if self._next_layout is not None:
+            self._next_layout.invalidate()
+        self._next.frame_sequence += 1
+        self.layout.invalidate()
+
+    def update(self, programme: np.ndarray, programme_changed: bool) -> bool:
+        """
+        Bring the multiview canvas up to date
+
+        Args:
+            programme: Programme canvas
+            programme_changed: Whether the programme changed since the last update
+
+        Returns:
+            Whether the multiview canvas changed
+        """
+        if programme_changed:
+            reduce_half(programme, self.pixel_format, dst=self._programme.frame)
+            self._programme.frame_sequence += 1
+        if self._next_layout is not None:
+            if self._next_layout.update(self._next.frame, self._cameras, self._next_background):
+                self._next.frame_sequence += 1
+        self._mark_stale_cells()
+        if not self.layout.update(self.canvas, self._sources, self._blank, self.pyramid):
+            return False
+        self._draw_labels()
+        self.frames_composed += 1
+        return True
+
+    def _mark_stale_cells(self) -> None:
+        """Redraw camera cells whose frames went stale or fresh again"""
+        now = time.time()
+        for index in range(2, len(self._sources)):
+            source = self._sources[index]
+            # A camera with a frame newer than the last multiview frame is
+            # live, however long ago the multiview last read it; otherwise
+            # its last frame's age decides (never stale without a timestamp)
+            sequence = getattr(source, 'frame_sequence', None)
+            advanced = sequence is not None and sequence != self._seen[index]
+            self._seen[index] = sequence
+            timestamp = getattr(source, 'frame_timestamp', None)
+            stale = not advanced and bool(timestamp) and now - timestamp > STALE_CELL_AGE
+            if stale != self._stale[index]:
+                self._stale[index] = stale
+                self.layout.invalidate(index)
+
+    def _draw_labels(self) -> None:
+        """Name every cell in its top-left corner"""
+        if self.pixel_format in YUV_FORMATS:
+            image, color = self.canvas[:self.size[1]], LABEL_COLOR_LUMA
+        else:
+            image, color = self.canvas, LABEL_COLOR_BGR
+        for tile, label, stale in zip(self.layout.tiles, self._labels, self._stale):
+            x, y = tile.pos
+            if stale:
+                label = f"{label} STALE"
+            cv2.putText(image, label, (x + 8, y + 24), cv2.FONT_HERSHEY_SIMPLEX, LABEL_SCALE, color, 1,
+                        cv2.LINE_AA)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Multiview size, frames composed, stale camera cells and frame pyramid statistics"""
+        return {
+            'size': self.size,
+            'frames_composed': self.frames_composed,
+            'stale_cells': [label for label, stale in zip(self._labels, self._stale) if stale],
+            'pyramid': self.pyramid.get_stats(),
+        }
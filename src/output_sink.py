@@ -0,0 +1,313 @@
+"""
+Output Sinks for ISKCON-Broadcast
+
+This module defines where composited frames go. The compositor publishes
+every finished canvas to the sinks chosen in the ``outputs`` section of
+the mode config, each running on its own thread (see frame_fanout.py): a
+preview window, an encoder pipe streaming the programme, a file recorder,
+or a null sink that discards frames (the baseline for compositor
+benchmarks). Only the preview sink touches the GUI, so a
+headless deployment that leaves it out makes no imshow/waitKey calls and
+no BGR conversion at all. HighGUI is not thread-safe, so every preview
+window (programme and multiview alike) is driven from one GUI thread.
+"""
+
+import collections
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Deque, Dict, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+from pixel_format import to_bgr
+
+logger = logging.getLogger(__name__)
+
+# Default OpenCV window name
+DEFAULT_WINDOW_NAME = 'Display'
+
+# Outputs used when the mode config has no 'outputs' section
+DEFAULT_OUTPUTS = [{'type': 'preview'}]
+
+# Default frames queued for a sink before the oldest is dropped
+DEFAULT_QUEUE_SIZE = 3
+
+# Longest the GUI thread waits for window updates between waitKey pumps
+GUI_PUMP_INTERVAL = 0.01
+
+# Sink classes by config type name
+_SINK_TYPES: Dict[str, type] = {}
+
+
+def register_sink(name: str) -> Callable[[type], type]:
+    """
+    Decorator registering an OutputSink subclass under a config type name
+
+    Args:
+        name: Value of 'type' in an outputs entry
+    """
+    def decorator(sink_class: type) -> type:
+        if not issubclass(sink_class, OutputSink):
+            raise ValueError(f"Sink class {sink_class.__name__} must inherit from OutputSink")
+        _SINK_TYPES[name] = sink_class
+        return sink_class
+    return decorator
+
+
+def list_sink_types() -> List[str]:
+    """Names of the registered sink types"""
+    return sorted(_SINK_TYPES)
+
+
+def create_output_sinks(configs: Sequence[Dict[str, Any]], width: int, height: int, fps: float,
+                        pixel_format: str) -> List['OutputSink']:
+    """
+    Create the sinks listed in the 'outputs' section of the mode config
+
+    Args:
+        configs: One dict per sink with a 'type' and the sink's options
+        width: Canvas width
+        height: Canvas height
+        fps: Output frame rate
+        pixel_format: Canvas pixel format
+
+    Returns:
+        The sinks, in config order
+
+    Raises:
+        ValueError: If a sink type is unknown
+    """
+    sinks = []
+    for config in configs:
+        options = dict(config)
+        sink_type = options.pop('type', None)
+        sink_class = _SINK_TYPES.get(sink_type)
+        if sink_class is None:
+            raise ValueError(f"Unknown output type '{sink_type}', expected one of {list_sink_types()}")
+        sinks.append(sink_class(width=width, height=height, fps=fps, pixel_format=pixel_format, **options))
+        logger.info(f"Created {sink_type} output")
+    return sinks
+
+
+class OutputSink(ABC):
+    """
+    Base class for compositor outputs
+
+    Every method runs on the sink's own thread. ``write()`` gets each new
+    canvas as a read-only array shared with the other sinks; it stays
+    valid until the next ``write()``, so a sink may hold on to it (e.g. to
+    repeat it) without copying. ``repeat()`` covers ticks where nothing
+    changed (or that the frame clock dropped), and ``poll()`` is called
+    after each delivery and at least every few hundredths of a second.
+    A sink may block; only its own queue backs up, and the oldest entries
+    are dropped once ``queue_size`` are waiting.
+    """
+
+    def __init__(self, width: int, height: int, fps: float, pixel_format: str,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            width: Canvas width
+            height: Canvas height
+            fps: Output frame rate
+            pixel_format: Canvas pixel format
+            queue_size: Frames queued for this sink before the oldest is dropped
+
+        Raises:
+            ValueError: If queue_size is below 1
+        """
+        if queue_size < 1:
+            raise ValueError(f"Output queue size must be at least 1, got {queue_size}")
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.pixel_format = pixel_format
+        self.queue_size = queue_size
+
+    def start(self) -> None:
+        """Prepare the output before the first frame"""
+
+    @abstractmethod
+    def write(self, frame: np.ndarray) -> None:
+        """
+        Output a changed canvas
+
+        Args:
+            frame: Read-only canvas in the sink's pixel format
+        """
+
+    def repeat(self, count: int = 1) -> None:
+        """Output the previous frame again for ticks where nothing changed"""
+
+    def poll(self) -> bool:
+        """
+        Service the output once per tick
+
+        Returns:
+            True if the operator asked to quit
+        """
+        return False
+
+    def stop(self) -> None:
+        """Release the output after the last frame"""
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get output statistics"""
+        return {}
+
+
+class _HighGui:
+    """
+    The one thread calling OpenCV HighGUI
+
+    Preview sinks run on their own sink threads, so they hand their
+    imshow/destroyWindow calls to this thread, which runs them in order and
+    pumps waitKey for every window in between. A 'q' in any window sets
+    quit_requested. The thread runs while at least one preview is open.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._calls: Deque[List[Any]] = collections.deque()  # [function, args, done, error]
+        self._users = 0
+        self._thread: Optional[threading.Thread] = None
+        self.quit_requested = threading.Event()
+
+    def open(self) -> None:
+        """Register a preview window, starting the GUI thread for the first"""
+        with self._condition:
+            self._users += 1
+            if self._thread is None:
+                self.quit_requested.clear()
+                self._thread = threading.Thread(target=self._run, name="HighGUI", daemon=True)
+                self._thread.start()
+
+    def close(self) -> None:
+        """Unregister a preview window; the thread exits after the last"""
+        with self._condition:
+            self._users -= 1
+            self._condition.notify()
+
+    def call(self, function: Callable, *args) -> None:
+        """
+        Run a HighGUI function on the GUI thread and wait for it
+
+        Raises:
+            RuntimeError: If no preview window is open
+            Exception: Whatever the function raised
+        """
+        call = [function, args, threading.Event(), None]
+        with self._condition:
+            if self._thread is None:
+                raise RuntimeError("No preview window is open")
+            self._calls.append(call)
+            self._condition.notify()
+        call[2].wait()
+        if call[3] is not None:
+            raise call[3]
+
+    def _run(self) -> None:
+        pumping = True
+        while True:
+            with self._condition:
+                if not self._calls and self._users:
+                    self._condition.wait(GUI_PUMP_INTERVAL)
+                if not self._calls and not self._users:
+                    # Decided under the lock, so open() starts a new thread
+                    self._thread = None
+                    return
+                calls, self._calls = self._calls, collections.deque()
+            for call in calls:
+                try:
+                    call[0](*call[1])
+                except Exception as e:
+                    call[3] = e
+                call[2].set()
+            if not pumping:
+                continue
+            try:
+                if cv2.waitKey(1) == ord('q'):
+                    self.quit_requested.set()
+            except cv2.error as e:
+                # e.g. a headless OpenCV build; imshow reports its own errors
+                logger.error(f"Preview window event pump failed: {e}")
+                pumping = False
+
+
+_highgui = _HighGui()
+
+
+def _destroy_window(window_name: str) -> None:
+    try:
+        cv2.destroyWindow(window_name)
+    except cv2.error:
+        # The window was never shown
+        pass
+
+
+@register_sink('preview')
+class PreviewSink(OutputSink):
+    """OpenCV window showing the programme; 'q' in the window requests quit"""
+
+    def __init__(self, width: int, height: int, fps: float, pixel_format: str,
+                 window_name: str = DEFAULT_WINDOW_NAME, queue_size: int = 1):
+        """
+        Args:
+            width: Canvas width
+            height: Canvas height
+            fps: Output frame rate
+            pixel_format: Canvas pixel format
+            window_name: OpenCV window title
+            queue_size: Frames queued before the oldest is dropped (a
+                preview only needs the newest)
+        """
+        super().__init__(width, height, fps, pixel_format, queue_size)
+        self.window_name = window_name
+        self.frames_shown = 0
+        self._opened = False
+
+    def start(self) -> None:
+        _highgui.open()
+        self._opened = True
+
+    def write(self, frame: np.ndarray) -> None:
+        # imshow copies the image, so the frame may be recycled once it returns
+        _highgui.call(cv2.imshow, self.window_name, to_bgr(frame, self.pixel_format))
+        self.frames_shown += 1
+
+    def poll(self) -> bool:
+        return _highgui.quit_requested.is_set()
+
+    def stop(self) -> None:
+        if not self._opened:
+            return
+        self._opened = False
+        try:
+            _highgui.call(_destroy_window, self.window_name)
+        finally:
+            _highgui.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'window_name': self.window_name, 'frames_shown': self.frames_shown}
+
+
+@register_sink('null')
+class NullSink(OutputSink):
+    """Discards frames, counting them (baseline for compositor benchmarks)"""
+
+    def __init__(self, width: int, height: int, fps: float, pixel_format: str,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        super().__init__(width, height, fps, pixel_format, queue_size)
+        self.frames_written = 0
+        self.frames_repeated = 0
+
+    def write(self, frame: np.ndarray) -> None:
+        self.frames_written += 1
+
+    def repeat(self, count: int = 1) -> None:
+        self.frames_repeated += count
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'written': self.frames_written, 'repeated': self.frames_repeated}
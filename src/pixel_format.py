@@ -0,0 +1,177 @@
+"""
+Pixel Formats for ISKCON-Broadcast
+
+This module describes the frame layouts the compositor can work in. BGR
+is OpenCV's native format and what the preview window shows; I420 and
+NV12 are the 4:2:0 YUV layouts decoders produce and encoders consume
+(``-pix_fmt yuv420p`` / ``nv12``), at half the bytes per pixel of BGR.
+A YUV frame is one contiguous (height * 3 / 2, width) uint8 array; its
+planes are handed out as views, so tiles can be resized plane by plane
+straight into the canvas.
+"""
+
+from typing import Any, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Supported pixel formats
+PIXEL_FORMAT_BGR = 'bgr'
+PIXEL_FORMAT_I420 = 'i420'
+PIXEL_FORMAT_NV12 = 'nv12'
+PIXEL_FORMATS = (PIXEL_FORMAT_BGR, PIXEL_FORMAT_I420, PIXEL_FORMAT_NV12)
+YUV_FORMATS = (PIXEL_FORMAT_I420, PIXEL_FORMAT_NV12)
+
+# ffmpeg -pix_fmt name of each format
+FFMPEG_PIXEL_FORMATS = {
+    PIXEL_FORMAT_BGR: 'bgr24',
+    PIXEL_FORMAT_I420: 'yuv420p',
+    PIXEL_FORMAT_NV12: 'nv12',
+}
+
+# Canvas region as (rows, cols) slices
+Region = Tuple[slice, slice]
+
+
+def check_pixel_format(pixel_format: str) -> str:
+    """
+    Validate a pixel format name
+
+    Raises:
+        ValueError: If the format is not supported
+    """
+    if pixel_format not in PIXEL_FORMATS:
+        raise ValueError(f"Unknown pixel format '{pixel_format}', expected one of {PIXEL_FORMATS}")
+    return pixel_format
+
+
+def camera_pixel_format(camera: Any) -> str:
+    """Pixel format of a camera's frames (BGR unless it says otherwise)"""
+    pixel_format = getattr(camera, 'pixel_format', PIXEL_FORMAT_BGR)
+    return pixel_format if pixel_format in YUV_FORMATS else PIXEL_FORMAT_BGR
+
+
+def frame_shape(width: int, height: int, pixel_format: str) -> Tuple[int, ...]:
+    """Array shape of a width x height frame"""
+    if pixel_format in YUV_FORMATS:
+        return height * 3 // 2, width
+    return height, width, 3
+
+
+def image_size(frame: np.ndarray, pixel_format: str) -> Tuple[int, int]:
+    """(width, height) of the picture held in a frame array"""
+    if pixel_format in YUV_FORMATS:
+        return frame.shape[1], frame.shape[0] * 2 // 3
+    return frame.shape[1], frame.shape[0]
+
+
+def planes(frame: np.ndarray, pixel_format: str) -> List[np.ndarray]:
+    """
+    Split a frame into plane views
+
+    Returns:
+        [frame] for BGR, [Y, U, V] for I420 and [Y, UV] (two channels) for
+        NV12; chroma planes are half size in both directions
+    """
+    if pixel_format not in YUV_FORMATS:
+        return [frame]
+    width, height = image_size(frame, pixel_format)
+    luma = frame[:height]
+    if pixel_format == PIXEL_FORMAT_NV12:
+        return [luma, frame[height:].reshape(height // 2, width // 2, 2)]
+    # Chroma planes need not start on a row boundary (e.g. 270 rows high)
+    flat = frame.reshape(-1)
+    chroma = (height // 2) * (width // 2)
+    start = height * width
+    return [luma,
+            flat[start:start + chroma].reshape(height // 2, width // 2),
+            flat[start + chroma:start + 2 * chroma].reshape(height // 2, width // 2)]
+
+
+def plane_factors(pixel_format: str) -> Tuple[int, ...]:
+    """Subsampling factor of each plane"""
+    if pixel_format == PIXEL_FORMAT_I420:
+        return 1, 2, 2
+    if pixel_format == PIXEL_FORMAT_NV12:
+        return 1, 2
+    return (1,)
+
+
+def scale_region(region: Region, factor: int) -> Region:
+    """Map a luma region onto a plane subsampled by factor (rounding outwards)"""
+    if factor == 1:
+        return region
+    rows, cols = region
+    return (slice(rows.start // factor, -(-rows.stop // factor)),
+            slice(cols.start // factor, -(-cols.stop // factor)))
+
+
+def copy_region(dst: np.ndarray, src: np.ndarray, region: Region, pixel_format: str) -> None:
+    """Copy a luma-coordinate region between two frames of the same format"""
+    for factor, dst_plane, src_plane in zip(plane_factors(pixel_format), planes(dst, pixel_format),
+                                            planes(src, pixel_format)):
+        plane_region = scale_region(region, factor)
+        dst_plane[plane_region] = src_plane[plane_region]
+
+
+def paste(dst: np.ndarray, src: np.ndarray, pos: Tuple[int, int], pixel_format: str) -> None:
+    """
+    Copy a whole frame onto another at a position, clipped to the destination
+
+    Args:
+        dst: Destination frame
+        src: Frame to paste, in the same format
+        pos: (x, y) of the top-left corner (even for YUV formats)
+        pixel_format: Format of both frames
+    """
+    x, y = pos
+    dst_width, dst_height = image_size(dst, pixel_format)
+    src_width, src_height = image_size(src, pixel_format)
+    width, height = min(src_width, dst_width - x), min(src_height, dst_height - y)
+    if width <= 0 or height <= 0:
+        return
+    for factor, dst_plane, src_plane in zip(plane_factors(pixel_format), planes(dst, pixel_format),
+                                            planes(src, pixel_format)):
+        rows, cols = height // factor, width // factor
+        dst_plane[y // factor:y // factor + rows, x // factor:x // factor + cols] = src_plane[:rows, :cols]
+
+
+def from_bgr(image: np.ndarray, pixel_format: str, dst: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Convert a BGR image (even width and height for YUV) to a pixel format
+
+    Args:
+        image: BGR image
+        pixel_format: Target format
+        dst: Optional preallocated result
+
+    Returns:
+        The converted frame (the image itself for BGR without dst)
+    """
+    if pixel_format == PIXEL_FORMAT_BGR:
+        if dst is None:
+            return image
+        np.copyto(dst, image)
+        return dst
+    if pixel_format == PIXEL_FORMAT_I420:
+        return cv2.cvtColor(image, cv2.COLOR_BGR2YUV_I420, dst=dst)
+    # OpenCV has no BGR->NV12 conversion: convert to I420 and interleave the chroma
+    i420 = cv2.cvtColor(image, cv2.COLOR_BGR2YUV_I420)
+    height, width = image.shape[:2]
+    if dst is None:
+        dst = np.empty(frame_shape(width, height, PIXEL_FORMAT_NV12), dtype=np.uint8)
+    luma, u, v = planes(i420, PIXEL_FORMAT_I420)
+    dst_luma, uv = planes(dst, PIXEL_FORMAT_NV12)
+    dst_luma[:] = luma
+    uv[..., 0] = u
+    uv[..., 1] = v
+    return dst
+
+
+def to_bgr(frame: np.ndarray, pixel_format: str) -> np.ndarray:
+    """Convert a frame to BGR (e.g. for a preview window)"""
+    if pixel_format == PIXEL_FORMAT_I420:
+        return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_I420)
+    if pixel_format == PIXEL_FORMAT_NV12:
+        return cv2.cvtColor(frame, cv2.COLOR_YUV2BGR_NV12)
+    return frame
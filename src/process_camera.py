@@ -0,0 +1,560 @@
+"""
+Process-Isolated Camera for ISKCON-Broadcast
+
+This module runs any camera plugin in its own capture process, so RTSP
+decoding and colour conversion get a core of their own instead of sharing
+the main interpreter's GIL with the compositor. The child publishes frames
+into a SharedFrameRing that the main process maps as zero-copy numpy views;
+PTZ commands and demand changes travel over a multiprocessing connection.
+
+The child is started as ``python process_camera.py <address>`` rather than
+through multiprocessing's spawn, which would re-run video_stream.py's
+module-level setup in every capture process.
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import secrets
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from camera_interface import CameraInterface
+from shared_frame_ring import SharedFrameRing, DEFAULT_RING_SLOTS
+
+logger = logging.getLogger(__name__)
+
+# Capture backends selectable per camera with the capture_backend config key
+CAPTURE_BACKENDS = ('thread', 'process')
+
+# Longest the child waits for a frame from its camera before checking for
+# stop and its status report
+CAPTURE_WAIT_TIMEOUT = 0.1
+
+# Seconds between the child's connection status reports
+STATUS_INTERVAL = 1.0
+
+# Seconds to wait for a PTZ command to complete in the capture process
+PTZ_TIMEOUT = 10.0
+
+# Seconds stop() waits for the capture process before killing it
+STOP_TIMEOUT = 5.0
+
+
+class ProcessCamera(CameraInterface):
+    """
+    Camera plugin running in a separate capture process
+
+    get_frame() returns a read-only view into shared memory that stays
+    intact until the next get_frame() call - long enough to draw it, not to
+    keep it. Everything else mirrors the wrapped plugin.
+    """
+
+    def __init__(self, camera_type: str, camera_id: int, config: Dict[str, Any]):
+        """
+        Start the capture process for a camera
+
+        The process creates the plugin itself, so this returns immediately;
+        get_frame() returns None until the first frame arrives.
+
+        Args:
+            camera_type: Registered plugin type to run in the child
+            camera_id: Unique identifier for this camera
+            config: Camera configuration dictionary, additionally accepting:
+                - ring_slots: Shared memory frame slots (default 4)
+        """
+        super().__init__(camera_id, config)
+        self.camera_type = camera_type
+        self.ring_slots = config.get('ring_slots', DEFAULT_RING_SLOTS)
+        self.pixel_format = config.get('pixel_format', CameraInterface.pixel_format)
+        self._ring: Optional[SharedFrameRing] = None
+        self._ring_timestamp = 0.0
+        self._connected = False
+        self._failed = False
+        self._stopped = False
+        self._conn: Optional[Connection] = None
+        self._ready = threading.Event()
+        self._send_lock = threading.Lock()
+        self._pending: Dict[int, Future] = {}
+        self._requests = itertools.count()
+
+        authkey = secrets.token_bytes(16)
+        self._listener = Listener(authkey=authkey)
+        self._address = self._listener.address
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), str(self._address)],
+            stdin=subprocess.PIPE)
+        self._process.stdin.write(authkey.hex().encode() + b'\n')
+        self._process.stdin.close()
+
+        self._reader = threading.Thread(target=self._read_loop, name=f"ProcessCamera-{camera_id}-Reader",
+                                        daemon=True)
+        self._reader.start()
+        logger.info(f"Started capture process {self._process.pid} for {camera_type} camera {camera_id}")
+
+    @property
+    def pid(self) -> int:
+        """Process id of the capture process"""
+        return self._process.pid
+
+    # Main process side of the connection
+
+    def _send(self, *message) -> bool:
+        """Send a message to the child, False if it is not reachable yet"""
+        try:
+            with self._send_lock:
+                if not self._ready.is_set():
+                    return False
+                self._conn.send(message)
+            return True
+        except (OSError, EOFError, ValueError) as e:
+            logger.error(f"Camera {self.camera_id} capture process unreachable: {e}")
+            return False
+
+    def _read_loop(self) -> None:
+        """Accept the child's connection and dispatch its messages"""
+        try:
+            self._conn = self._listener.accept()
+        except Exception as e:
+            if not self._stopped:
+                logger.error(f"Camera {self.camera_id} capture process failed to connect: {e}")
+            self._failed = True
+            return
+        finally:
+            self._listener.close()
+
+        with self._send_lock:
+            self._conn.send(('start', self.camera_type, self.camera_id, self.config, self.ring_slots))
+            self._conn.send(('active', self.active))
+            if self.target_size:
+                self._conn.send(('target_size', self.target_size))
+            if self.running:
+                self._conn.send(('capture',))
+            # Set under the lock so capture_frames()/set_active() calls either
+            # went into the replay above or are sent after it
+            self._ready.set()
+
+        try:
+            while True:
+                message = self._conn.recv()
+                kind = message[0]
+                if kind == 'ring':
+                    self._attach_ring(message[1])
+                elif kind == 'ptz':
+                    future = self._pending.pop(message[1], None)
+                    if future is not None:
+                        future.set_result(message[2])
+                elif kind == 'connected':
+                    self._connected = message[1]
+                elif kind == 'error':
+                    logger.error(f"Camera {self.camera_id} capture process: {message[1]}")
+                    self._failed = True
+        except (EOFError, OSError):
+            if self.running:
+                logger.error(f"Camera {self.camera_id} capture process exited unexpectedly")
+        finally:
+            self._connected = False
+            self._ready.clear()
+            for request in list(self._pending):
+                future = self._pending.pop(request, None)
+                if future is not None and not future.done():
+                    future.set_result(None)
+
+    def _attach_ring(self, name: str) -> None:
+        """Switch to a ring the child created (first frame or new resolution)"""
+        try:
+            ring = SharedFrameRing.attach(name)
+        except (OSError, ValueError) as e:
+            logger.error(f"Camera {self.camera_id} cannot map frame ring {name}: {e}")
+            return
+        # The previous ring is unmapped once the compositor drops its last view
+        self._ring = ring
+        logger.info(f"Camera {self.camera_id} frame ring {name}: {ring.slots} x {ring.shape}")
+
+    def _submit_ptz(self, message: Tuple) -> Future:
+        """Send a PTZ request and get a future for its result"""
+        future: Future = Future()
+        if not self._ready.wait(PTZ_TIMEOUT):
+            future.set_result(None)
+            return future
+        request = next(self._requests)
+        self._pending[request] = future
+        if not self._send(message[0], request, *message[1:]):
+            self._pending.pop(request, None)
+            future.set_result(None)
+        return future
+
+    # CameraInterface
+
+    def get_frame(self) -> Optional[np.ndarray]:
+        """Get a zero-copy view of the newest frame, or None before the first one"""
+        ring = self._ring
+        if ring is None:
+            return None
+        frame, _, timestamp = ring.latest()
+        if frame is not None:
+            self._ring_timestamp = timestamp
+        return frame
+
+    @property
+    def frame_sequence(self) -> int:
+        """Sequence number of the newest frame in shared memory"""
+        ring = self._ring
+        return ring.sequence if ring is not None else 0
+
+    @property
+    def frame_timestamp(self) -> float:
+        """Capture time of the frame last returned by get_frame()"""
+        return self._ring_timestamp
+
+    def send_ptz_command(self, command: str, parameter: str, id: int = 0) -> bool:
+        """Run a PTZ command in the capture process"""
+        future = self._submit_ptz(('ptz', command, parameter, id))
+        try:
+            result = future.result(timeout=PTZ_TIMEOUT)
+        except TimeoutError:
+            result = None
+        if result is None:
+            logger.warning(f"Camera {self.camera_id} capture process did not run {command} {parameter}")
+            return False
+        return result
+
+    async def send_ptz_command_async(self, command: str, parameter: str, id: int = 0) -> bool:
+        """Run a PTZ command in the capture process without blocking the event loop"""
+        results = await self.send_ptz_commands_async([(command, parameter, id)])
+        return results[0]
+
+    async def send_ptz_commands_async(self, commands: List[Tuple[str, str, int]]) -> List[bool]:
+        """Run a PTZ command sequence in the capture process, keeping the plugin's batching"""
+        future = await asyncio.to_thread(self._submit_ptz, ('ptz_many', list(commands)))
+        try:
+            results = await asyncio.wait_for(asyncio.wrap_future(future), PTZ_TIMEOUT)
+        except asyncio.TimeoutError:
+            results = None
+        if results is None:
+            logger.warning(f"Camera {self.camera_id} capture process did not run {len(commands)} command(s)")
+            return [False] * len(commands)
+        return results
+
+    def capture_frames(self) -> None:
+        """Start capture in the child (now, or as soon as it connects)"""
+        if self.running:
+            logger.warning(f"Camera {self.camera_id} is already capturing frames")
+            return
+        self.running = True
+        self._send('capture')
+
+    def set_active(self, active: bool) -> None:
+        """Forward demand changes to the capture process"""
+        super().set_active(active)
+        self._send('active', active)
+
+    def flush(self) -> None:
+        """Forward a flush to the capture process"""
+        self._send('flush')
+
+    def set_target_size(self, size: Optional[Tuple[int, int]]) -> None:
+        """Forward the frame size hint to the capture process"""
+        super().set_target_size(size)
+        self._send('target_size', self.target_size)
+
+    def stop(self) -> None:
+        """Stop the capture process and unmap its frames"""
+        self.running = False
+        self._send('stop')
+        try:
+            self._process.wait(timeout=STOP_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            logger.warning(f"Camera {self.camera_id} capture process did not stop gracefully, killing it")
+            self._process.kill()
+            self._process.wait()
+        self._stopped = True
+        if self._conn is not None:
+            self._conn.close()
+        else:
+            self._wake_listener()
+        self._reader.join(timeout=STOP_TIMEOUT)
+        self._listener.close()
+        ring, self._ring = self._ring, None
+        if ring is not None:
+            ring.close()
+        logger.info(f"Camera {self.camera_id} capture process stopped")
+
+    def _wake_listener(self) -> None:
+        """
+        Wake _read_loop if the child never connected
+
+        Closing a listener does not interrupt an accept() blocked in another
+        thread, so connect to it without the authkey: accept() fails the
+        handshake and _read_loop returns.
+        """
+        try:
+            Client(self._address).close()
+        except OSError:
+            pass  # accept() already returned and the listener is closed
+
+    def is_connected(self) -> bool:
+        """Check the child's last connection report (False if it died)"""
+        return self._connected and not self._failed and self._process.poll() is None
+
+    def get_camera_info(self) -> Dict[str, Any]:
+        """Get camera information plus the capture process and ring state"""
+        info = super().get_camera_info()
+        ring = self._ring
+        info['type'] = self.camera_type
+        info['capture_backend'] = 'process'
+        info['pid'] = self._process.pid
+        info['ring'] = {'name': ring.name, 'slots': ring.slots, 'shape': ring.shape} if ring else None
+        return info
+
+
+# Capture process side
+
+class _RingFrameBuffer:
+    """
+    Stand-in for a plugin's TripleBuffer that decodes into the frame ring
+
+    ``writable()`` hands out the ring's next slot, so the plugin fills
+    shared memory directly and ``publish()`` only flips the slot's seqlock.
+    Frames the plugin allocated itself (before the ring is sized, or after a
+    resolution change) are copied in, replacing the ring if their shape
+    differs. The capture process only reads frames back to pace plugins
+    that decode on demand, so ``latest()`` returns the last published slot
+    without holding it.
+    """
+
+    def __init__(self, slots: int, on_ring: Callable[[SharedFrameRing], None]):
+        """
+        Args:
+            slots: Frame slots of each ring
+            on_ring: Called with every new ring, before its first frame
+        """
+        self.slots = slots
+        self.ring: Optional[SharedFrameRing] = None
+        self._on_ring = on_ring
+        self._frame: Optional[np.ndarray] = None
+        self._sequence = 0
+        self._timestamp = 0.0
+        self._published = threading.Condition()
+        self._rings = 0
+        self._in_place = 0
+
+    @property
+    def sequence(self) -> int:
+        """Frames published so far (keeps counting across rings)"""
+        return self._sequence
+
+    @property
+    def read_timestamp(self) -> float:
+        """Capture time of the last published frame"""
+        return self._timestamp
+
+    def _resize(self, shape: Tuple[int, ...]) -> None:
+        if self.ring is not None and self.ring.shape == tuple(shape):
+            return
+        previous = self.ring
+        self.ring = SharedFrameRing.create(tuple(shape), self.slots)
+        self._rings += 1
+        self._on_ring(self.ring)
+        if previous is not None:
+            previous.close()
+
+    def writable(self, shape: Optional[Tuple[int, ...]] = None,
+                 dtype=np.uint8) -> Optional[np.ndarray]:
+        """Get the ring slot to fill next, (re)creating the ring for a new shape"""
+        if shape is not None:
+            self._resize(shape)
+        return self.ring.writable() if self.ring is not None else None
+
+    def preallocate(self, shape: Tuple[int, ...], dtype=np.uint8) -> None:
+        """Create the ring for frames of this shape"""
+        self._resize(shape)
+
+    def publish(self, frame: Optional[np.ndarray] = None,
+                timestamp: Optional[float] = None) -> int:
+        """Publish the filled slot, copying the frame in if it is not the slot"""
+        if timestamp is None:
+            timestamp = time.time()
+        if frame is None and self.ring is None:
+            return self._sequence
+        if frame is not None:
+            self._resize(frame.shape)
+            slot = self.ring.writable()
+            if frame is slot:
+                self._in_place += 1
+            else:
+                np.copyto(slot, frame)
+        self._frame = self.ring.writable()
+        self.ring.publish(timestamp)
+        with self._published:
+            self._sequence += 1
+            self._timestamp = timestamp
+            self._published.notify_all()
+            return self._sequence
+
+    def wait_for_frame(self, sequence: int, timeout: Optional[float] = None) -> bool:
+        """Block until a frame newer than ``sequence`` has been published"""
+        with self._published:
+            return self._published.wait_for(lambda: self._sequence != sequence, timeout)
+
+    def latest(self) -> Tuple[Optional[np.ndarray], int, float]:
+        """Get the last published slot (not held: only for pacing the plugin)"""
+        return self._frame, self._sequence, self._timestamp
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get ring allocations, frames decoded in place and the frame count"""
+        return {
+            'allocations': self._rings,
+            'reused': self._in_place,
+            'dropped': 0,
+            'sequence': self._sequence,
+        }
+
+    def close(self) -> None:
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        self._frame = None
+
+
+
+class _CaptureProcess:
+    """Runs one camera plugin and publishes its frames into shared memory"""
+
+    def __init__(self, conn: Connection):
+        self.conn = conn
+        self.camera: Optional[CameraInterface] = None
+        self.frames: Optional[_RingFrameBuffer] = None
+        self.capture = threading.Event()
+        self.stopped = threading.Event()
+        self._send_lock = threading.Lock()
+
+    def send(self, *message) -> None:
+        with self._send_lock:
+            self.conn.send(message)
+
+    def start(self, camera_type: str, camera_id: int, config: Dict[str, Any], ring_slots: int) -> bool:
+        """Create the plugin; reports the error to the main process on failure"""
+        import cameras  # noqa: F401 - registers the camera plugins
+        from camera_registry import CameraRegistry
+
+        try:
+            self.camera = CameraRegistry.create_camera(camera_type, camera_id, config)
+        except Exception as e:
+            self.send('error', f"Failed to create {camera_type} camera {camera_id}: {e}")
+            return False
+        # The plugin decodes straight into shared memory
+        self.frames = _RingFrameBuffer(ring_slots, lambda ring: self.send('ring', ring.name))
+        self.camera.frame_buffer = self.frames
+        return True
+
+    def handle(self, message: Tuple) -> None:
+        """Apply one command from the main process (runs on the command thread)"""
+        kind = message[0]
+        camera = self.camera
+        if kind == 'capture':
+            self.capture.set()
+        elif kind == 'active':
+            camera.set_active(message[1])
+        elif kind == 'flush':
+            camera.flush()
+        elif kind == 'target_size':
+            camera.set_target_size(message[1])
+        elif kind == 'ptz':
+            _, request, command, parameter, id = message
+            try:
+                result = camera.send_ptz_command(command, parameter, id)
+            except Exception as e:
+                logger.error(f"PTZ command {command} {parameter} failed: {e}")
+                result = False
+            self.send('ptz', request, result)
+        elif kind == 'ptz_many':
+            _, request, commands = message
+            try:
+                results = asyncio.run(camera.send_ptz_commands_async(commands))
+            except Exception as e:
+                logger.error(f"PTZ command sequence failed: {e}")
+                results = [False] * len(commands)
+            self.send('ptz', request, results)
+        elif kind == 'stop':
+            self.stopped.set()
+
+    def command_loop(self) -> None:
+        """Serve commands until the main process says stop or goes away"""
+        try:
+            while not self.stopped.is_set():
+                message = self.conn.recv()
+                if message[0] in ('ptz', 'ptz_many'):
+                    # Keep serving demand changes while a move is in flight
+                    threading.Thread(target=self.handle, args=(message,), daemon=True).start()
+                else:
+                    self.handle(message)
+        except (EOFError, OSError):
+            pass
+        self.stopped.set()
+
+    def capture_loop(self) -> None:
+        """Report connection changes and keep on-demand plugins decoding"""
+        while not self.capture.wait(0.1):
+            if self.stopped.is_set():
+                return
+        camera = self.camera
+        camera.capture_frames()
+        last_sequence = 0
+        connected = None
+        next_status = 0.0
+        while not self.stopped.is_set():
+            now = time.monotonic()
+            if now >= next_status:
+                state = camera.is_connected()
+                if state != connected:
+                    connected = state
+                    self.send('connected', state)
+                next_status = now + STATUS_INTERVAL
+
+            # Woken by the plugin's publish instead of polling its sequence;
+            # the frame is already in the ring, but reading it is what asks
+            # e.g. an IP camera to decode the next one
+            if not self.frames.wait_for_frame(last_sequence, CAPTURE_WAIT_TIMEOUT):
+                continue
+            last_sequence = camera.frame_sequence
+            camera.get_frame()
+
+    def close(self) -> None:
+        if self.camera is not None:
+            self.camera.stop()
+        if self.frames is not None:
+            self.frames.close()
+
+
+def _child_main(address: str) -> int:
+    """Entry point of the capture process"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    authkey = bytes.fromhex(sys.stdin.readline().strip())
+    conn = Client(address, authkey=authkey)
+    message = conn.recv()
+    if message[0] != 'start':
+        return 1
+
+    worker = _CaptureProcess(conn)
+    if not worker.start(*message[1:]):
+        return 1
+    threading.Thread(target=worker.command_loop, name="CaptureCommands", daemon=True).start()
+    try:
+        worker.capture_loop()
+    finally:
+        worker.close()
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_child_main(sys.argv[1]))
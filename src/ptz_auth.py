@@ -0,0 +1,198 @@
+"""
+PTZ Authentication for ISKCON-Broadcast
+
+This module keeps the login token for a camera's ``api.cgi`` valid. The
+token is cached together with its lease time, refreshed in the background
+before it expires, and re-acquired on demand when the camera rejects it,
+so the first PTZ move after a lease runs out does not fail.
+"""
+
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# api.cgi rspCode for a missing or expired token ("please login first")
+RSP_CODE_LOGIN_REQUIRED = -6
+
+# Lease assumed for a token obtained elsewhere (camera firmware default)
+DEFAULT_TOKEN_LEASE = 3600.0
+
+# Seconds before expiry that the background refresh logs in again
+DEFAULT_REFRESH_MARGIN = 60.0
+
+# Seconds between background retries after a failed refresh
+REFRESH_RETRY_DELAY = 5.0
+
+# Seconds to wait for a login response
+DEFAULT_LOGIN_TIMEOUT = 10
+
+
+def is_login_required(entry: Dict[str, Any]) -> bool:
+    """Check whether an api.cgi response entry rejected the token"""
+    return entry.get('code', 0) != 0 and entry.get('error', {}).get('rspCode') == RSP_CODE_LOGIN_REQUIRED
+
+
+class TokenManager:
+    """
+    Cached api.cgi login token with lease tracking
+
+    ``get_token()`` is safe to call from any thread and logs in only when
+    the cached token is missing or expired. ``start()`` runs a daemon
+    thread that renews the token shortly before its lease ends; the old
+    token stays in use until the new one arrives, so callers never wait on
+    a proactive refresh.
+    """
+
+    def __init__(self, base_url: str, username: str, password: str, camera_id: int = 0,
+                 token: Optional[str] = None, lease: float = DEFAULT_TOKEN_LEASE,
+                 refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 timeout: float = DEFAULT_LOGIN_TIMEOUT, verify: bool = False):
+        """
+        Args:
+            base_url: URL of the camera's api.cgi (e.g. "https://10.0.0.5/api.cgi")
+            username: Camera login user
+            password: Camera login password
+            camera_id: Camera identifier used in log messages
+            token: Already obtained token to seed the cache with, if any
+            lease: Remaining lease of the seed token in seconds
+            refresh_margin: Seconds before expiry to refresh in the background
+            timeout: Login request timeout in seconds
+            verify: Verify TLS certificates (cameras use self-signed ones)
+        """
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.camera_id = camera_id
+        self.refresh_margin = refresh_margin
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.verify = verify
+
+        self._lock = threading.Lock()
+        self._login_lock = threading.Lock()
+        self._token = token
+        self._lease = lease
+        self._expires_at = time.monotonic() + lease if token else 0.0
+        self._logins = 0
+        self._login_failures = 0
+        self._stop_requested = threading.Event()
+        self._refresh_thread = None
+
+    @property
+    def token(self) -> Optional[str]:
+        """Cached token, which may have expired"""
+        return self._token
+
+    def is_valid(self) -> bool:
+        """Check whether the cached token is within its lease"""
+        return self._token is not None and time.monotonic() < self._expires_at
+
+    def get_token(self) -> Optional[str]:
+        """
+        Get a valid token, logging in if the cached one has expired
+
+        Returns:
+            Token, or None if login failed
+        """
+        if self.is_valid():
+            return self._token
+        with self._login_lock:
+            if self.is_valid():
+                return self._token
+            return self._login()
+
+    def renew(self, rejected: Optional[str] = None) -> Optional[str]:
+        """
+        Log in again after the camera rejected a token
+
+        Concurrent callers holding the same rejected token share one login.
+
+        Args:
+            rejected: Token the camera refused
+
+        Returns:
+            New token, or None if login failed
+        """
+        with self._login_lock:
+            if self._token != rejected and self.is_valid():
+                return self._token
+            return self._login()
+
+    def _login(self) -> Optional[str]:
+        """POST a Login request and cache the result; caller holds the login lock"""
+        url = f"{self.base_url}?cmd=Login"
+        payload = [{
+            "cmd": "Login",
+            "param": {
+                "User": {
+                    "Version": "0",
+                    "userName": self.username,
+                    "password": self.password
+                }
+            }
+        }]
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+            token = response.json()[0]["value"]["Token"]
+            name, lease = token["name"], float(token.get("leaseTime", DEFAULT_TOKEN_LEASE))
+        except (requests.RequestException, ValueError, LookupError, TypeError) as e:
+            with self._lock:
+                self._login_failures += 1
+            logger.error(f"Login to camera {self.camera_id} failed: {e}")
+            return None
+
+        with self._lock:
+            self._token = name
+            self._lease = lease
+            self._expires_at = time.monotonic() + lease
+            self._logins += 1
+        logger.info(f"Token obtained for camera {self.camera_id} (lease {lease:.0f}s)")
+        return name
+
+    def _refresh_delay(self) -> float:
+        """Seconds until the background thread should renew the token"""
+        if self._token is None:
+            return 0.0
+        margin = min(self.refresh_margin, self._lease / 2)
+        return max(0.0, self._expires_at - margin - time.monotonic())
+
+    def _refresh_loop(self) -> None:
+        """Renew the token shortly before each lease runs out"""
+        while not self._stop_requested.wait(self._refresh_delay()):
+            with self._login_lock:
+                if self._login() is not None:
+                    continue
+            if self._stop_requested.wait(REFRESH_RETRY_DELAY):
+                break
+
+    def start(self) -> None:
+        """Start the background refresh thread"""
+        if self._refresh_thread and self._refresh_thread.is_alive():
+            return
+        self._stop_requested.clear()
+        self._refresh_thread = threading.Thread(
+            target=self._refresh_loop,
+            name=f"TokenRefresh-{self.camera_id}",
+            daemon=True
+        )
+        self._refresh_thread.start()
+
+    def stop(self) -> None:
+        """Stop the background refresh thread"""
+        self._stop_requested.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get login counters and the remaining lease"""
+        with self._lock:
+            return {
+                'logins': self._logins,
+                'login_failures': self._login_failures,
+                'valid': self.is_valid(),
+                'expires_in': max(0.0, self._expires_at - time.monotonic()) if self._token else None,
+            }
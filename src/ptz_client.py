@@ -0,0 +1,358 @@
+"""
+Asynchronous PTZ Client for ISKCON-Broadcast
+
+This module provides the HTTP transport for PTZ commands to IP cameras'
+``api.cgi`` endpoint. Requests run on a small per-camera worker pool with a
+keep-alive connection pool, so the asyncio loop (and with it the display)
+never blocks on a camera round-trip, and commands to one camera are sent in
+the order they were issued.
+
+Commands that queue up while a request is in flight are coalesced (redundant
+Stops and repeated identical commands are dropped) and sent together as one
+JSON array request, which api.cgi accepts.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ptz_auth import is_login_required
+
+logger = logging.getLogger(__name__)
+
+# PtzCtrl operations that take a speed parameter
+PTZ_MOVE_OPS = ["Left", "Right", "Up", "Down", "ZoomInc", "ZoomDec",
+                "LeftUp", "LeftDown", "RightUp", "RightDown"]
+
+# Operation groups: a Stop between two moves of the same group is redundant
+# because the camera switches direction on the new command directly
+PTZ_PAN_TILT_OPS = {"Left", "Right", "Up", "Down", "LeftUp", "LeftDown", "RightUp", "RightDown"}
+PTZ_ZOOM_OPS = {"ZoomInc", "ZoomDec"}
+
+# Maximum commands combined into one api.cgi request
+DEFAULT_PTZ_MAX_BATCH = 8
+
+# Default PTZ speed used by the camera API
+DEFAULT_PTZ_SPEED = 32
+
+# Seconds to wait for a camera HTTP response
+DEFAULT_PTZ_TIMEOUT = 5
+
+
+def build_ptz_payload(command: str, parameter: str, id: int = 0,
+                      speed: int = DEFAULT_PTZ_SPEED) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build the api.cgi JSON body for a PTZ command
+
+    Args:
+        command: Command type (only "PtzCtrl" is supported)
+        parameter: PTZ operation (e.g. "Left", "Stop", "ToPos")
+        id: Preset id for "ToPos"
+        speed: Move speed
+
+    Returns:
+        JSON array for the request body, or None if the command is invalid
+    """
+    if command != "PtzCtrl":
+        logger.warning(f"Only PtzCtrl commands handled currently")
+        return None
+    if parameter in PTZ_MOVE_OPS:
+        return [{"cmd": command, "param": {"channel": 0, "op": parameter, "speed": speed}}]
+    if parameter == "ToPos":
+        return [{"cmd": command, "param": {"channel": 0, "op": parameter, "id": id, "speed": speed}}]
+    if parameter == "Stop":
+        return [{"cmd": command, "param": {"channel": 0, "op": parameter}}]
+    logger.warning(f"Invalid parameter for command {command}: {parameter}")
+    return None
+
+
+def _op_group(op: Optional[str]) -> Optional[str]:
+    """Get the motion group of a PTZ operation"""
+    if op in PTZ_PAN_TILT_OPS:
+        return 'pan_tilt'
+    if op in PTZ_ZOOM_OPS:
+        return 'zoom'
+    return None
+
+
+def coalesce_ptz_commands(entries: Sequence[Dict[str, Any]], last_entry: Optional[Dict[str, Any]] = None,
+                          last_move_op: Optional[str] = None) -> List[bool]:
+    """
+    Decide which queued PtzCtrl entries are redundant
+
+    A Stop is redundant when the next command moves in the same group
+    (pan/tilt or zoom) as the move it would stop. A command identical to the
+    previous effective command (e.g. a repeated ToPos to the same preset) is
+    redundant.
+
+    Args:
+        entries: Queued payload entries ({"cmd": ..., "param": {...}}) in order
+        last_entry: Last entry already sent to the camera, if known
+        last_move_op: Last non-Stop operation already sent, if known
+
+    Returns:
+        One flag per entry, True if the entry must be sent
+    """
+    keep = [True] * len(entries)
+    previous = last_entry
+    move_op = last_move_op
+    for i, entry in enumerate(entries):
+        op = entry['param'].get('op')
+        if previous is not None and entry == previous:
+            keep[i] = False
+            continue
+        if op == "Stop" and i + 1 < len(entries):
+            next_op = entries[i + 1]['param'].get('op')
+            group = _op_group(move_op)
+            if group is not None and group == _op_group(next_op):
+                keep[i] = False
+                continue
+        previous = entry
+        if op != "Stop":
+            move_op = op
+    return keep
+
+
+class AsyncPTZClient:
+    """
+    Pooled, non-blocking PTZ transport for one camera
+
+    ``max_concurrency`` bounds how many requests are in flight to the camera
+    at once. With the default of 1, commands are strictly ordered (a Stop
+    can never overtake the move it ends) and everything queued behind an
+    in-flight request goes out as one coalesced batch.
+    """
+
+    def __init__(self, base_url: str, token_getter: Callable[[], Optional[str]],
+                 camera_id: int = 0, max_concurrency: int = 1,
+                 timeout: float = DEFAULT_PTZ_TIMEOUT, verify: bool = False,
+                 max_batch: int = DEFAULT_PTZ_MAX_BATCH,
+                 token_refresher: Optional[Callable[[Optional[str]], Optional[str]]] = None):
+        """
+        Args:
+            base_url: URL of the camera's api.cgi (e.g. "https://10.0.0.5/api.cgi")
+            token_getter: Returns the current login token
+            camera_id: Camera identifier used in log messages
+            max_concurrency: Maximum requests in flight to this camera
+            timeout: Request timeout in seconds
+            verify: Verify TLS certificates (cameras use self-signed ones)
+            max_batch: Maximum commands per request (1 disables batching)
+            token_refresher: Called with a token the camera rejected; returns
+                a fresh token, after which the request is retried once
+        """
+        self.base_url = base_url
+        self.token_getter = token_getter
+        self.camera_id = camera_id
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_batch = max(1, max_batch)
+        self.token_refresher = token_refresher
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix=f"PTZ-{camera_id}")
+        self._pending: deque = deque()
+        self._last_entry = None
+        self._last_move_op = None
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._commands = 0
+        self._coalesced = 0
+        self._failed = 0
+        self._relogins = 0
+        self._in_flight = 0
+        self._total_latency = 0.0
+        self._last_latency = None
+
+    def _request(self, command: str, payload: List[Dict[str, Any]],
+                 token: Optional[str]) -> Tuple[List[bool], bool]:
+        """
+        One blocking HTTP POST on a pooled connection
+
+        Returns:
+            (success flag per payload entry, True if the token was rejected)
+        """
+        url = f"{self.base_url}?cmd={command}&token={token}"
+        try:
+            response = self.session.post(url, json=payload, timeout=self.timeout)
+            if response.status_code != 200:
+                return [False] * len(payload), False
+            body = response.json()
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"PTZ request to camera {self.camera_id} failed: {e}")
+            return [False] * len(payload), False
+        entries = [body[i] if i < len(body) else {} for i in range(len(payload))]
+        results = [bool(entry) and entry.get('code', 0) == 0 for entry in entries]
+        return results, any(is_login_required(entry) for entry in entries)
+
+    def _post(self, command: str, payload: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Send a request on the worker pool, re-logging in once if the token
+        was rejected
+
+        Returns:
+            Success flag per payload entry
+        """
+        with self._lock:
+            self._in_flight += 1
+        started = time.monotonic()
+        token = self.token_getter()
+        results, rejected = self._request(command, payload, token)
+        if rejected and self.token_refresher is not None:
+            logger.warning(f"Camera {self.camera_id} rejected the PTZ token, logging in again")
+            token = self.token_refresher(token)
+            if token is not None:
+                with self._lock:
+                    self._relogins += 1
+                results, _ = self._request(command, payload, token)
+        latency = time.monotonic() - started
+
+        with self._lock:
+            self._in_flight -= 1
+            self._requests += 1
+            self._commands += len(payload)
+            self._last_latency = latency
+            self._total_latency += latency
+            self._failed += results.count(False)
+        if not all(results):
+            failed_ops = [p['param'].get('op') for p, ok in zip(payload, results) if not ok]
+            logger.error(f"Failed to send {command} {failed_ops} command to camera {self.camera_id}.")
+        return results
+
+    def _drain(self) -> None:
+        """Send everything queued so far as one coalesced batch"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch = [self._pending.popleft() for _ in range(min(self.max_batch, len(self._pending)))]
+            entries = [entry for _, entry, _ in batch]
+            keep = coalesce_ptz_commands(entries, self._last_entry, self._last_move_op)
+            to_send = [item for item, send in zip(batch, keep) if send]
+            self._coalesced += len(batch) - len(to_send)
+            # Assume success so later batches coalesce against this one
+            for _, entry, _ in to_send:
+                self._last_entry = entry
+                if entry['param'].get('op') != "Stop":
+                    self._last_move_op = entry['param'].get('op')
+
+        for (_, _, future), send in zip(batch, keep):
+            if not send:
+                future.set_result(True)  # Superseded by a later command
+        if not to_send:
+            return
+
+        results = self._post(to_send[0][0], [entry for _, entry, _ in to_send])
+        if not all(results):
+            # Camera state unknown - never coalesce against a failed command
+            with self._lock:
+                self._last_entry = None
+                self._last_move_op = None
+        for (_, _, future), ok in zip(to_send, results):
+            future.set_result(ok)
+
+    def submit_many(self, commands: Sequence[Tuple[str, str, int]],
+                    speed: int = DEFAULT_PTZ_SPEED) -> List[Optional[Future]]:
+        """
+        Queue several PTZ commands atomically, so they share one request
+
+        Args:
+            commands: (command, parameter, id) tuples in send order
+            speed: Move speed
+
+        Returns:
+            One future per command resolving to True on success (or when the
+            command was coalesced away), or None for invalid commands
+        """
+        futures = []
+        with self._lock:
+            for command, parameter, id in commands:
+                payload = build_ptz_payload(command, parameter, id, speed)
+                if payload is None:
+                    futures.append(None)
+                    continue
+                future = Future()
+                self._pending.append((command, payload[0], future))
+                futures.append(future)
+        for future in futures:
+            if future is not None:
+                self._executor.submit(self._drain)
+        return futures
+
+    def submit(self, command: str, parameter: str, id: int = 0, speed: int = DEFAULT_PTZ_SPEED):
+        """
+        Queue a PTZ command on the worker pool
+
+        Returns:
+            concurrent.futures.Future resolving to True on success, or None
+            if the command is invalid
+        """
+        return self.submit_many([(command, parameter, id)], speed)[0]
+
+    async def send(self, command: str, parameter: str, id: int = 0,
+                   speed: int = DEFAULT_PTZ_SPEED) -> bool:
+        """
+        Send a PTZ command without blocking the event loop
+
+        Returns:
+            True if the camera accepted the command
+        """
+        future = self.submit(command, parameter, id, speed)
+        if future is None:
+            return False
+        return await asyncio.wrap_future(future)
+
+    async def send_many(self, commands: Sequence[Tuple[str, str, int]],
+                        speed: int = DEFAULT_PTZ_SPEED) -> List[bool]:
+        """
+        Send several PTZ commands as one coalesced pipeline step
+
+        Returns:
+            Success flag per command
+        """
+        futures = self.submit_many(commands, speed)
+        return [await asyncio.wrap_future(future) if future is not None else False
+                for future in futures]
+
+    def send_sync(self, command: str, parameter: str, id: int = 0,
+                  speed: int = DEFAULT_PTZ_SPEED) -> bool:
+        """
+        Send a PTZ command and wait for the result
+
+        Uses the same worker pool as send(), so ordering with queued async
+        commands is preserved.
+        """
+        future = self.submit(command, parameter, id, speed)
+        if future is None:
+            return False
+        return future.result()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get request counters and latencies for this camera"""
+        with self._lock:
+            return {
+                'requests': self._requests,
+                'commands': self._commands,
+                'coalesced': self._coalesced,
+                'failed': self._failed,
+                'relogins': self._relogins,
+                'in_flight': self._in_flight,
+                'last_latency': self._last_latency,
+                'mean_latency': self._total_latency / self._requests if self._requests else None,
+            }
+
+    def close(self) -> None:
+        """Wait for queued commands, then close pooled connections"""
+        self._executor.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,160 @@
+"""
+PTZ Move Scheduler for ISKCON-Broadcast
+
+This module runs the ``camera_move`` actions from orchestration.yaml. Each
+camera has its own queue and worker, so choreographed moves on different
+cameras run in parallel while moves on the same camera stay in order.
+
+Moves are timed against ``time.monotonic()`` deadlines. The scheduler
+measures each camera's command round-trip time and sends the Stop early by
+the expected one-way delay, so the camera moves for the requested duration
+rather than duration plus HTTP latency.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from camera_interface import CameraInterface
+
+logger = logging.getLogger(__name__)
+
+# Command ending a timed move
+STOP_COMMAND = ("PtzCtrl", "Stop", 0)
+
+# Weight of the newest sample in each camera's smoothed round-trip time
+RTT_SMOOTHING = 0.25
+
+
+class PTZScheduler:
+    """Per-camera queues of camera_move tasks"""
+
+    def __init__(self, cameras: List[CameraInterface]):
+        """
+        Args:
+            cameras: Camera list indexed by the tasks' ``camera`` field
+        """
+        self.cameras = cameras
+        self._queues: Dict[int, Deque[Dict[str, Any]]] = {}
+        self._rtt: Dict[int, float] = {}
+        self._timing: Dict[int, Dict[str, Any]] = {}
+
+    def enqueue(self, task: Dict[str, Any]) -> None:
+        """
+        Queue a camera_move action on its camera's queue
+
+        Args:
+            task: camera_move action with type, duration and optional camera
+                (default 0) and marker (preset id for ToPos)
+        """
+        index = task.get('camera', 0)
+        self._queues.setdefault(index, deque()).append(task)
+
+    def pending(self) -> List[Dict[str, Any]]:
+        """Get a copy of all queued tasks"""
+        return [task for queue in self._queues.values() for task in queue]
+
+    def __len__(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    @staticmethod
+    def _start_command(task: Dict[str, Any]) -> Tuple[str, str, int]:
+        """PTZ command that starts a camera_move task"""
+        return ("PtzCtrl", task['type'], task.get('marker', 0))
+
+    def rtt(self, index: int) -> Optional[float]:
+        """Smoothed PTZ command round-trip time of a camera, if measured"""
+        return self._rtt.get(index)
+
+    def get_stats(self) -> Dict[int, Dict[str, Any]]:
+        """
+        Get move timing per camera index
+
+        Returns:
+            Dict of camera index to moves, rtt, last_requested,
+            last_achieved and mean_error (mean |achieved - requested|)
+        """
+        return {index: {**timing, 'rtt': self._rtt.get(index),
+                        'mean_error': timing['total_error'] / timing['moves']}
+                for index, timing in self._timing.items()}
+
+    async def _send(self, index: int, camera: CameraInterface,
+                    commands: List[Tuple[str, str, int]]) -> Tuple[List[bool], float, float]:
+        """
+        Send commands and measure the round trip
+
+        Returns:
+            (results, monotonic send time, round-trip time)
+        """
+        sent_at = time.monotonic()
+        if len(commands) == 1:
+            results = [await camera.send_ptz_command_async(*commands[0])]
+        else:
+            results = await camera.send_ptz_commands_async(commands)
+        rtt = time.monotonic() - sent_at
+        previous = self._rtt.get(index)
+        self._rtt[index] = rtt if previous is None else previous + RTT_SMOOTHING * (rtt - previous)
+        return results, sent_at, rtt
+
+    def _record(self, index: int, task: Dict[str, Any], achieved: float) -> None:
+        """Log and accumulate achieved vs requested move duration"""
+        requested = task['duration']
+        timing = self._timing.setdefault(index, {'moves': 0, 'total_error': 0.0})
+        timing['moves'] += 1
+        timing['total_error'] += abs(achieved - requested)
+        timing['last_requested'] = requested
+        timing['last_achieved'] = achieved
+        logger.info(f"Camera {index} {task['type']} move: requested {requested:.3f}s, "
+                    f"achieved ~{achieved:.3f}s (rtt {self._rtt[index] * 1000:.0f}ms)")
+
+    async def _worker(self, index: int) -> None:
+        """
+        Drain one camera's queue in order
+
+        A command is assumed to take effect half a round trip after it is
+        sent. Each Stop is sent at that estimate's deadline and goes out
+        together with the next move's start command, so the camera's
+        transport can coalesce the pair (e.g. drop a Stop between Left and
+        Right) and send it as a single request.
+        """
+        queue = self._queues[index]
+        if not 0 <= index < len(self.cameras):
+            logger.warning(f"Dropping {len(queue)} move(s) for unknown camera {index}")
+            queue.clear()
+            return
+        camera = self.cameras[index]
+        if not queue:
+            return
+
+        task = queue.popleft()
+        logger.info(f"Processing camera move on camera {camera.camera_id}: {task}")
+        results, sent_at, rtt = await self._send(index, camera, [self._start_command(task)])
+        if not results[-1]:
+            logger.warning(f"PTZ command failed for camera {camera.camera_id}")
+        motion_start = sent_at + rtt / 2
+
+        while True:
+            deadline = motion_start + task['duration'] - self._rtt[index] / 2
+            await asyncio.sleep(max(0.0, deadline - time.monotonic()))
+
+            next_task = queue.popleft() if queue else None
+            commands = [STOP_COMMAND]
+            if next_task is not None:
+                logger.info(f"Processing camera move on camera {camera.camera_id}: {next_task}")
+                commands.append(self._start_command(next_task))
+            results, sent_at, rtt = await self._send(index, camera, commands)
+            stopped_at = sent_at + rtt / 2
+            self._record(index, task, stopped_at - motion_start)
+
+            if next_task is None:
+                return
+            if not results[-1]:
+                logger.warning(f"PTZ command failed for camera {camera.camera_id}")
+            task = next_task
+            motion_start = stopped_at
+
+    async def run(self) -> None:
+        """Process all queued moves, one worker per camera, until drained"""
+        await asyncio.gather(*(self._worker(index) for index, queue in list(self._queues.items()) if queue))
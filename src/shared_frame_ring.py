@@ -0,0 +1,307 @@
+"""
+Shared-Memory Frame Ring for ISKCON-Broadcast
+
+This module provides the frame hand-off between a camera running in its own
+capture process and the compositor in the main process. Frames are written
+into a fixed number of slots of one ``multiprocessing.shared_memory`` block;
+each slot has a seqlock header (odd while the writer is filling it) so the
+reader can map the newest frame as a numpy view without copying or locking.
+The reader marks the slot it maps and the writer never refills that slot, so
+a view stays intact until the reader asks for the next frame.
+"""
+
+import logging
+import os
+import time
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Default number of frame slots: the newest frame, the one the reader holds
+# and the one being written, plus a spare
+DEFAULT_RING_SLOTS = 4
+
+# Fewest slots for the writer to always find one that is neither the newest
+# frame nor held by the reader
+MIN_RING_SLOTS = 3
+
+# Identifies a block laid out by this module
+RING_MAGIC = 0x49534B46524D5247
+
+# Control block fields (int64 each)
+_MAGIC, _SLOTS, _HEIGHT, _WIDTH, _CHANNELS, _LATEST, _SEQUENCE, _HELD = range(8)
+_CONTROL_FIELDS = 8
+
+# Slot data starts on a cache-line boundary
+_ALIGNMENT = 64
+
+# Attempts latest() makes before giving up on a slot the writer keeps refilling
+_READ_RETRIES = 3
+
+
+def _align(offset: int) -> int:
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _attach_untracked(name: str) -> shared_memory.SharedMemory:
+    """
+    Map an existing block without registering it with our resource tracker
+
+    The creating process owns (and unlinks) the block; if the reader's
+    tracker also knew it, it would unlink it or warn about a leak at exit.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 has no track argument
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix':
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm
+
+
+class SharedFrameRing:
+    """
+    Single-producer / single-consumer frame ring in shared memory
+
+    The writer process ``create()``s the ring and ``write()``s frames, or
+    fills ``writable()`` in place and calls ``publish()``; the reader
+    ``attach()``es by name and calls ``latest()``. Frames are fixed size
+    (uint8, the shape given at creation) - a source that changes resolution
+    needs a new ring.
+
+    A view returned by ``latest()`` aliases the slot. The slot is recorded
+    as held before its seqlock is checked, and the writer skips the held
+    slot, so the view stays intact until the reader's next call to
+    ``latest()`` - the same contract as ``TripleBuffer.latest()``. Consumers
+    that keep a frame longer must use ``read()`` (a validated copy) instead.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, owner: bool):
+        """
+        Use create() or attach() rather than constructing directly
+
+        Args:
+            shm: Mapped block laid out by create()
+            owner: Whether this process created the block and unlinks it
+
+        Raises:
+            ValueError: If the block is not a frame ring
+        """
+        self._shm = shm
+        self.owner = owner
+        self._control = np.ndarray((_CONTROL_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        if self._control[_MAGIC] != RING_MAGIC:
+            raise ValueError(f"Shared memory block {shm.name} is not a frame ring")
+
+        self.slots = int(self._control[_SLOTS])
+        self.shape = (int(self._control[_HEIGHT]), int(self._control[_WIDTH]))
+        if self._control[_CHANNELS]:
+            self.shape += (int(self._control[_CHANNELS]),)
+        offset = self._control.nbytes
+        self._locks = np.ndarray((self.slots,), dtype=np.uint64, buffer=shm.buf, offset=offset)
+        offset += self._locks.nbytes
+        self._sequences = np.ndarray((self.slots,), dtype=np.int64, buffer=shm.buf, offset=offset)
+        offset += self._sequences.nbytes
+        self._timestamps = np.ndarray((self.slots,), dtype=np.float64, buffer=shm.buf, offset=offset)
+        offset += self._timestamps.nbytes
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=np.uint8, buffer=shm.buf,
+                                  offset=_align(offset))
+        # Slot the writer is filling and its view (writer side only)
+        self._write_slot: Optional[int] = None
+        self._write_frame: Optional[np.ndarray] = None
+
+    @classmethod
+    def create(cls, shape: Tuple[int, ...], slots: int = DEFAULT_RING_SLOTS) -> 'SharedFrameRing':
+        """
+        Allocate a new ring in shared memory
+
+        Args:
+            shape: Frame shape as (height, width) or (height, width, channels)
+            slots: Number of frame slots (at least MIN_RING_SLOTS)
+
+        Returns:
+            The ring, owned by this process
+
+        Raises:
+            ValueError: If slots is below MIN_RING_SLOTS
+        """
+        if slots < MIN_RING_SLOTS:
+            raise ValueError(f"A frame ring needs at least {MIN_RING_SLOTS} slots, got {slots}")
+        height, width = shape[:2]
+        # 0 channels marks two-dimensional frames (e.g. planar YUV)
+        channels = shape[2] if len(shape) > 2 else 0
+        header = _CONTROL_FIELDS * 8 + slots * 8 * 3
+        size = _align(header) + slots * height * width * max(channels, 1)
+
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        control = np.ndarray((_CONTROL_FIELDS,), dtype=np.int64, buffer=shm.buf)
+        control[:] = 0
+        control[_SLOTS] = slots
+        control[_HEIGHT], control[_WIDTH], control[_CHANNELS] = height, width, channels
+        control[_MAGIC] = RING_MAGIC
+        del control
+        ring = cls(shm, owner=True)
+        ring._locks[:] = 0
+        logger.debug(f"Created frame ring {ring.name}: {slots} x {ring.shape}")
+        return ring
+
+    @classmethod
+    def attach(cls, name: str) -> 'SharedFrameRing':
+        """
+        Map a ring created by another process
+
+        Args:
+            name: Shared memory name reported by the writer
+
+        Returns:
+            The ring (not owned; closing it leaves the block in place)
+        """
+        return cls(_attach_untracked(name), owner=False)
+
+    @property
+    def name(self) -> str:
+        """Shared memory block name to attach() to"""
+        return self._shm.name
+
+    @property
+    def sequence(self) -> int:
+        """Sequence number of the newest complete frame (0 = none yet)"""
+        return int(self._control[_SEQUENCE])
+
+    def writable(self) -> np.ndarray:
+        """
+        Get the slot the writer should fill next
+
+        The slot is marked as being written until ``publish()``, and repeated
+        calls return the same view, so a producer can decode straight into
+        it (e.g. ``cap.read(image=...)``) and retry after a failed read.
+
+        Returns:
+            Writable view of the slot
+        """
+        if self._write_slot is None:
+            # Neither the newest frame nor the one the reader holds
+            slot = int(self._control[_LATEST]) % self.slots  # stored as latest + 1
+            if slot == int(self._control[_HELD]) - 1:
+                slot = (slot + 1) % self.slots
+            self._locks[slot] += 1  # odd: slot is being written
+            self._write_slot = slot
+            self._write_frame = self._frames[slot]
+        return self._write_frame
+
+    def publish(self, timestamp: Optional[float] = None) -> int:
+        """
+        Publish the slot filled through ``writable()`` as the newest frame
+
+        Args:
+            timestamp: Capture time (default: now)
+
+        Returns:
+            Sequence number of the published frame
+        """
+        slot = self._write_slot
+        if slot is None:
+            self.writable()
+            slot = self._write_slot
+        sequence = int(self._control[_SEQUENCE]) + 1
+        self._sequences[slot] = sequence
+        self._timestamps[slot] = time.time() if timestamp is None else timestamp
+        self._locks[slot] += 1  # even: slot is consistent again
+        self._write_slot = self._write_frame = None
+
+        self._control[_LATEST] = slot + 1
+        self._control[_SEQUENCE] = sequence
+        return sequence
+
+    def write(self, frame: np.ndarray, timestamp: Optional[float] = None) -> int:
+        """
+        Copy a frame into the next slot and publish it
+
+        Args:
+            frame: Frame of the ring's shape
+            timestamp: Capture time (default: now)
+
+        Returns:
+            Sequence number of the published frame
+
+        Raises:
+            ValueError: If the frame shape does not match the ring
+        """
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.shape}")
+        np.copyto(self.writable(), frame)
+        return self.publish(timestamp)
+
+    def latest(self) -> Tuple[Optional[np.ndarray], int, float]:
+        """
+        Map the newest complete frame without copying
+
+        Holds the slot for the reader, releasing the one the previous call
+        returned: the writer will not refill it until the next call.
+
+        Returns:
+            (frame view, sequence, timestamp), or (None, 0, 0.0) if no
+            consistent frame could be read. The view is read-only.
+        """
+        for _ in range(_READ_RETRIES):
+            slot = int(self._control[_LATEST]) - 1
+            if slot < 0:
+                break
+            version = int(self._locks[slot])
+            if version & 1:
+                continue
+            self._control[_HELD] = slot + 1
+            sequence = int(self._sequences[slot])
+            timestamp = float(self._timestamps[slot])
+            # Unchanged once held: the writer had not started refilling it
+            if int(self._locks[slot]) == version:
+                view = self._frames[slot]
+                view.flags.writeable = False
+                return view, sequence, timestamp
+        return None, 0, 0.0
+
+    def read(self, out: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], int, float]:
+        """
+        Copy the newest complete frame, retrying if it is overwritten mid-copy
+
+        Args:
+            out: Optional preallocated array of the ring's shape to copy into
+
+        Returns:
+            (frame copy, sequence, timestamp), or (None, 0, 0.0)
+        """
+        for _ in range(_READ_RETRIES):
+            slot = int(self._control[_LATEST]) - 1
+            if slot < 0:
+                break
+            version = int(self._locks[slot])
+            if version & 1:
+                continue
+            if out is None:
+                out = np.empty(self.shape, dtype=np.uint8)
+            np.copyto(out, self._frames[slot])
+            sequence = int(self._sequences[slot])
+            timestamp = float(self._timestamps[slot])
+            if int(self._locks[slot]) == version:
+                return out, sequence, timestamp
+        return None, 0, 0.0
+
+    def close(self) -> None:
+        """Unmap the block (and unlink it if this process owns it)"""
+        self._control = self._locks = self._sequences = self._timestamps = self._frames = None
+        self._write_frame = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A consumer still holds a frame view; the mapping goes with it
+            logger.debug(f"Frame ring {self._shm.name} still in use, unmapping later")
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
@@ -6,7 +6,6 @@ import yaml
 import numpy as np
 import pygame
 import threading
-from collections import deque
 # Remove direct camera import - now using plugin system
 # from camera import Camera
 from display_helpers import *
@@ -16,7 +15,17 @@ from datetime import datetime
 import sys
 
 # Import camera plugin system
-from camera_registry import CameraRegistry, create_cameras_from_config
+from camera_registry import CameraRegistry, create_cameras_from_config, DEFAULT_STARTUP_DEADLINE
+from camera_demand import CameraDemand, get_mode_camera_ids, DEFAULT_PREROLL_SECONDS
+from ptz_scheduler import PTZScheduler
+from layout_plan import compile_layouts
+from background_cache import BackgroundCache
+from frame_clock import FrameClock, DEFAULT_OUTPUT_FPS
+from compositor import Compositor
+from multiview import Multiview, DEFAULT_MULTIVIEW_OUTPUTS
+from output_sink import create_output_sinks, DEFAULT_OUTPUTS
+import encoder_pipe  # Registers the encoder and recorder outputs
+from pixel_format import PIXEL_FORMAT_BGR
 import cameras  # This imports all camera plugins and registers them
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
@@ -36,8 +45,11 @@ schedule = load_config(schedule_file)
 # Initialize cameras using plugin system
 logging.info("Available camera types: %s", CameraRegistry.list_available_cameras())
 
-# Create cameras from configuration
-cameras = create_cameras_from_config(mode_config['cameras'])
+# Create cameras from configuration (concurrently, bounded by the startup deadline)
+cameras = create_cameras_from_config(
+    mode_config['cameras'],
+    startup_deadline=mode_config.get('startup_deadline', DEFAULT_STARTUP_DEADLINE)
+)
 
 # Start camera capture threads
 for cam in cameras:
@@ -47,31 +59,53 @@ for cam in cameras:
     except Exception as e:
         logging.error(f"Failed to start capture for camera {cam.camera_id}: {e}")
 
-# Load background image
-display_frame = cv2.imread(mode_config['background_image'])
+# Canvas pixel format ('bgr', or YUV 4:2:0 'i420'/'nv12' for the encoder path)
+output_pixel_format = mode_config.get('output_pixel_format', PIXEL_FORMAT_BGR)
+
+# Load background image once; modes reset the canvas from the cached copy
+background_cache = BackgroundCache(mode_config['background_image'], output_pixel_format)
+
+# Compile display modes once; the compositor only executes the plans
+canvas_width, canvas_height = background_cache.size
+layout_plans = compile_layouts(mode_config['modes'], (canvas_height, canvas_width), output_pixel_format)
 
 # Initialize pygame for audio playback
 pygame.mixer.init()
 
-# Queue for storing camera move tasks
-camera_move_queue = deque()
-
-async def process_camera_move(task):
-    """Processes a single camera move."""
-    logging.info(f"Processing camera move: {task}")
-    if cameras:
-        success = cameras[0].send_ptz_command(command="PtzCtrl", parameter=task['type'], id=task.get('marker', 0))
-        if not success:
-            logging.warning(f"PTZ command failed for camera {cameras[0].camera_id}")
-    await asyncio.sleep(task['duration'])  # Simulate camera movement duration
-    if cameras:
-        cameras[0].send_ptz_command(command="PtzCtrl", parameter="Stop", id=0)
-
-async def process_camera_move_queue():
-    """Processes each camera move in the queue sequentially."""
-    while camera_move_queue:
-        task = camera_move_queue.popleft()  # Get the next task in the queue
-        await process_camera_move(task)  # Process the camera move
+# Compositor output rate (25, 30 or 50 fps)
+output_fps = mode_config.get('output_fps', DEFAULT_OUTPUT_FPS)
+
+# Where the programme goes (preview window by default; headless setups omit it)
+output_sinks = create_output_sinks(mode_config.get('outputs', DEFAULT_OUTPUTS),
+                                   canvas_width, canvas_height, output_fps, output_pixel_format)
+
+# Optional operator multiview: programme, next layout and every camera at half size
+multiview_config = mode_config.get('multiview')
+multiview = None
+multiview_sinks = []
+if multiview_config is not None:
+    multiview = Multiview(cameras, layout_plans, background_cache,
+                          multiview_config.get('columns'),
+                          multiview_config.get('interval'))
+    multiview_sinks = create_output_sinks(multiview_config.get('outputs', DEFAULT_MULTIVIEW_OUTPUTS),
+                                          multiview.size[0], multiview.size[1],
+                                          output_fps / multiview.interval, output_pixel_format)
+
+# Tracks which cameras the current layout needs; others drop to keepalive
+# unless the multiview shows them, which keeps every camera live at cell size
+camera_demand = CameraDemand(cameras, mode_config.get('camera_preroll_seconds', DEFAULT_PREROLL_SECONDS),
+                             {index: multiview.cell_size for index in range(len(cameras))} if multiview else None)
+
+# Render thread owning the canvas and feeding the outputs
+compositor = Compositor(cameras, layout_plans, background_cache, output_fps, output_sinks,
+                        multiview, multiview_sinks)
+compositor.start()
+
+# Seconds between schedule checks while a video mode is on air
+MODE_POLL_INTERVAL = 0.1
+
+# Per-camera queues for camera move tasks
+ptz_scheduler = PTZScheduler(cameras)
 
 async def play_audio(task):
     """Plays audio for a specified duration."""
@@ -82,14 +116,16 @@ async def play_audio(task):
     pygame.mixer.music.stop()
     logging.info("Audio playback ended.")
 
-async def play_video(task, display_frame):
-    """Plays video for a specified duration and updates the display frame."""
+async def play_video(task):
+    """Plays video for a specified duration through the compositor."""
     video_file = task['file']
     duration = task['duration']
     logging.info(f"Starting video playback: {video_file} for {duration} seconds")
 
     cap = cv2.VideoCapture(video_file)
     start_time = time.time()
+    clock = FrameClock(cap.get(cv2.CAP_PROP_FPS) or output_fps)
+    compositor.quit_requested.clear()
 
     while cap.isOpened():
         ret, frame = cap.read()
@@ -104,68 +140,50 @@ async def play_video(task, display_frame):
             logging.warning("End of video file or error.")
             break
 
-        # Resize the video frame to fit the display frame
-        resized_frame = resize_frame_to_fit(frame, display_frame.shape[1], display_frame.shape[0])
-
-        # Copy resized video frame onto display_frame
-        np.copyto(display_frame, resized_frame)
-
-        cv2.imshow("Display", display_frame)
-
-        # Allow OpenCV to process frames smoothly
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        if compositor.quit_requested.is_set():
             logging.info("Video playback interrupted by user.")
             break
-        
-        await asyncio.sleep(0)  # Yield to other tasks
+
+        # Resize the video frame to the canvas and hand it to the compositor
+        compositor.show_frame(resize_frame_to_fit(frame, canvas_width, canvas_height))
+
+        await clock.wait_async()  # Pace at the file's frame rate
 
     cap.release()
+    compositor.show_frame(None)
     logging.info("Video playback ended.")
 
 
-async def display_video_mode(task, camera_tasks):
+def layout_target_sizes(mode):
+    """Frame size each camera of a mode is drawn at (None for unknown modes)."""
+    layout = layout_plans.get(mode)
+    return layout.target_sizes if layout else None
+
+async def display_video_mode(task, camera_tasks, next_task=None):
     logging.info(f"Displaying video mode: {task['mode']} for {task['duration']} seconds")
-    mode_settings = mode_config['modes'].get(task['mode'])
     duration = task['duration']
     end_time = time.time() + duration
-    global display_frame
-    display_frame = cv2.imread(mode_config['background_image'])
+
+    # The compositor thread renders the layout; this task only steers it
+    compositor.switch_layout(task['mode'])
+    compositor.set_next_layout(next_task['mode'] if next_task else None)
+    compositor.quit_requested.clear()
+
+    # Only decode cameras this layout shows, at the size its tiles need;
+    # wake the next layout's cameras early
+    camera_demand.apply(get_mode_camera_ids(layout_plans.get(task['mode'])), layout_target_sizes(task['mode']))
+    next_camera_ids = get_mode_camera_ids(layout_plans.get(next_task['mode'])) if next_task else set()
+    preroll_time = end_time - camera_demand.preroll
 
     while time.time() < end_time:
-        # Apply display mode configurations
-        if mode_settings['type'] == 'dual_view':
-            display_frame = dual_capture_display(
-                display_frame, 
-                cameras, 
-                mode_settings['cam_top_left'],
-                tuple(mode_settings['pos_top_left']), 
-                mode_settings['cam_bottom_right'],
-                tuple(mode_settings['pos_bottom_right']),
-                mode_settings['scale_top_left'], 
-                mode_settings['scale_bottom_right']
-            )
-        elif mode_settings['type'] == 'full_screen':
-            display_frame = fullscreen_display(display_frame, cameras[0], tuple(mode_settings['pos']), mode_settings['scale'])
-        elif mode_settings['type'] == 'left_column_right_main':
-            display_frame = left_column_right_main(
-                display_frame,
-                cameras,
-                mode_settings['cam_left_top'],
-                tuple(mode_settings['pos_left_top']),
-                mode_settings['cam_left_bottom'],
-                tuple(mode_settings['pos_left_bottom']),
-                mode_settings['cam_right'],
-                tuple(mode_settings['pos_right']),
-                mode_settings['scale_left'],
-                mode_settings['scale_right']
-            )
-
-        cv2.imshow('Display', display_frame)
-        if cv2.waitKey(1) == ord('q'):
+        if next_camera_ids and time.time() >= preroll_time:
+            camera_demand.prepare(next_camera_ids, layout_target_sizes(next_task['mode']))
+            next_camera_ids = set()
+
+        if compositor.quit_requested.is_set():
             break
-        await asyncio.sleep(0.1)
+        await asyncio.sleep(min(MODE_POLL_INTERVAL, max(0.0, end_time - time.time())))
 
-    cv2.destroyAllWindows()
     logging.info("Video mode display ended.")
 
 async def action_dispatcher(actions):
@@ -178,12 +196,12 @@ async def action_dispatcher(actions):
         if action['action'] == 'play_audio':
             audio_task = asyncio.create_task(play_audio(action))
         elif action['action'] == 'play_video':
-            video_task = asyncio.create_task(play_video(action, display_frame))
+            video_task = asyncio.create_task(play_video(action))
         elif action['action'] == 'video_mode':
             video_mode_tasks.append(action)  # Add each video_mode action to the list
         elif action['action'] == 'camera_move':
-            # Append only the command details (dict) for processing in the queue
-            camera_move_queue.append(action)
+            # Queue on the target camera's PTZ queue
+            ptz_scheduler.enqueue(action)
 
     # Run play_video and play_audio concurrently
     if video_task and audio_task:
@@ -194,13 +212,17 @@ async def action_dispatcher(actions):
         await audio_task
 
     # Process each video_mode action sequentially with queued camera moves
-    for video_mode_task in video_mode_tasks:
+    for i, video_mode_task in enumerate(video_mode_tasks):
+        next_task = video_mode_tasks[i + 1] if i + 1 < len(video_mode_tasks) else None
         # Run video mode display concurrently with camera moves
         await asyncio.gather(
-            display_video_mode(video_mode_task, list(camera_move_queue)),  # Pass a copy of camera tasks
-            process_camera_move_queue()  # Process camera moves sequentially in parallel
+            display_video_mode(video_mode_task, ptz_scheduler.pending(), next_task),  # Pass a copy of camera tasks
+            ptz_scheduler.run()  # Each camera's moves run in order, cameras in parallel
         )
 
+    # The next event's first layout is unknown - keep every camera warm for it
+    camera_demand.activate_all()
+
 async def main(debug_time):
     while True:
         """Main function to process all scheduled programmes and events."""
@@ -237,4 +259,4 @@ if __name__ == '__main__':
     except Exception as e:
         logging.error(f"An error occurred: {e}")
     finally:
-        cv2.destroyAllWindows()
+        compositor.stop()
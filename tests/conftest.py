@@ -181,6 +181,15 @@ def running_mock_camera(mock_camera):
     mock_camera.stop()
 
 
+@pytest.fixture
+def fake_camera_api():
+    """Fixture providing a running stand-in for a camera's api.cgi endpoint"""
+    from fake_camera_api import FakeCameraAPI
+    api = FakeCameraAPI().start()
+    yield api
+    api.stop()
+
+
 @pytest.fixture
 def mock_cv2():
     """Fixture providing a mocked cv2 module"""
@@ -202,5 +202,27 @@ class TestCriticalMagicNumbers:
             assert np.all(result >= 0) and np.all(result <= 255), f"Scale {scale} caused value corruption"
 
 
+class TestMissingFrames:
+    """Test that cameras without a frame leave the background untouched"""
+
+    def test_layouts_tolerate_missing_frames(self):
+        """Test all layout helpers with a camera that has no frame yet"""
+        missing = Mock()
+        missing.get_frame.return_value = None
+        cameras = [create_mock_camera(), missing]
+
+        background = create_standard_background()
+        result = fullscreen_display(background, missing, (0, 0), 100)
+        assert not np.any(result)
+
+        result = dual_capture_display(create_standard_background(), cameras, 1, (0, 0), 0, (768, 432), 40, 60)
+        assert not np.any(result[0:432, 0:768])
+        assert np.any(result[432:, 768:])
+
+        result = left_column_right_main(create_standard_background(), cameras, 1, (0, 0), 1, (0, 540), 0, (807, 0), 50, 58)
+        assert not np.any(result[:, 0:807])
+        assert np.any(result[:, 807:])
+
+
 if __name__ == "__main__":
-    pytest.main([__file__, "-v"]) 
\ No newline at end of file
+    pytest.main([__file__, "-v"]) 
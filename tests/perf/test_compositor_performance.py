@@ -0,0 +1,157 @@
+"""
+Performance tests for the compositor
+
+Measures the render cost of a layout per output tick on the compositor
+thread with the null output sink, which discards frames, so the figure is
+compositing plus publishing the canvas. It is the baseline other outputs
+are compared against, e.g. the operator multiview, which with every camera
+live must add less than 5% to the programme's own cost.
+"""
+
+import time
+import pytest
+import numpy as np
+import cv2
+
+from src.background_cache import BackgroundCache
+from src.compositor import Compositor
+from src.layout_plan import compile_layouts
+from src.multiview import Multiview
+from src.output_sink import NullSink
+from src.pixel_format import PIXEL_FORMAT_I420, from_bgr
+
+CANVAS_WIDTH, CANVAS_HEIGHT = 1280, 720
+
+MODES = {
+    'dual': {'type': 'dual_view', 'cam_top_left': 0, 'pos_top_left': [0, 0], 'scale_top_left': 50,
+             'cam_bottom_right': 1, 'pos_bottom_right': [640, 360], 'scale_bottom_right': 50},
+    'full': {'type': 'full_screen', 'pos': [0, 0], 'scale': 100},
+}
+
+# Output rate the multiview budget is measured against
+OUTPUT_FPS = 25
+
+
+class ChangingCamera:
+    """Camera stand-in delivering a new 1080p frame on every read"""
+
+    def __init__(self, value):
+        self.frames = [np.full((1080, 1920, 3), value + i, np.uint8) for i in range(2)]
+        self.frame_sequence = 0
+
+    def get_frame(self):
+        self.frame_sequence += 1
+        return self.frames[self.frame_sequence % 2]
+
+
+class TickingCamera:
+    """Camera stand-in whose 1080p frame the benchmark advances once per tick"""
+
+    def __init__(self, value, pixel_format):
+        self.pixel_format = pixel_format
+        self.frames = [from_bgr(np.full((1080, 1920, 3), value + i, np.uint8), pixel_format) for i in range(2)]
+        self.frame_sequence = 1
+
+    def get_frame(self):
+        return self.frames[self.frame_sequence % 2]
+
+
+def render_cost(compositor, ticks=50):
+    """Mean CPU seconds per tick of rendering and output on this thread"""
+    compositor.switch_layout('dual')
+    compositor._apply_commands()
+    started = time.thread_time()
+    for _ in range(ticks):
+        compositor._render()
+        compositor._output()
+    return (time.thread_time() - started) / ticks
+
+
+@pytest.fixture
+def background(tmp_path):
+    path = str(tmp_path / "background.png")
+    cv2.imwrite(path, np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 40, np.uint8))
+    return BackgroundCache(path)
+
+
+@pytest.mark.performance
+def test_null_sink_render_baseline(background):
+    """Test compositing a dual view fits well within a 25 fps frame"""
+    sink = NullSink(CANVAS_WIDTH, CANVAS_HEIGHT, 25, background.pixel_format)
+    compositor = Compositor([ChangingCamera(10), ChangingCamera(100)],
+                            compile_layouts(MODES, background.image.shape), background, sinks=[sink])
+    cost = render_cost(compositor)
+    assert compositor.fanout.frames_published == 50
+    assert cost < 0.5 / 25, f"Render cost too high: {cost * 1000:.1f}ms per frame"
+
+
+def scaled_modes(width, height):
+    """MODES for a canvas of another size"""
+    scale_x, scale_y = width / CANVAS_WIDTH, height / CANVAS_HEIGHT
+    modes = {name: dict(mode) for name, mode in MODES.items()}
+    modes['dual']['pos_bottom_right'] = [int(640 * scale_x), int(360 * scale_y)]
+    return modes
+
+
+def build_compositor(background, cameras, with_multiview):
+    """Compositor on air with a dual view of four cameras, optionally running the multiview"""
+    width, height = background.size
+    pixel_format = background.pixel_format
+    layouts = compile_layouts(scaled_modes(width, height), (height, width), pixel_format)
+    multiview = Multiview(cameras, layouts, background) if with_multiview else None
+    multiview_sinks = [NullSink(*multiview.size, OUTPUT_FPS, pixel_format)] if multiview else []
+    compositor = Compositor(cameras, layouts, background, OUTPUT_FPS,
+                            [NullSink(width, height, OUTPUT_FPS, pixel_format)],
+                            multiview, multiview_sinks)
+    compositor.switch_layout('dual')
+    compositor.set_next_layout('full')
+    compositor._apply_commands()
+    return compositor
+
+
+def tick(compositor):
+    """CPU seconds this thread spends on one render and output tick"""
+    started = time.thread_time()
+    compositor._render()
+    compositor._output()
+    return time.thread_time() - started
+
+
+def multiview_overhead(background, cycles=2):
+    """Extra cost of the multiview as a fraction of the programme-only cost
+
+    Ticks a programme-only compositor and one running the multiview in
+    turn, with all four cameras delivering a new frame every tick, so drift
+    in the machine's speed affects both sides alike. Measures whole
+    multiview intervals after a warm-up of two.
+    """
+    cameras = [TickingCamera(10 + 40 * i, background.pixel_format) for i in range(4)]
+    programme = build_compositor(background, cameras, False)
+    monitored = build_compositor(background, cameras, True)
+    interval = monitored.multiview.interval
+    programme_cost = multiview_cost = 0.0
+    for count in range((2 + cycles) * interval):
+        for camera in cameras:
+            camera.frame_sequence += 1
+        programme_tick, multiview_tick = tick(programme), tick(monitored)
+        if count >= 2 * interval:
+            programme_cost += programme_tick
+            multiview_cost += multiview_tick
+    assert monitored.multiview.frames_composed == 2 + cycles
+    return (multiview_cost - programme_cost) / programme_cost
+
+
+@pytest.mark.performance
+@pytest.mark.parametrize('width, height, pixel_format', [
+    (1280, 720, 'bgr'),
+    (1280, 720, PIXEL_FORMAT_I420),
+    (1920, 1080, 'bgr'),
+    (1920, 1080, PIXEL_FORMAT_I420),
+])
+def test_multiview_within_budget(tmp_path, width, height, pixel_format):
+    """Test the multiview at its default interval adds less than 5% to the programme with every camera live"""
+    path = str(tmp_path / "background.png")
+    cv2.imwrite(path, np.full((height, width, 3), 40, np.uint8))
+    background = BackgroundCache(path, pixel_format)
+    overhead = float(np.median([multiview_overhead(background) for _ in range(5)]))
+    assert overhead < 0.05, f"Multiview adds {overhead:.1%} to the programme's cost"
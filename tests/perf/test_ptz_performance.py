@@ -0,0 +1,60 @@
+"""
+Performance tests for the PTZ transport
+
+Benchmarks PTZ round-trips against the local stand-in camera API and
+checks that the asyncio loop stays responsive while commands are in flight.
+"""
+
+import asyncio
+import time
+import pytest
+import requests
+
+from src.ptz_client import AsyncPTZClient
+
+
+def _login(api):
+    payload = [{"cmd": "Login", "param": {"User": {"Version": "0", "userName": "admin", "password": "admin"}}}]
+    return requests.post(f"{api.url}?cmd=Login", json=payload, timeout=5).json()[0]["value"]["Token"]["name"]
+
+
+class TestPTZPerformance:
+    """Performance test suite for PTZ commands"""
+
+    @pytest.mark.performance
+    def test_pooled_round_trip_latency(self, fake_camera_api):
+        """Test mean round-trip on a reused keep-alive connection"""
+        token = _login(fake_camera_api)
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token)
+
+        for _ in range(50):
+            assert client.send_sync("PtzCtrl", "Left")
+
+        stats = client.get_stats()
+        client.close()
+        assert stats['mean_latency'] < 0.02, f"PTZ round-trip too slow: {stats['mean_latency'] * 1000:.1f}ms"
+
+    @pytest.mark.performance
+    def test_loop_jitter_during_slow_ptz(self, fake_camera_api):
+        """Test 10 Hz loop jitter while a 300 ms camera handles moves"""
+        token = _login(fake_camera_api)
+        fake_camera_api.latency = 0.3
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token)
+        lateness = []
+
+        async def display_loop():
+            for _ in range(10):
+                expected = time.monotonic() + 0.1
+                await asyncio.sleep(0.1)
+                lateness.append(time.monotonic() - expected)
+
+        async def moves():
+            for op in ["Left", "Stop", "Right", "Stop"]:
+                await client.send("PtzCtrl", op)
+
+        async def scenario():
+            await asyncio.gather(display_loop(), moves())
+
+        asyncio.run(scenario())
+        client.close()
+        assert max(lateness) < 0.05, f"Display loop stalled by {max(lateness) * 1000:.1f}ms"
@@ -0,0 +1,123 @@
+"""
+Unit tests for the background cache
+
+Tests decode-once caching with mtime-based reload, canvas resets and the
+regions left uncovered by a layout's tiles.
+"""
+
+import os
+import pytest
+import numpy as np
+import cv2
+from unittest.mock import Mock
+
+from src.background_cache import BackgroundCache, uncovered_regions
+from src.layout_plan import LayoutPlan
+
+
+@pytest.fixture
+def background_file(tmp_path):
+    """Small PNG background with a known colour"""
+    path = str(tmp_path / "background.png")
+    cv2.imwrite(path, np.full((90, 160, 3), 40, np.uint8))
+    return path
+
+
+def region_mask(shape, regions):
+    mask = np.zeros(shape, dtype=int)
+    for region in regions:
+        mask[region] += 1
+    return mask
+
+
+class TestUncoveredRegions:
+    """Test suite for uncovered_regions"""
+
+    def test_no_tiles(self):
+        """Test an empty layout leaves the whole canvas"""
+        assert uncovered_regions((160, 90), []) == [(slice(0, 90), slice(0, 160))]
+
+    def test_regions_complement_tiles(self):
+        """Test regions cover exactly the pixels no tile covers, once each"""
+        rects = [(0, 0, 80, 45), (60, 30, 100, 60), (150, 80, 40, 40)]
+        mask = region_mask((90, 160), uncovered_regions((160, 90), rects))
+
+        covered = np.zeros((90, 160), dtype=bool)
+        for x, y, w, h in rects:
+            covered[y:y + h, x:x + w] = True
+        assert mask.max() == 1
+        assert np.array_equal(mask == 1, ~covered)
+
+    def test_full_cover(self):
+        """Test a full-canvas tile leaves nothing to restore"""
+        assert uncovered_regions((160, 90), [(0, 0, 160, 90)]) == []
+
+
+class TestBackgroundCache:
+    """Test suite for BackgroundCache"""
+
+    def test_decoded_once(self, background_file):
+        """Test repeated resets do not decode the file again"""
+        cache = BackgroundCache(background_file)
+        canvas = cache.new_canvas()
+        for _ in range(5):
+            canvas[:] = 0
+            cache.reset(canvas)
+
+        assert cache.decodes == 1
+        assert (canvas == 40).all()
+
+    def test_pristine_copy_read_only(self, background_file):
+        """Test the cached image cannot be drawn on"""
+        cache = BackgroundCache(background_file)
+        with pytest.raises(ValueError):
+            cache.image[0, 0] = 0
+
+    def test_reload_on_mtime_change(self, background_file):
+        """Test an edited file is decoded again at the next reset"""
+        cache = BackgroundCache(background_file)
+        cv2.imwrite(background_file, np.full((90, 160, 3), 200, np.uint8))
+        stat = os.stat(background_file)
+        os.utime(background_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        canvas = cache.reset(cache.new_canvas())
+
+        assert cache.decodes == 2
+        assert (canvas == 200).all()
+
+    def test_reset_regions_only(self, background_file):
+        """Test a partial reset leaves tile areas alone"""
+        cache = BackgroundCache(background_file)
+        canvas = np.zeros((90, 160, 3), np.uint8)
+
+        cache.reset(canvas, uncovered_regions((160, 90), [(0, 0, 80, 90)]))
+
+        assert not canvas[:, :80].any()
+        assert (canvas[:, 80:] == 40).all()
+
+    def test_missing_file(self, tmp_path):
+        """Test a missing background fails loudly"""
+        with pytest.raises(FileNotFoundError):
+            BackgroundCache(str(tmp_path / "missing.png"))
+
+
+class TestLayoutBackground:
+    """Test layout rendering against the cached background"""
+
+    def test_missing_frame_restores_tile(self, background_file):
+        """Test a tile without a frame shows the background, not stale pixels"""
+        cache = BackgroundCache(background_file)
+        mode = {'type': 'dual_view', 'cam_top_left': 0, 'pos_top_left': [0, 0], 'scale_top_left': 50,
+                'cam_bottom_right': 1, 'pos_bottom_right': [80, 45], 'scale_bottom_right': 50}
+        layout = LayoutPlan('dual', mode, cache.image.shape)
+        live, idle = Mock(), Mock()
+        live.get_frame.return_value = np.full((48, 64, 3), 255, np.uint8)
+        idle.get_frame.return_value = None
+        canvas = np.zeros_like(cache.image)  # stale content from a previous mode
+
+        cache.reset(canvas, layout.background_regions)
+        layout.render(canvas, [live, idle], cache.image)
+
+        assert (canvas[:45, :80] == 255).all()
+        assert (canvas[45:, 80:] == 40).all()
+        assert (canvas[:45, 80:] == 40).all()
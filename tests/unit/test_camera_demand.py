@@ -0,0 +1,154 @@
+"""
+Unit tests for camera demand tracking
+
+Tests which cameras each display mode references and the switching of
+unused cameras to keepalive capture.
+"""
+
+import time
+from unittest.mock import Mock
+
+from src.camera_demand import CameraDemand, get_mode_camera_ids
+from src.cameras.mock_camera import MockCamera
+from src.layout_plan import LayoutPlan
+
+CANVAS_SHAPE = (720, 1280, 3)
+
+
+class TestModeCameraIds:
+    """Test suite for get_mode_camera_ids"""
+
+    def test_full_screen_uses_camera_zero(self):
+        """Test that full screen mode always shows camera 0"""
+        layout = LayoutPlan('full', {'type': 'full_screen', 'pos': [0, 0], 'scale': 100}, CANVAS_SHAPE)
+        assert get_mode_camera_ids(layout) == {0}
+
+    def test_dual_view(self):
+        """Test dual view camera references"""
+        mode = {'type': 'dual_view', 'cam_top_left': 2, 'pos_top_left': [0, 0], 'scale_top_left': 50,
+                'cam_bottom_right': 1, 'pos_bottom_right': [640, 360], 'scale_bottom_right': 50}
+        assert get_mode_camera_ids(LayoutPlan('dual', mode, CANVAS_SHAPE)) == {1, 2}
+
+    def test_left_column_right_main(self):
+        """Test left column / right main camera references"""
+        mode = {'type': 'left_column_right_main', 'cam_left_top': 0, 'pos_left_top': [0, 0],
+                'cam_left_bottom': 0, 'pos_left_bottom': [0, 360], 'scale_left': 30,
+                'cam_right': 2, 'pos_right': [384, 0], 'scale_right': 70}
+        assert get_mode_camera_ids(LayoutPlan('left', mode, CANVAS_SHAPE)) == {0, 2}
+
+    def test_missing_mode(self):
+        """Test that an unknown mode needs no cameras"""
+        assert get_mode_camera_ids(None) == set()
+
+
+class TestCameraDemand:
+    """Test suite for CameraDemand"""
+
+    def _cameras(self, count):
+        cameras = []
+        for i in range(count):
+            camera = Mock()
+            camera.camera_id = i
+            cameras.append(camera)
+        return cameras
+
+    def test_initially_all_active(self):
+        """Test that all cameras start at full rate"""
+        demand = CameraDemand(self._cameras(3))
+        assert demand.active_ids == {0, 1, 2}
+
+    def test_apply_deactivates_unused(self):
+        """Test that apply runs exactly the needed cameras"""
+        cameras = self._cameras(3)
+        demand = CameraDemand(cameras)
+
+        demand.apply({0})
+
+        assert demand.active_ids == {0}
+        cameras[0].set_active.assert_called_with(True)
+        cameras[1].set_active.assert_called_with(False)
+        cameras[2].set_active.assert_called_with(False)
+
+    def test_prepare_adds_upcoming(self):
+        """Test that prepare resumes upcoming cameras without pausing current ones"""
+        demand = CameraDemand(self._cameras(3))
+        demand.apply({0})
+        demand.prepare({2})
+        assert demand.active_ids == {0, 2}
+
+    def test_resumed_cameras_flushed(self):
+        """Test that only cameras resuming from keepalive are flushed"""
+        cameras = self._cameras(3)
+        demand = CameraDemand(cameras)
+        demand.apply({0})
+        demand.prepare({0, 2})
+
+        cameras[0].flush.assert_not_called()
+        cameras[1].flush.assert_not_called()
+        cameras[2].flush.assert_called_once()
+
+    def test_target_sizes_forwarded_on_change(self):
+        """Test cameras are told their tile size only when it changes"""
+        cameras = self._cameras(2)
+        demand = CameraDemand(cameras)
+        demand.apply({0, 1}, {0: (640, 360), 1: (1280, 720)})
+        demand.apply({0, 1}, {0: (640, 360), 1: (960, 540)})
+
+        assert cameras[0].set_target_size.call_count == 1
+        cameras[1].set_target_size.assert_called_with((960, 540))
+        assert demand.target_sizes == {0: (640, 360), 1: (960, 540)}
+
+    def test_prepare_never_shrinks_cameras_on_screen(self):
+        """Test a camera in both modes keeps a size covering both until the switch"""
+        cameras = self._cameras(3)
+        demand = CameraDemand(cameras)
+        demand.apply({0}, {0: (1920, 1080)})
+        demand.prepare({0, 2}, {0: (640, 360), 2: (640, 360)})
+
+        cameras[2].set_target_size.assert_called_with((640, 360))
+        assert demand.target_sizes[0] == (1920, 1080)
+
+        demand.apply({0, 2}, {0: (640, 360), 2: (640, 360)})
+        cameras[0].set_target_size.assert_called_with((640, 360))
+
+    def test_monitored_cameras_stay_live(self):
+        """Test that a multiview keeps every camera active at no less than cell size"""
+        cameras = self._cameras(3)
+        cell = (960, 540)
+        demand = CameraDemand(cameras, monitor_sizes={i: cell for i in range(3)})
+
+        demand.apply({0}, {0: (1920, 1080)})
+        assert demand.active_ids == {0, 1, 2}
+        assert demand.target_sizes == {0: (1920, 1080), 1: cell, 2: cell}
+
+        demand.apply({1}, {1: (640, 360)})
+        assert demand.active_ids == {0, 1, 2}
+        assert demand.target_sizes == {0: cell, 1: cell, 2: cell}
+        for camera in cameras:
+            camera.set_active.assert_called_with(True)
+            camera.flush.assert_not_called()
+
+    def test_ignores_out_of_range(self):
+        """Test that modes referencing missing cameras are tolerated"""
+        demand = CameraDemand(self._cameras(1))
+        demand.apply({0, 2})
+        assert demand.active_ids == {0}
+
+    def test_mock_camera_pauses_when_inactive(self, mock_camera_config):
+        """Test that an inactive mock camera stops producing frames"""
+        camera = MockCamera(0, {**mock_camera_config, 'keepalive_interval': 0.05})
+        camera.capture_frames()
+        time.sleep(0.1)
+
+        CameraDemand([camera]).apply(set())
+        time.sleep(0.1)
+        paused_count = camera.frame_count
+        time.sleep(0.2)
+        assert camera.frame_count == paused_count
+        assert camera.get_camera_info()['active'] is False
+
+        camera.set_active(True)
+        time.sleep(0.2)
+        assert camera.frame_count > paused_count
+
+        camera.stop()
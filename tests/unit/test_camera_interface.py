@@ -10,7 +10,7 @@ from abc import ABC, abstractmethod
 from unittest.mock import Mock, patch
 import numpy as np
 
-from src.camera_interface import CameraInterface
+from src.camera_interface import CameraInterface, downscaled_size
 
 
 class TestCameraInterface:
@@ -191,4 +191,25 @@ class TestCameraInterface:
         
         camera = MinimalCamera(camera_id, config)
         assert camera.camera_id == camera_id
-        assert camera.config == config 
\ No newline at end of file
+        assert camera.config == config 
+
+
+class TestDownscaledSize:
+    """Test suite for decoder-side downscale sizing"""
+
+    @pytest.mark.parametrize("target,expected", [
+        (None, (1920, 1080)),
+        ((1920, 1080), (1920, 1080)),
+        ((1000, 500), (1920, 1080)),
+        ((960, 540), (960, 540)),
+        ((640, 360), (640, 360)),
+        ((480, 200), (480, 270)),
+        ((100, 100), (480, 270)),
+    ])
+    def test_smallest_covering_size(self, target, expected):
+        """Test the largest downscale factor that still covers the tile is chosen"""
+        assert downscaled_size((1920, 1080), target) == expected
+
+    def test_odd_sizes_rounded_to_even(self):
+        """Test downscaled sizes stay even for chroma-subsampled decoders"""
+        assert downscaled_size((1918, 1078), (100, 100)) == (478, 268)
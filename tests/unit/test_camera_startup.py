@@ -0,0 +1,123 @@
+"""
+Unit tests for concurrent camera startup
+
+Tests parallel construction in create_cameras_from_config, the startup
+deadline, and DeferredCamera placeholders for cameras that miss it.
+"""
+
+import threading
+import time
+import pytest
+import numpy as np
+
+from camera_interface import CameraInterface
+from camera_registry import CameraRegistry, create_cameras_from_config
+
+
+class SlowCamera(CameraInterface):
+    """Camera whose construction blocks like a retrying HTTPS login"""
+
+    def __init__(self, camera_id, config):
+        super().__init__(camera_id, config)
+        release = config.get('release')
+        if release is not None:
+            release.wait(5.0)
+        else:
+            time.sleep(config.get('delay', 0))
+        if config.get('fail'):
+            raise RuntimeError("login failed")
+        self.ptz_commands = []
+
+    def get_frame(self):
+        return np.zeros((4, 4, 3), dtype=np.uint8) if self.running else None
+
+    def send_ptz_command(self, command, parameter, id=0):
+        self.ptz_commands.append(parameter)
+        return True
+
+    def capture_frames(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def is_connected(self):
+        return True
+
+
+@pytest.fixture
+def slow_camera_registry():
+    """Register SlowCamera, restoring the registry afterwards"""
+    original = CameraRegistry._cameras.copy()
+    CameraRegistry.register('slow', SlowCamera)
+    yield CameraRegistry
+    CameraRegistry._cameras.clear()
+    CameraRegistry._cameras.update(original)
+
+
+class TestCameraStartup:
+    """Test suite for concurrent camera startup"""
+
+    def test_cameras_constructed_concurrently(self, slow_camera_registry):
+        """Test that slow logins overlap instead of adding up"""
+        configs = [{'id': i, 'type': 'slow', 'delay': 0.2} for i in range(3)]
+
+        start = time.time()
+        cameras = create_cameras_from_config(configs)
+        elapsed = time.time() - start
+
+        assert [camera.camera_id for camera in cameras] == [0, 1, 2]
+        assert all(isinstance(camera, SlowCamera) for camera in cameras)
+        assert elapsed < 0.5
+
+    def test_failed_cameras_are_skipped(self, slow_camera_registry):
+        """Test that a failing camera does not prevent the others"""
+        configs = [{'id': 0, 'type': 'slow'}, {'id': 1, 'type': 'slow', 'fail': True}]
+
+        cameras = create_cameras_from_config(configs)
+
+        assert [camera.camera_id for camera in cameras] == [0]
+
+    def test_late_camera_starts_degraded(self, slow_camera_registry):
+        """Test that a camera missing the deadline comes up later in place"""
+        release = threading.Event()
+        configs = [{'id': 0, 'type': 'slow'}, {'id': 1, 'type': 'slow', 'release': release}]
+
+        cameras = create_cameras_from_config(configs, startup_deadline=0.1)
+        late = cameras[1]
+
+        assert late.camera_id == 1
+        assert late.get_camera_info()['deferred_state'] == 'pending'
+        assert late.get_frame() is None
+        assert late.frame_timestamp == 0.0
+        assert late.send_ptz_command("PtzCtrl", "Left") is False
+        assert late.is_connected() is False
+
+        late.capture_frames()
+        late.set_active(False)
+        release.set()
+        time.sleep(0.1)
+
+        assert late.get_camera_info()['deferred_state'] == 'ready'
+        assert late.camera.running is True
+        assert late.camera.active is False
+        assert late.get_frame() is not None
+        assert late.send_ptz_command("PtzCtrl", "Left") is True
+        late.camera.frame_buffer.publish(np.zeros((4, 4, 3), dtype=np.uint8), timestamp=123.0)
+        late.camera.frame_buffer.latest()
+        assert late.frame_timestamp == 123.0
+
+        late.stop()
+        assert late.camera.running is False
+
+    def test_late_camera_failure_stays_degraded(self, slow_camera_registry):
+        """Test that a late camera that fails stays unavailable"""
+        release = threading.Event()
+        configs = [{'id': 0, 'type': 'slow', 'release': release, 'fail': True}]
+
+        cameras = create_cameras_from_config(configs, startup_deadline=0.05)
+        release.set()
+        time.sleep(0.1)
+
+        assert cameras[0].get_camera_info()['deferred_state'] == 'failed'
+        assert cameras[0].get_frame() is None
@@ -0,0 +1,190 @@
+"""
+Unit tests for the compositor engine
+
+Tests that the render thread applies queued commands and renders layouts
+off the calling thread, without a GUI window.
+"""
+
+import threading
+import time
+import pytest
+import numpy as np
+import cv2
+from unittest.mock import patch
+
+from src.background_cache import BackgroundCache
+from src.compositor import Compositor
+from src.layout_plan import compile_layouts
+from src.output_sink import NullSink, OutputSink
+
+MODES = {
+    'full': {'type': 'full_screen', 'pos': [0, 0], 'scale': 50},
+    'dual': {'type': 'dual_view', 'cam_top_left': 0, 'pos_top_left': [0, 0], 'scale_top_left': 50,
+             'cam_bottom_right': 1, 'pos_bottom_right': [80, 45], 'scale_bottom_right': 50},
+}
+
+
+class ThreadRecordingCamera:
+    """Camera stand-in recording which threads read its frames"""
+
+    def __init__(self, value):
+        self.frame = np.full((48, 64, 3), value, np.uint8)
+        self.frame_sequence = 1
+        self.threads = set()
+
+    def get_frame(self):
+        self.threads.add(threading.current_thread().name)
+        return self.frame
+
+
+@pytest.fixture
+def compositor(tmp_path):
+    path = str(tmp_path / "background.png")
+    cv2.imwrite(path, np.full((90, 160, 3), 40, np.uint8))
+    background = BackgroundCache(path)
+    cameras = [ThreadRecordingCamera(200), ThreadRecordingCamera(100)]
+    compositor = Compositor(cameras, compile_layouts(MODES, background.image.shape), background,
+                            fps=50)
+    compositor.start()
+    yield compositor
+    compositor.stop()
+
+
+def settle(frames=3, fps=50):
+    time.sleep(frames / fps)
+
+
+class TestCompositor:
+    """Test suite for Compositor"""
+
+    def test_layout_rendered_on_compositor_thread(self, compositor):
+        """Test a layout switch is rendered by the compositor thread"""
+        compositor.switch_layout('dual')
+        settle()
+
+        assert (compositor.canvas[:45, :80] == 200).all()
+        assert (compositor.canvas[45:, 80:] == 100).all()
+        assert (compositor.canvas[:45, 80:] == 40).all()
+        assert compositor.cameras[0].threads == {'Compositor'}
+
+    def test_unchanged_frames_not_output(self, compositor):
+        """Test ticks without new camera frames are skipped"""
+        compositor.switch_layout('dual')
+        settle(10)
+
+        stats = compositor.get_stats()
+        assert stats['layout'] == 'dual'
+        assert stats['frames_shown'] == 1
+        assert stats['frames_skipped'] > 0
+
+    def test_show_frame_overrides_layout(self, compositor):
+        """Test a full frame replaces the layout until cleared"""
+        compositor.switch_layout('dual')
+        compositor.show_frame(np.full((90, 160, 3), 7, np.uint8))
+        settle()
+        assert (compositor.canvas == 7).all()
+
+        compositor.show_frame(None)
+        settle()
+        assert (compositor.canvas[:45, :80] == 200).all()
+        assert (compositor.canvas[:45, 80:] == 40).all()
+
+    def test_overlay_drawn_on_top(self, compositor):
+        """Test an overlay is drawn over the layout and removed again"""
+        compositor.switch_layout('dual')
+        compositor.set_overlay(np.full((10, 10, 3), 255, np.uint8), (5, 5))
+        settle()
+        assert (compositor.canvas[5:15, 5:15] == 255).all()
+
+        compositor.set_overlay(None)
+        settle()
+        assert (compositor.canvas[5:15, 5:15] == 200).all()
+
+    def test_unknown_layout_shows_background(self, compositor):
+        """Test an unknown mode leaves the plain background"""
+        compositor.switch_layout('dual')
+        settle()
+        compositor.switch_layout('missing')
+        settle()
+
+        assert (compositor.canvas == 40).all()
+
+    def test_stop_ends_thread(self, compositor):
+        """Test stop joins the render thread"""
+        compositor.stop()
+        assert not any(t.name == 'Compositor' and t.is_alive() for t in threading.enumerate())
+
+
+class RecordingSink(OutputSink):
+    """Output stand-in recording what the compositor feeds it"""
+
+    def __init__(self, quit_after=None):
+        super().__init__(160, 90, 50, 'bgr')
+        self.frames = []
+        self.repeats = 0
+        self.running = False
+        self.quit_after = quit_after
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def write(self, frame):
+        self.frames.append(frame.copy())
+
+    def repeat(self, count=1):
+        self.repeats += count
+
+    def poll(self):
+        return self.quit_after is not None and len(self.frames) >= self.quit_after
+
+
+def make_compositor(tmp_path, sinks):
+    path = str(tmp_path / "background.png")
+    cv2.imwrite(path, np.full((90, 160, 3), 40, np.uint8))
+    background = BackgroundCache(path)
+    return Compositor([ThreadRecordingCamera(200), ThreadRecordingCamera(100)],
+                      compile_layouts(MODES, background.image.shape), background, fps=50, sinks=sinks)
+
+
+def test_sinks_fed_every_tick(tmp_path):
+    """Test sinks get changed frames and repeats for unchanged ticks"""
+    sinks = [RecordingSink(), RecordingSink()]
+    compositor = make_compositor(tmp_path, sinks)
+    compositor.start()
+    assert all(sink.running for sink in sinks)
+    compositor.switch_layout('dual')
+    settle(10)
+    compositor.stop()
+
+    stats = compositor.get_stats()
+    for sink in sinks:
+        assert not sink.running
+        assert (sink.frames[-1][:45, :80] == 200).all()
+        assert len(sink.frames) >= stats['frames_shown'] >= 1
+        assert sink.repeats >= stats['frames_skipped']
+    assert len(stats['outputs']) == 2
+
+
+def test_sink_requests_quit(tmp_path):
+    """Test a sink's poll() sets quit_requested"""
+    compositor = make_compositor(tmp_path, [RecordingSink(quit_after=1)])
+    compositor.start()
+    compositor.switch_layout('dual')
+    assert compositor.quit_requested.wait(2)
+    compositor.stop()
+
+
+def test_headless_makes_no_gui_calls(tmp_path):
+    """Test a compositor without a preview output never calls into highgui"""
+    with patch('cv2.imshow') as imshow, patch('cv2.waitKey') as wait_key:
+        compositor = make_compositor(tmp_path, [NullSink(160, 90, 50, 'bgr')])
+        compositor.start()
+        compositor.switch_layout('dual')
+        settle(5)
+        compositor.stop()
+    imshow.assert_not_called()
+    wait_key.assert_not_called()
+    assert compositor.sinks[0].get_stats()['written'] >= 1
@@ -0,0 +1,200 @@
+"""
+Unit tests for the encoder pipe
+
+Tests the encoder command line and the raw-frame writer (its queueing is
+the fan-out's and is tested there). A small Python script stands in for ffmpeg, copying its stdin to the
+destination (a file, or a tcp:// listener run by the test), so the pipe
+is exercised offline.
+"""
+
+import socket
+import stat
+import sys
+import threading
+import time
+import pytest
+import numpy as np
+
+from src.encoder_pipe import EncoderPipe, FileRecorder, build_encoder_command, output_format
+from src.pixel_format import PIXEL_FORMAT_I420, frame_shape
+
+
+FAKE_FFMPEG = """#!{python}
+import socket, sys, time
+destination = sys.argv[-1]
+if destination.startswith('tcp://'):
+    host, port = destination[len('tcp://'):].split(':')
+    out = socket.create_connection((host, int(port))).makefile('wb')
+else:
+    out = open(destination, 'wb')
+time.sleep({delay})  # A stalled encoder or network
+while True:
+    data = sys.stdin.buffer.read(65536)
+    if not data:
+        break
+    out.write(data)
+out.close()
+"""
+
+WIDTH, HEIGHT = 32, 24
+FRAME_BYTES = WIDTH * HEIGHT * 3
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Write an executable that copies stdin to its destination after a delay"""
+    def make(delay=0.0):
+        path = tmp_path / f"ffmpeg_{delay}"
+        path.write_text(FAKE_FFMPEG.format(python=sys.executable, delay=delay))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        return str(path)
+    return make
+
+
+def frame(value, width=WIDTH, height=HEIGHT):
+    return np.full((height, width, 3), value, np.uint8)
+
+
+class TestCommandLine:
+    """Test suite for the encoder command line"""
+
+    def test_rtmp_matches_stream_script(self):
+        """Test RTMP output uses the utils/ffmpeg.sh encoder settings"""
+        command = build_encoder_command('rtmp://a.rtmp.youtube.com/live2/key', 1920, 1080, 25,
+                                        silent_audio=True)
+        assert command[command.index('-s') + 1] == '1920x1080'
+        assert command[command.index('-pix_fmt') + 1] == 'bgr24'
+        assert command[command.index('-i') + 1] == 'pipe:0'
+        assert command[command.index('-vcodec') + 1] == 'libx264'
+        assert command[command.index('-b:v') + 1] == '15M'
+        assert command[command.index('-bufsize') + 1] == '30M'
+        assert command[command.index('-g') + 1] == '60'
+        assert 'anullsrc' in command[command.index('lavfi') + 2]
+        assert command[-3:] == ['-f', 'flv', 'rtmp://a.rtmp.youtube.com/live2/key']
+
+    def test_yuv_input_and_local_file(self):
+        """Test YUV canvases are described to ffmpeg and files pick their own container"""
+        command = build_encoder_command('/tmp/out.mp4', 64, 48, 50, PIXEL_FORMAT_I420)
+        assert command[command.index('-pix_fmt') + 1] == 'yuv420p'
+        assert command[-1] == '/tmp/out.mp4'
+        assert '-f' not in command[command.index('pipe:0'):]
+        assert '-an' not in command and 'lavfi' not in command
+
+    def test_output_formats(self):
+        """Test network destinations get a streaming container"""
+        assert output_format('rtmp://host/app/key') == 'flv'
+        assert output_format('tcp://127.0.0.1:9000') == 'mpegts'
+        assert output_format('recording.mkv') is None
+
+
+class TestEncoderPipe:
+    """Test suite for the raw-frame writer"""
+
+    def test_frames_written_in_order(self, fake_ffmpeg, tmp_path):
+        """Test written and repeated frames reach the encoder whole and in order"""
+        destination = str(tmp_path / "out.raw")
+        pipe = EncoderPipe(destination, WIDTH, HEIGHT, 25, queue_size=8, ffmpeg_path=fake_ffmpeg())
+        pipe.start()
+        for value in (10, 20):
+            pipe.write(frame(value))
+            time.sleep(0.05)
+        pipe.repeat(2)
+        pipe.stop()
+
+        data = np.fromfile(destination, np.uint8)
+        assert data.size == 4 * FRAME_BYTES
+        assert [data[i * FRAME_BYTES] for i in range(4)] == [10, 20, 20, 20]
+        stats = pipe.get_stats()
+        assert stats['written'] == 4
+        assert stats['repeated'] == 2
+        assert stats['dropped'] == 0
+        assert stats['bytes_written'] == data.size
+
+    def test_repeat_keeps_reference(self, fake_ffmpeg, tmp_path):
+        """Test repeats re-send the frame passed to write() without a copy"""
+        destination = str(tmp_path / "out.raw")
+        pipe = EncoderPipe(destination, WIDTH, HEIGHT, 25, ffmpeg_path=fake_ffmpeg())
+        pipe.start()
+        pipe.repeat()  # Nothing written yet: nothing to repeat
+        shared = frame(1)
+        shared.flags.writeable = False
+        pipe.write(shared)
+        pipe.repeat(2)
+        pipe.stop()
+        assert np.fromfile(destination, np.uint8).size == 3 * FRAME_BYTES
+        assert pipe.get_stats()['repeated'] == 2
+
+    def test_wrong_shape_refused(self, tmp_path):
+        """Test frames of another size are refused"""
+        pipe = EncoderPipe(str(tmp_path / "out.raw"), WIDTH, HEIGHT, 25)
+        with pytest.raises(ValueError):
+            pipe.write(np.zeros((10, 10, 3), np.uint8))
+
+    def test_yuv_frames(self, fake_ffmpeg, tmp_path):
+        """Test YUV canvases are written at 1.5 bytes per pixel"""
+        destination = str(tmp_path / "out.raw")
+        pipe = EncoderPipe(destination, WIDTH, HEIGHT, 25, PIXEL_FORMAT_I420, ffmpeg_path=fake_ffmpeg())
+        pipe.start()
+        pipe.write(np.full(frame_shape(WIDTH, HEIGHT, PIXEL_FORMAT_I420), 7, np.uint8))
+        pipe.stop()
+        assert np.fromfile(destination, np.uint8).size == WIDTH * HEIGHT * 3 // 2
+
+    def test_restart_after_encoder_exit(self, tmp_path):
+        """Test the encoder is restarted when it exits"""
+        script = tmp_path / "ffmpeg_exit"
+        script.write_text(f"#!{sys.executable}\nimport sys\nsys.stdin.buffer.read({FRAME_BYTES})\n")
+        script.chmod(script.stat().st_mode | stat.S_IEXEC)
+        pipe = EncoderPipe(str(tmp_path / "out.raw"), WIDTH, HEIGHT, 25, ffmpeg_path=str(script),
+                           restart_initial_delay=0.01, restart_max_delay=0.01)
+        pipe.start()
+        deadline = time.time() + 10
+        while pipe.get_stats()['restarts'] < 2 and time.time() < deadline:
+            pipe.write(frame(5))
+            time.sleep(0.02)
+        pipe.stop()
+        assert pipe.get_stats()['restarts'] >= 2
+
+
+def test_stream_to_local_listener(fake_ffmpeg):
+    """Test streaming to a tcp:// listener in place of the RTMP server"""
+    server = socket.create_server(('127.0.0.1', 0))
+    port = server.getsockname()[1]
+    received = bytearray()
+
+    def accept():
+        connection, _ = server.accept()
+        with connection:
+            while True:
+                data = connection.recv(65536)
+                if not data:
+                    break
+                received.extend(data)
+
+    listener = threading.Thread(target=accept, daemon=True)
+    listener.start()
+    pipe = EncoderPipe(f'tcp://127.0.0.1:{port}', WIDTH, HEIGHT, 25, queue_size=8,
+                       ffmpeg_path=fake_ffmpeg())
+    assert pipe.command[-3:-1] == ['-f', 'mpegts']
+    pipe.start()
+    for value in range(3):
+        pipe.write(frame(value))
+        time.sleep(0.02)
+    pipe.stop()
+    listener.join(timeout=10)
+    server.close()
+    assert len(received) == 3 * FRAME_BYTES
+    assert received[2 * FRAME_BYTES] == 2
+
+
+def test_recorder_opens_timestamped_file(fake_ffmpeg, tmp_path):
+    """Test the recorder expands its path pattern and creates the directory"""
+    pattern = str(tmp_path / "recordings" / "programme_%Y%m%d.raw")
+    recorder = FileRecorder(WIDTH, HEIGHT, 25, path=pattern, ffmpeg_path=fake_ffmpeg())
+    recorder.start()
+    recorder.write(frame(9))
+    recorder.stop()
+
+    path = time.strftime(pattern)
+    assert recorder.destination == path
+    assert recorder.command[-1] == path
+    assert np.fromfile(path, np.uint8)[0] == 9
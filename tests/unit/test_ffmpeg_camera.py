@@ -0,0 +1,182 @@
+"""
+Unit tests for the FFmpeg camera plugin
+
+Tests the decoder command line and the raw-frame pipe reader. A small
+Python script stands in for ffmpeg so the pipe is exercised offline; the
+real decoder is used on a local video file when ffmpeg is installed.
+"""
+
+import shutil
+import stat
+import sys
+import time
+import pytest
+import numpy as np
+import cv2
+
+from src.cameras.ffmpeg_camera import FFmpegCamera, build_ffmpeg_command, is_network_source
+
+
+FAKE_FFMPEG = """#!{python}
+import sys, time
+width, height, frames = {width}, {height}, {frames}
+out = sys.stdout.buffer
+for i in range(frames):
+    out.write(bytes([i % 256]) * (width * height * 3))
+    out.flush()
+    time.sleep(0.01)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    """Write an executable that pipes numbered raw frames like ffmpeg would"""
+    def make(width=32, height=24, frames=5):
+        path = tmp_path / f"ffmpeg_{width}x{height}_{frames}"
+        path.write_text(FAKE_FFMPEG.format(python=sys.executable, width=width, height=height, frames=frames))
+        path.chmod(path.stat().st_mode | stat.S_IEXEC)
+        return str(path)
+    return make
+
+
+def wait_for_sequence(camera, sequence, timeout=10.0):
+    deadline = time.time() + timeout
+    while camera.frame_sequence < sequence and time.time() < deadline:
+        time.sleep(0.01)
+    return camera.frame_sequence
+
+
+class TestCommandLine:
+    """Test suite for the ffmpeg command line"""
+
+    def test_rtsp_low_latency_flags(self):
+        """Test RTSP input uses TCP transport and no input buffering"""
+        command = build_ffmpeg_command('rtsp://cam/stream', size=(640, 360))
+        assert command[command.index('-fflags') + 1] == 'nobuffer'
+        assert command[command.index('-rtsp_transport') + 1] == 'tcp'
+        assert command[command.index('-vf') + 1] == 'scale=640:360'
+        assert command[-5:] == ['-f', 'rawvideo', '-pix_fmt', 'bgr24', 'pipe:1']
+        assert command.index('-rtsp_transport') < command.index('-i')
+
+    def test_local_file_options(self):
+        """Test local files can be paced and looped and need no transport"""
+        command = build_ffmpeg_command('clip.mp4', realtime=True, loop=True)
+        assert '-rtsp_transport' not in command
+        assert '-vf' not in command
+        assert '-re' in command
+        assert command[command.index('-stream_loop') + 1] == '-1'
+
+    def test_network_source(self):
+        """Test sources are classified as network streams or local files"""
+        assert is_network_source('rtsp://cam/stream')
+        assert not is_network_source('file:///tmp/clip.mp4')
+        assert not is_network_source('/tmp/clip.mp4')
+
+    def test_missing_source(self):
+        """Test a camera without a source is refused"""
+        with pytest.raises(ValueError):
+            FFmpegCamera(0, {'width': 32, 'height': 24})
+
+    def test_configured_size_scales(self):
+        """Test an explicit size is passed to the decoder's scaler"""
+        camera = FFmpegCamera(0, {'source': 'rtsp://cam/stream', 'width': 640, 'height': 360})
+        assert '-re' not in camera.command
+        assert camera.command[camera.command.index('-vf') + 1] == 'scale=640:360'
+
+
+class TestPipeCapture:
+    """Test suite for reading raw frames from the decoder's stdout"""
+
+    def test_frames_read_into_buffers(self, fake_ffmpeg):
+        """Test frames arrive whole, in order, in the preallocated pool"""
+        camera = FFmpegCamera(0, {'source': 'clip.mp4', 'width': 32, 'height': 24,
+                                  'ffmpeg_path': fake_ffmpeg(frames=200)})
+        try:
+            camera.capture_frames()
+            assert wait_for_sequence(camera, 3) >= 3
+            frame = camera.get_frame()
+            assert frame.shape == (24, 32, 3)
+            assert np.all(frame == frame.flat[0])
+            assert camera.is_connected()
+            assert camera.frame_buffer.get_stats()['allocations'] == 3
+        finally:
+            camera.stop()
+        assert not camera.is_connected()
+
+    def test_restart_after_end_of_stream(self, fake_ffmpeg):
+        """Test ffmpeg is restarted when its output ends"""
+        camera = FFmpegCamera(0, {'source': 'clip.mp4', 'width': 32, 'height': 24,
+                                  'ffmpeg_path': fake_ffmpeg(frames=2),
+                                  'restart_initial_delay': 0.01, 'restart_max_delay': 0.01})
+        try:
+            camera.capture_frames()
+            assert wait_for_sequence(camera, 5) >= 5
+            assert camera.get_camera_info()['restarts'] >= 2
+        finally:
+            camera.stop()
+
+    def test_inactive_camera_drains_without_publishing(self, fake_ffmpeg):
+        """Test keepalive keeps reading the pipe but publishes nothing"""
+        camera = FFmpegCamera(0, {'source': 'clip.mp4', 'width': 32, 'height': 24,
+                                  'ffmpeg_path': fake_ffmpeg(frames=200)})
+        camera.set_active(False)
+        try:
+            camera.capture_frames()
+            deadline = time.time() + 10
+            while camera.get_camera_info()['frames_skipped'] < 3 and time.time() < deadline:
+                time.sleep(0.01)
+            assert camera.get_camera_info()['frames_skipped'] >= 3
+            assert camera.frame_sequence == 0
+        finally:
+            camera.stop()
+
+    def test_no_ptz_without_https(self):
+        """Test PTZ commands fail cleanly when no HTTPS API is configured"""
+        camera = FFmpegCamera(0, {'source': 'clip.mp4', 'width': 32, 'height': 24})
+        assert camera.send_ptz_command("PtzCtrl", "Left") is False
+
+
+@pytest.mark.skipif(shutil.which('ffmpeg') is None or shutil.which('ffprobe') is None,
+                    reason="ffmpeg is not installed")
+def test_decode_local_file(tmp_path):
+    """Test the real decoder on a local file, probing then scaling it"""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 25, (64, 48))
+    for i in range(10):
+        writer.write(np.full((48, 64, 3), i * 20, np.uint8))
+    writer.release()
+
+    camera = FFmpegCamera(0, {'source': path})
+    assert (camera.width, camera.height) == (64, 48)
+    camera = FFmpegCamera(0, {'source': path, 'width': 32, 'height': 24})
+    try:
+        camera.capture_frames()
+        assert wait_for_sequence(camera, 3) >= 3
+        assert camera.get_frame().shape == (24, 32, 3)
+    finally:
+        camera.stop()
+
+
+def test_target_size_switches_decoder(fake_ffmpeg):
+    """Test a smaller tile restarts the decoder at a downscaled size without a gap"""
+    camera = FFmpegCamera(0, {'source': 'clip.mp4', 'width': 64, 'height': 48,
+                              'ffmpeg_path': fake_ffmpeg(64, 48, frames=500)})
+    try:
+        camera.capture_frames()
+        assert wait_for_sequence(camera, 2) >= 2
+
+        # The stand-in ignores -vf, so point it at frames of the new size
+        camera.ffmpeg_path = fake_ffmpeg(32, 24, frames=500)
+        camera.set_target_size((30, 20))
+        assert camera.frame_size == (32, 24)
+        assert '-vf' in camera.command and 'scale=32:24' in camera.command
+
+        deadline = time.time() + 10
+        while camera.get_camera_info()['resizes'] < 1 and time.time() < deadline:
+            time.sleep(0.01)
+        sequence = camera.frame_sequence
+        assert wait_for_sequence(camera, sequence + 2) >= sequence + 2
+        assert camera.get_frame().shape == (24, 32, 3)
+        assert camera.get_camera_info()['restarts'] == 0
+    finally:
+        camera.stop()
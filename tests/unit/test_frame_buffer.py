@@ -0,0 +1,148 @@
+"""
+Unit tests for the TripleBuffer frame slot
+
+Tests buffer rotation, sequence numbering and buffer reuse between the
+capture (producer) and compositor (consumer) sides.
+"""
+
+import threading
+import time
+import numpy as np
+
+from src.frame_buffer import TripleBuffer
+
+
+class TestTripleBuffer:
+    """Test suite for TripleBuffer"""
+
+    def test_empty_buffer(self):
+        """Test that a fresh buffer has no frame and sequence 0"""
+        buffer = TripleBuffer()
+
+        frame, sequence, timestamp = buffer.latest()
+        assert frame is None
+        assert sequence == 0
+        assert buffer.sequence == 0
+        assert not buffer.has_new_frame()
+
+    def test_publish_and_latest(self):
+        """Test that the newest published frame is returned with its metadata"""
+        buffer = TripleBuffer()
+
+        target = buffer.writable((4, 4, 3))
+        target[:] = 7
+        assert buffer.publish(target, timestamp=123.0) == 1
+        assert buffer.has_new_frame()
+
+        frame, sequence, timestamp = buffer.latest()
+        assert frame is target
+        assert sequence == 1
+        assert timestamp == 123.0
+        assert not buffer.has_new_frame()
+
+    def test_latest_skips_to_newest(self):
+        """Test that intermediate frames are dropped, not queued"""
+        buffer = TripleBuffer()
+
+        for value in range(5):
+            target = buffer.writable((2, 2, 3))
+            target[:] = value
+            buffer.publish(target)
+
+        frame, sequence, _ = buffer.latest()
+        assert sequence == 5
+        assert np.all(frame == 4)
+
+    def test_writer_never_touches_read_buffer(self):
+        """Test that the producer never writes into the consumer's array"""
+        buffer = TripleBuffer()
+        buffer.publish(buffer.writable((2, 2, 3)))
+        held, _, _ = buffer.latest()
+
+        for _ in range(10):
+            target = buffer.writable((2, 2, 3))
+            assert target is not held
+            buffer.publish(target)
+
+    def test_buffers_are_reused(self):
+        """Test that steady-state capture allocates no new arrays"""
+        buffer = TripleBuffer()
+        seen = set()
+
+        for _ in range(20):
+            target = buffer.writable((8, 8, 3))
+            buffer.publish(target)
+            frame, _, _ = buffer.latest()
+            seen.add(id(frame))
+
+        assert len(seen) <= 3
+
+    def test_publish_adopts_foreign_array(self):
+        """Test that an array allocated by the producer is adopted for reuse"""
+        buffer = TripleBuffer()
+        assert buffer.writable() is None
+
+        frame = np.zeros((2, 2, 3), dtype=np.uint8)
+        buffer.publish(frame)
+        latest, _, _ = buffer.latest()
+        assert latest is frame
+
+    def test_writable_reallocates_on_shape_change(self):
+        """Test that a resolution change reallocates the write buffer"""
+        buffer = TripleBuffer()
+        small = buffer.writable((2, 2, 3))
+        large = buffer.writable((4, 4, 3))
+
+        assert large is not small
+        assert large.shape == (4, 4, 3)
+
+    def test_clear_keeps_sequence_monotonic(self):
+        """Test that clearing buffers does not reset the sequence counter"""
+        buffer = TripleBuffer()
+        buffer.publish(buffer.writable((2, 2, 3)))
+        buffer.clear()
+
+        assert buffer.latest()[0] is None
+        assert buffer.publish(buffer.writable((2, 2, 3))) == 2
+
+    def test_stats_count_allocations_and_reuse(self):
+        """Test pool statistics for a preallocated steady-state producer"""
+        buffer = TripleBuffer()
+        buffer.preallocate((2, 2, 3))
+
+        for _ in range(6):
+            buffer.publish(buffer.writable())
+
+        stats = buffer.get_stats()
+        assert stats['allocations'] == 3
+        assert stats['reused'] == 6
+        assert stats['sequence'] == 6
+
+    def test_stats_count_dropped_frames(self):
+        """Test that frames overwritten before being read are counted"""
+        buffer = TripleBuffer()
+        buffer.preallocate((2, 2, 3))
+
+        buffer.publish()
+        buffer.publish()
+        buffer.latest()
+        buffer.publish()
+
+        assert buffer.get_stats()['dropped'] == 1
+
+    def test_wait_for_frame_wakes_on_publish(self):
+        """Test that a waiting consumer is woken by publish, not a timeout"""
+        buffer = TripleBuffer()
+        buffer.preallocate((2, 2, 3))
+        assert not buffer.wait_for_frame(0, timeout=0.01)
+
+        publisher = threading.Timer(0.05, buffer.publish)
+        publisher.start()
+        start = time.time()
+        assert buffer.wait_for_frame(0, timeout=5)
+        assert time.time() - start < 1
+        publisher.join()
+
+        # Already newer than the caller's sequence: no wait at all
+        assert buffer.wait_for_frame(0, timeout=0)
+        assert not buffer.wait_for_frame(1, timeout=0)
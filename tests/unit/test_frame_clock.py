@@ -0,0 +1,69 @@
+"""
+Unit tests for the compositor frame clock
+
+Tests deadline-based cadence, dropped-tick accounting and lateness
+statistics.
+"""
+
+import asyncio
+import time
+import pytest
+
+from src.frame_clock import FrameClock
+
+
+class TestFrameClock:
+    """Test suite for FrameClock"""
+
+    def test_steady_cadence(self):
+        """Test ticks follow the configured rate without drift"""
+        clock = FrameClock(50)
+        for _ in range(10):
+            time.sleep(0.005)  # rendering work shorter than a frame
+            clock.wait()
+
+        assert clock.elapsed == pytest.approx(10 / 50, abs=0.015)
+        stats = clock.get_stats()
+        assert stats['ticks'] == 10
+        assert stats['dropped'] == 0
+
+    def test_overrun_drops_ticks(self):
+        """Test a frame taking several intervals drops the missed ticks"""
+        clock = FrameClock(50)
+        time.sleep(0.075)  # 3.75 intervals
+
+        tick = clock.wait()
+
+        # Ticks 1 and 2 are gone; tick 3's slot is current and starts at once
+        assert clock.get_stats()['dropped'] == 2
+        assert tick == 3
+        assert clock.elapsed == pytest.approx(0.075, abs=0.01)
+
+    def test_late_tick_counted(self):
+        """Test a tick starting well after its deadline counts as late"""
+        clock = FrameClock(25)  # 40ms interval, late after 20ms
+        time.sleep(0.07)  # 30ms past tick 1, not a whole interval
+
+        assert clock.wait() == 1
+
+        stats = clock.get_stats()
+        assert stats['dropped'] == 0
+        assert stats['late'] == 1
+        assert stats['max_lateness'] == pytest.approx(0.03, abs=0.01)
+
+    def test_async_wait(self):
+        """Test the asyncio variant paces the same way"""
+        clock = FrameClock(30)
+
+        async def run():
+            for _ in range(6):
+                await clock.wait_async()
+
+        asyncio.run(run())
+        assert clock.elapsed == pytest.approx(6 / 30, abs=0.02)
+        assert clock.get_stats()['achieved_fps'] == pytest.approx(30, rel=0.15)
+
+    def test_invalid_rate(self):
+        """Test a non-positive rate is rejected"""
+        with pytest.raises(ValueError):
+            FrameClock(0)
@@ -0,0 +1,158 @@
+"""
+Unit tests for the frame fan-out
+
+Tests that each canvas is copied once and shared read-only by every sink,
+that buffers return to the pool when the last sink lets go, and that a
+stalled sink only drops its own frames.
+"""
+
+import threading
+import time
+import pytest
+import numpy as np
+
+from src.frame_fanout import FrameFanOut, FramePool
+from src.output_sink import OutputSink
+
+SHAPE = (24, 32, 3)
+
+
+class RecordingSink(OutputSink):
+    """Sink recording the arrays it is given, optionally blocking in write()"""
+
+    def __init__(self, queue_size=3, gate=None):
+        super().__init__(32, 24, 25, 'bgr', queue_size)
+        self.frames = []
+        self.repeats = 0
+        self.gate = gate
+        self.stopped_on = None
+
+    def write(self, frame):
+        if self.gate is not None:
+            self.gate.wait()
+        self.frames.append(frame)
+
+    def repeat(self, count=1):
+        self.repeats += count
+
+    def stop(self):
+        self.stopped_on = threading.current_thread().name
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+@pytest.fixture
+def fanout_factory():
+    fanouts = []
+
+    def make(sinks):
+        fanout = FrameFanOut(sinks, SHAPE, threading.Event())
+        fanout.start()
+        fanouts.append(fanout)
+        return fanout
+    yield make
+    for fanout in fanouts:
+        fanout.stop()
+
+
+class TestFrameFanOut:
+    """Test suite for FrameFanOut"""
+
+    def test_sinks_share_one_read_only_copy(self, fanout_factory):
+        """Test every sink gets the same read-only copy of the canvas"""
+        sinks = [RecordingSink(), RecordingSink()]
+        fanout = fanout_factory(sinks)
+        canvas = np.full(SHAPE, 7, np.uint8)
+        fanout.publish(canvas)
+        canvas[:] = 0  # The compositor reuses its canvas straight away
+        assert wait_until(lambda: all(sink.frames for sink in sinks))
+
+        first, second = sinks[0].frames[0], sinks[1].frames[0]
+        assert np.shares_memory(first, second)
+        assert not first.flags.writeable
+        assert (first == 7).all()
+        assert fanout.pool.allocations == 1
+
+    def test_buffers_recycled(self, fanout_factory):
+        """Test buffers return to the pool once every sink has moved on"""
+        sinks = [RecordingSink(), RecordingSink()]
+        fanout = fanout_factory(sinks)
+        for value in range(20):
+            fanout.publish(np.full(SHAPE, value, np.uint8))
+            assert wait_until(lambda: all(len(sink.frames) == value + 1 for sink in sinks))
+        # The frame each sink last wrote stays referenced, plus the one being filled
+        assert fanout.pool.allocations <= 3
+
+    def test_repeats_merge(self, fanout_factory):
+        """Test consecutive repeats travel as one queue entry"""
+        gate = threading.Event()
+        sink = RecordingSink(queue_size=2, gate=gate)
+        fanout = fanout_factory([sink])
+        fanout.publish(np.zeros(SHAPE, np.uint8))  # Held in write() by the gate
+        assert wait_until(lambda: fanout.get_stats()[0]['queue_depth'] == 0)
+        for _ in range(10):
+            fanout.repeat()
+        assert fanout.get_stats()[0]['queue_depth'] == 1
+        gate.set()
+        assert wait_until(lambda: sink.repeats == 10)
+        assert fanout.get_stats()[0]['dropped'] == 0
+
+    def test_stalled_sink_drops_only_its_own_frames(self, fanout_factory):
+        """Test a stalled sink neither blocks the publisher nor the other sinks"""
+        gate = threading.Event()
+        slow, fast = RecordingSink(queue_size=2, gate=gate), RecordingSink(queue_size=2)
+        fanout = fanout_factory([slow, fast])
+
+        started = time.monotonic()
+        for value in range(1, 21):
+            fanout.publish(np.full(SHAPE, value, np.uint8))
+            assert wait_until(lambda: len(fast.frames) == value)
+        assert time.monotonic() - started < 5
+
+        slow_stats, fast_stats = fanout.get_stats()
+        assert fast_stats['dropped'] == 0
+        assert slow_stats['dropped'] >= 17
+        assert slow_stats['queue_depth'] == slow_stats['max_queue_depth'] == 2
+
+        gate.set()
+        assert wait_until(lambda: fanout.get_stats()[0]['queue_depth'] == 0)
+        assert slow.frames[-1][0, 0, 0] == 20  # The newest frame survived
+
+    def test_stop_on_sink_thread(self):
+        """Test sinks are stopped on their own thread after draining"""
+        sink = RecordingSink()
+        fanout = FrameFanOut([sink], SHAPE, threading.Event())
+        fanout.start()
+        fanout.publish(np.zeros(SHAPE, np.uint8))
+        fanout.stop()
+        assert len(sink.frames) == 1
+        assert sink.stopped_on == 'Output-RecordingSink'
+
+    def test_poll_requests_quit(self):
+        """Test a sink's poll() sets the shared quit event"""
+        class QuitSink(RecordingSink):
+            def poll(self):
+                return True
+
+        quit_requested = threading.Event()
+        fanout = FrameFanOut([QuitSink()], SHAPE, quit_requested)
+        fanout.start()
+        assert quit_requested.wait(2)
+        fanout.stop()
+
+
+def test_pool_reuses_released_buffer():
+    """Test a released frame's buffer is handed out again"""
+    pool = FramePool(SHAPE)
+    frame = pool.frame_from(np.zeros(SHAPE, np.uint8))
+    frame.retain()
+    frame.release()
+    frame.release()
+    again = pool.frame_from(np.ones(SHAPE, np.uint8))
+    assert pool.allocations == 1
+    assert np.shares_memory(again.array, frame.array)
@@ -0,0 +1,311 @@
+"""
+Unit tests for IPCamera plugin
+
+Tests the RTSP capture path of the IP camera wrapper with the underlying
+Camera class (HTTP login and VideoCapture) replaced by fakes.
+"""
+
+import time
+import pytest
+import numpy as np
+from unittest.mock import MagicMock, patch
+
+import cv2
+
+from src.cameras.ip_camera import IPCamera
+
+
+class FakeCapture:
+    """VideoCapture stand-in that honours the image= output argument"""
+
+    def __init__(self, width=64, height=48, frames=None):
+        self.width = width
+        self.height = height
+        self.frames = frames  # None = endless
+        self.reads = 0
+        self.grabs = 0
+        self.retrieves = 0
+        self.released = False
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            return self.width
+        if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            return self.height
+        return 0
+
+    def isOpened(self):
+        return not self.released
+
+    def read(self, image=None):
+        if self.frames is not None and self.reads >= self.frames:
+            return False, None
+        self.reads += 1
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        image[:] = self.reads % 256
+        time.sleep(0.001)
+        return True, image
+
+    def grab(self):
+        if self.frames is not None and self.grabs >= self.frames:
+            return False
+        self.grabs += 1
+        time.sleep(0.001)
+        return True
+
+    def retrieve(self, image=None):
+        self.retrieves += 1
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        image[:] = self.grabs % 256
+        return True, image
+
+    def release(self):
+        self.released = True
+
+
+class LiveCapture(FakeCapture):
+    """FakeCapture whose packets arrive in real time, like a live RTSP stream"""
+
+    def __init__(self, period=0.005):
+        super().__init__()
+        self.period = period
+        self.start = time.time()
+        self.position = 0
+        self.first_read = None
+
+    def live(self):
+        """Index of the newest packet the camera has sent"""
+        return int((time.time() - self.start) / self.period)
+
+    def _next_packet(self):
+        self.position += 1
+        while self.live() < self.position:
+            time.sleep(self.period / 5)
+
+    def read(self, image=None):
+        self._next_packet()
+        if self.first_read is None:
+            self.first_read = self.position
+        self.reads += 1
+        if image is None or image.shape != (self.height, self.width, 3):
+            image = np.empty((self.height, self.width, 3), dtype=np.uint8)
+        image[:] = self.position % 256
+        return True, image
+
+    def grab(self):
+        self._next_packet()
+        self.grabs += 1
+        return True
+
+
+@pytest.fixture
+def fake_camera_class():
+    """Patch the wrapped Camera class so no network access happens"""
+    with patch('src.cameras.ip_camera.Camera') as camera_class:
+        instance = MagicMock()
+        instance.token = 'token'
+        instance.running = True
+        instance.cap = FakeCapture()
+        camera_class.return_value = instance
+        yield camera_class
+
+
+class TestIPCamera:
+    """Test suite for IPCamera capture path"""
+
+    def test_capture_reuses_frame_pool(self, fake_camera_class, ip_camera_config):
+        """Test that steady-state decoding allocates no new frame arrays"""
+        camera = IPCamera(0, ip_camera_config)
+        camera.capture_frames()
+        time.sleep(0.1)
+        camera.stop()
+
+        stats = camera.get_camera_info()['frame_pool']
+        assert stats['sequence'] > 3
+        assert stats['allocations'] == 3
+        assert stats['reused'] == stats['sequence']
+
+    def test_get_frame_returns_latest(self, fake_camera_class, ip_camera_config):
+        """Test that get_frame hands out the newest decoded frame"""
+        camera = IPCamera(0, ip_camera_config)
+        assert camera.get_frame() is None
+
+        camera.capture_frames()
+        time.sleep(0.05)
+        frame = camera.get_frame()
+        camera.stop()
+
+        assert frame.shape == (48, 64, 3)
+        assert camera.frame_sequence > 0
+
+    def test_invalid_capture_mode(self, fake_camera_class, ip_camera_config):
+        """Test that an unknown capture mode is rejected"""
+        config = {**ip_camera_config, 'capture_mode': 'sometimes'}
+        with pytest.raises(ValueError, match="capture_mode"):
+            IPCamera(0, config)
+
+    def test_on_demand_skips_unrequested_decodes(self, fake_camera_class, ip_camera_config):
+        """Test that on_demand mode grabs every packet but decodes only on request"""
+        config = {**ip_camera_config, 'capture_mode': 'on_demand'}
+        camera = IPCamera(0, config)
+        cap = fake_camera_class.return_value.cap
+
+        camera.capture_frames()
+        time.sleep(0.1)
+        assert cap.retrieves == 1  # Only the initial frame
+        assert camera.frame_sequence == 1
+
+        camera.get_frame()
+        time.sleep(0.02)
+        camera.stop()
+
+        info = camera.get_camera_info()
+        assert cap.reads == 0
+        assert cap.retrieves == 2
+        assert camera.frame_sequence == 2
+        assert info['frames_grabbed'] > info['frames_decoded'] == 2
+
+    def test_reconnects_after_stream_failure(self, fake_camera_class, ip_camera_config):
+        """Test that a failed read re-opens the stream and capture resumes"""
+        first = FakeCapture(frames=3)
+        fake_camera_class.return_value.cap = first
+        config = {**ip_camera_config, 'reconnect_initial_delay': 0.01}
+        camera = IPCamera(0, config)
+
+        with patch('src.cameras.ip_camera.cv2.VideoCapture', return_value=FakeCapture()) as video_capture:
+            camera.capture_frames()
+            time.sleep(0.15)
+            camera.stop()
+
+        video_capture.assert_called_with(ip_camera_config['rtsp_url'])
+        assert first.released
+        assert camera.frame_sequence > 3
+
+        info = camera.get_camera_info()
+        assert info['stream_connected'] is True
+        assert info['reconnects']['count'] == 1
+        assert info['reconnects']['last_latency'] is not None
+
+    def test_keeps_old_stream_until_standby_works(self, fake_camera_class, ip_camera_config):
+        """Test that failed standby opens back off and leave the old capture alone"""
+        first = FakeCapture(frames=1)
+        fake_camera_class.return_value.cap = first
+        dead = FakeCapture(frames=0)
+        config = {**ip_camera_config, 'reconnect_initial_delay': 0.01, 'reconnect_max_delay': 0.02}
+        camera = IPCamera(0, config)
+
+        with patch('src.cameras.ip_camera.cv2.VideoCapture', return_value=dead):
+            camera.capture_frames()
+            time.sleep(0.15)
+            assert not first.released
+            assert camera.get_camera_info()['stream_connected'] is False
+            camera.stop()
+
+        info = camera.get_camera_info()
+        assert info['reconnects']['count'] == 0
+        assert info['reconnects']['failed_attempts'] > 1
+        assert first.released
+
+    def test_backoff_is_bounded_and_jittered(self, fake_camera_class, ip_camera_config):
+        """Test exponential growth, jitter range and ceiling of the backoff"""
+        config = {**ip_camera_config, 'reconnect_initial_delay': 1.0, 'reconnect_max_delay': 8.0}
+        camera = IPCamera(0, config)
+
+        for attempt, ceiling in [(0, 1.0), (1, 2.0), (2, 4.0), (3, 8.0), (10, 8.0)]:
+            delay = camera._backoff_delay(attempt)
+            assert ceiling / 2 <= delay <= ceiling
+
+    def test_inactive_camera_only_keepalive_grabs(self, fake_camera_class, ip_camera_config):
+        """Test that an inactive camera grabs occasionally and never decodes"""
+        config = {**ip_camera_config, 'keepalive_interval': 0.05}
+        camera = IPCamera(0, config)
+        cap = fake_camera_class.return_value.cap
+        camera.set_active(False)
+
+        camera.capture_frames()
+        time.sleep(0.2)
+        camera.stop()
+
+        assert cap.reads == 0
+        assert cap.retrieves == 0
+        assert 1 <= cap.grabs <= 6
+
+    def test_flush_after_keepalive_resumes_live(self, fake_camera_class, ip_camera_config):
+        """Test that flushing on resume swaps in a capture at the live edge"""
+        cap = LiveCapture()
+        fake_camera_class.return_value.cap = cap
+        config = {**ip_camera_config, 'keepalive_interval': 0.05}
+        camera = IPCamera(0, config)
+        camera.set_active(False)
+
+        def reopen(url):
+            fresh = LiveCapture()
+            fresh.start = cap.start
+            fresh.position = fresh.live()
+            return fresh
+
+        with patch('src.cameras.ip_camera.cv2.VideoCapture', side_effect=reopen):
+            camera.capture_frames()
+            time.sleep(0.3)
+            backlog = cap.live() - cap.position
+            camera.set_active(True)
+            camera.flush()
+            deadline = time.time() + 5
+            while camera.get_camera_info()['stream_switches'] == 0 and time.time() < deadline:
+                time.sleep(0.001)
+            fresh = fake_camera_class.return_value.cap
+            while fresh.first_read is None and time.time() < deadline:
+                time.sleep(0.001)
+            live = fresh.live()
+            camera.stop()
+
+        # Keepalive left the old capture far behind; the fresh one is current
+        assert backlog > 40
+        assert cap.released
+        assert live - fresh.first_read <= 5
+
+    def test_small_tiles_switch_to_sub_stream(self, fake_camera_class, ip_camera_config):
+        """Test a layout drawing the camera small swaps in the sub-stream and back"""
+        config = {**ip_camera_config, 'sub_stream_url': 'rtsp://test/sub', 'sub_stream_size': [640, 360]}
+        camera = IPCamera(0, config)
+        main = fake_camera_class.return_value.cap
+        sub = FakeCapture(width=32, height=18)
+
+        with patch('src.cameras.ip_camera.cv2.VideoCapture', return_value=sub) as video_capture:
+            camera.capture_frames()
+            camera.set_target_size((640, 360))
+            deadline = time.time() + 5
+            while camera.get_camera_info()['stream_url'] != 'rtsp://test/sub' and time.time() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            frame = camera.get_frame()
+            camera.set_target_size((1280, 720))
+            assert camera._wanted_url == ip_camera_config['rtsp_url']
+            camera.stop()
+
+        video_capture.assert_any_call('rtsp://test/sub')
+        assert main.released
+        assert frame.shape == (18, 32, 3)
+        assert camera.get_camera_info()['stream_switches'] >= 1
+
+    def test_switching_back_opens_no_stream(self, fake_camera_class, ip_camera_config):
+        """Test returning to the current stream before a swap drops the pending one"""
+        config = {**ip_camera_config, 'sub_stream_url': 'rtsp://test/sub', 'sub_stream_size': [640, 360]}
+        camera = IPCamera(0, config)
+        sub = FakeCapture(width=32, height=18)
+        sub.grab = lambda: time.sleep(0.02) or True  # Still opening when the layout switches back
+
+        with patch('src.cameras.ip_camera.cv2.VideoCapture', return_value=sub) as video_capture:
+            camera.capture_frames()
+            camera.set_target_size((640, 360))
+            camera.set_target_size((1280, 720))
+            time.sleep(0.1)
+            camera.stop()
+
+        video_capture.assert_called_once_with('rtsp://test/sub')
+        assert sub.released
+        info = camera.get_camera_info()
+        assert info['stream_url'] == ip_camera_config['rtsp_url']
+        assert info['stream_switches'] == 0
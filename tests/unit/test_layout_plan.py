@@ -0,0 +1,230 @@
+"""
+Unit tests for compiled layout plans
+
+Tests that compiled plans draw what the old resize-then-crop layout math
+produced, clip tiles to the canvas and are reused per source resolution.
+"""
+
+import os
+import pytest
+import cv2
+import numpy as np
+import yaml
+from unittest.mock import Mock
+
+from src.layout_plan import LayoutPlan, compile_layouts, draw_tile
+
+CANVAS_SHAPE = (1080, 1920, 3)
+
+
+def frame_camera(shape=(480, 640, 3), seed=0):
+    """Camera stand-in returning a fixed smooth test pattern"""
+    height, width = shape[:2]
+    y, x = np.mgrid[0:height, 0:width]
+    frame = np.empty(shape, dtype=np.uint8)
+    frame[..., 0] = (x * 255 // width + seed * 40) % 256
+    frame[..., 1] = y * 255 // height
+    frame[..., 2] = ((x + y) * 127 // (width + height) + seed * 20) % 256
+    camera = Mock()
+    camera.get_frame.return_value = frame
+    return camera
+
+
+def resize_then_crop(frame, target_width, target_height, interpolation):
+    """Reference two-pass fit: resize to cover the target, then centre-crop"""
+    height, width = frame.shape[:2]
+    scale = max(target_width / width, target_height / height)
+    new_width, new_height = max(target_width, int(width * scale)), max(target_height, int(height * scale))
+    resized = cv2.resize(frame, (new_width, new_height), interpolation=interpolation)
+    x, y = (new_width - target_width) // 2, (new_height - target_height) // 2
+    return resized[y:y + target_height, x:x + target_width]
+
+
+def assert_close(result, expected):
+    """Single-pass output matches the two-pass reference up to resampling"""
+    assert result.shape == expected.shape
+    assert np.abs(result.astype(int) - expected.astype(int)).mean() < 1.5
+
+
+def load_modes():
+    path = os.path.join(os.path.dirname(__file__), '..', '..', 'src', 'mode_config.yaml')
+    with open(path) as f:
+        return yaml.safe_load(f)['modes']
+
+
+class TestLayoutPlan:
+    """Test suite for LayoutPlan"""
+
+    def test_dual_view_matches_resize_then_crop(self):
+        """Test a dual view plan draws what resizing then cropping produces"""
+        mode = {'type': 'dual_view', 'cam_top_left': 0, 'pos_top_left': [0, 0], 'scale_top_left': 40,
+                'cam_bottom_right': 1, 'pos_bottom_right': [768, 432], 'scale_bottom_right': 60}
+        cameras = [frame_camera(seed=1), frame_camera((720, 1280, 3), seed=2)]
+
+        result = LayoutPlan('dual', mode, CANVAS_SHAPE).render(np.zeros(CANVAS_SHAPE, np.uint8), cameras)
+
+        expected = np.zeros(CANVAS_SHAPE, np.uint8)
+        expected[0:432, 0:768] = resize_then_crop(cameras[0].get_frame(), 768, 432, cv2.INTER_LINEAR)
+        expected[432:1080, 768:1920] = resize_then_crop(cameras[1].get_frame(), 1152, 648, cv2.INTER_LINEAR)
+        assert_close(result, expected)
+
+    def test_left_column_matches_resize_then_crop(self):
+        """Test a left column plan draws what resizing then cropping produces"""
+        mode = {'type': 'left_column_right_main', 'cam_left_top': 1, 'pos_left_top': [0, 0],
+                'cam_left_bottom': 0, 'pos_left_bottom': [0, 540], 'cam_right': 2,
+                'pos_right': [807, 0], 'scale_left': 50, 'scale_right': 58}
+        cameras = [frame_camera(seed=i) for i in range(3)]
+
+        result = LayoutPlan('left', mode, CANVAS_SHAPE).render(np.zeros(CANVAS_SHAPE, np.uint8), cameras)
+
+        expected = np.zeros(CANVAS_SHAPE, np.uint8)
+        expected[0:540, 0:960] = resize_then_crop(cameras[1].get_frame(), 960, 540, cv2.INTER_AREA)
+        expected[540:1080, 0:960] = resize_then_crop(cameras[0].get_frame(), 960, 540, cv2.INTER_AREA)
+        expected[0:1080, 807:1920] = resize_then_crop(cameras[2].get_frame(), 1113, 1080, cv2.INTER_AREA)
+        assert_close(result, expected)
+
+    def test_tile_drawn_in_place(self):
+        """Test tiles are resized straight into the canvas ROI"""
+        layout = LayoutPlan('full', {'type': 'full_screen', 'pos': [0, 0], 'scale': 50}, CANVAS_SHAPE)
+        camera = frame_camera()
+        canvas = np.zeros(CANVAS_SHAPE, np.uint8)
+        plan = layout.plan_for(0, camera.get_frame().shape)
+
+        layout.render(canvas, [camera])
+
+        assert plan.size == (960, 540)
+        assert np.shares_memory(draw_tile(canvas, camera.get_frame(), plan), canvas)
+        assert canvas[plan.roi].any() and not canvas[540:].any()
+
+    def test_tile_clipped_to_canvas(self):
+        """Test a tile hanging off the canvas draws only its visible part"""
+        mode = {'type': 'full_screen', 'pos': [1900, 1050], 'scale': 5}
+        layout = LayoutPlan('edge', mode, CANVAS_SHAPE)
+
+        plan = layout.plan_for(0, (480, 640, 3))
+
+        assert plan.roi == (slice(1050, 1080), slice(1900, 1920))
+        result = layout.render(np.zeros(CANVAS_SHAPE, np.uint8), [frame_camera()])
+        assert result[1050:, 1900:].any()
+
+    def test_plans_cached_per_source_resolution(self):
+        """Test plans are built once per source resolution"""
+        layout = LayoutPlan('full', {'type': 'full_screen', 'pos': [0, 0], 'scale': 100}, CANVAS_SHAPE)
+
+        first = layout.plan_for(0, (480, 640, 3))
+        assert layout.plan_for(0, (480, 640, 3)) is first
+        assert layout.plan_for(0, (720, 1280, 3)) is not first
+
+    def test_missing_frame_keeps_canvas(self):
+        """Test tiles without a frame leave the canvas untouched"""
+        camera = Mock()
+        camera.get_frame.return_value = None
+        canvas = np.full(CANVAS_SHAPE, 7, np.uint8)
+
+        LayoutPlan('full', {'type': 'full_screen', 'pos': [0, 0], 'scale': 100}, CANVAS_SHAPE).render(canvas, [camera])
+
+        assert (canvas == 7).all()
+
+    def test_unknown_mode_type(self):
+        """Test unknown mode types are rejected"""
+        with pytest.raises(ValueError):
+            LayoutPlan('bad', {'type': 'picture_in_picture'}, CANVAS_SHAPE)
+
+    def test_target_sizes_cover_every_tile(self):
+        """Test a camera feeding several tiles is needed at the largest of them"""
+        mode = {'type': 'left_column_right_main', 'cam_left_top': 0, 'pos_left_top': [0, 0],
+                'cam_left_bottom': 1, 'pos_left_bottom': [0, 540], 'cam_right': 0, 'pos_right': [640, 0],
+                'scale_left': 33, 'scale_right': 67}
+        layout = LayoutPlan('left', mode, CANVAS_SHAPE)
+        sizes = layout.target_sizes
+        assert set(sizes) == {0, 1}
+        right = next(tile for tile in layout.tiles if tile.pos == (640, 0))
+        left = next(tile for tile in layout.tiles if tile.camera == 1)
+        assert sizes[0] == (max(right.size[0], left.size[0]), max(right.size[1], left.size[1]))
+        assert sizes[1] == left.size
+
+    def test_full_screen_target_size_is_four_by_three(self):
+        """Test full screen tiles need the 4:3 size they stretch the source to"""
+        layout = LayoutPlan('full', {'type': 'full_screen', 'pos': [0, 0], 'scale': 50}, CANVAS_SHAPE)
+        assert layout.target_sizes == {0: (960, 720)}
+
+
+class TestCompileLayouts:
+    """Test suite for compile_layouts"""
+
+    def test_compiles_configured_modes(self):
+        """Test every mode in mode_config.yaml compiles"""
+        modes = load_modes()
+        layouts = compile_layouts(modes, CANVAS_SHAPE)
+        assert set(layouts) == set(modes)
+
+    def test_invalid_mode_skipped(self):
+        """Test a broken mode is skipped instead of failing the others"""
+        layouts = compile_layouts({'ok': {'type': 'full_screen', 'pos': [0, 0], 'scale': 50},
+                                   'broken': {'type': 'dual_view'}}, CANVAS_SHAPE)
+        assert list(layouts) == ['ok']
+
+
+class SequencedCamera:
+    """Camera stand-in with a frame sequence counter"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.frame_sequence = 1
+        self.get_frame_calls = 0
+
+    def get_frame(self):
+        self.get_frame_calls += 1
+        return self.frame
+
+
+class TestDirtyTiles:
+    """Test suite for sequence-based dirty tile tracking"""
+
+    MODE = {'type': 'dual_view', 'cam_top_left': 0, 'pos_top_left': [0, 0], 'scale_top_left': 50,
+            'cam_bottom_right': 1, 'pos_bottom_right': [960, 540], 'scale_bottom_right': 50}
+
+    def _setup(self):
+        cameras = [SequencedCamera(np.full((48, 64, 3), 100 + i, np.uint8)) for i in range(2)]
+        return LayoutPlan('dual', self.MODE, CANVAS_SHAPE), cameras, np.zeros(CANVAS_SHAPE, np.uint8)
+
+    def test_unchanged_frames_skipped(self):
+        """Test tiles are not redrawn until their camera has a new frame"""
+        layout, cameras, canvas = self._setup()
+
+        assert layout.update(canvas, cameras) == 2
+        assert layout.update(canvas, cameras) == 0
+        cameras[1].frame_sequence += 1
+        assert layout.update(canvas, cameras) == 1
+        assert [c.get_frame_calls for c in cameras] == [1, 2]
+
+    def test_invalidate_redraws_all(self):
+        """Test invalidate forces a full redraw"""
+        layout, cameras, canvas = self._setup()
+        layout.update(canvas, cameras)
+
+        layout.invalidate()
+
+        assert layout.update(canvas, cameras) == 2
+        assert (canvas[:540, :960] == 100).all() and (canvas[540:, 960:] == 101).all()
+
+    def test_cameras_without_sequence_always_drawn(self):
+        """Test cameras lacking frame_sequence are redrawn every time"""
+        layout, _, canvas = self._setup()
+        cameras = [frame_camera(seed=i) for i in range(2)]
+        for camera in cameras:
+            camera.frame_sequence = None
+
+        assert layout.update(canvas, cameras) == 2
+        assert layout.update(canvas, cameras) == 2
+
+    def test_camera_in_two_tiles_read_once(self):
+        """Test a camera shown in two tiles hands out one frame for both"""
+        mode = dict(self.MODE, cam_bottom_right=0)
+        layout = LayoutPlan('dual', mode, CANVAS_SHAPE)
+        camera = SequencedCamera(np.full((48, 64, 3), 100, np.uint8))
+        canvas = np.zeros(CANVAS_SHAPE, np.uint8)
+
+        assert layout.update(canvas, [camera]) == 2
+        assert camera.get_frame_calls == 1
+        assert (canvas[:540, :960] == 100).all() and (canvas[540:, 960:] == 100).all()
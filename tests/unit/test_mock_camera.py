@@ -12,6 +12,7 @@ from unittest.mock import Mock, patch, MagicMock
 import numpy as np
 
 from src.cameras.mock_camera import MockCamera
+from src.layout_plan import LayoutPlan
 
 
 class TestMockCamera:
@@ -106,6 +107,26 @@ class TestMockCamera:
         assert camera.source == 'images'
         assert camera.image_paths == ['test_image.jpg']
     
+    @patch('cv2.imread')
+    def test_mock_camera_still_image_published_once(self, mock_imread, mock_camera_config):
+        """Test a single still image is decoded and published once, not every tick"""
+        mock_imread.return_value = np.full((48, 64, 3), 90, dtype=np.uint8)
+        config = {**mock_camera_config, 'source': 'images', 'image_paths': ['still.jpg']}
+        camera = MockCamera(0, config)
+        layout = LayoutPlan('full', {'type': 'full_screen', 'pos': [0, 0], 'scale': 100}, (90, 160, 3))
+        canvas = np.zeros((90, 160, 3), dtype=np.uint8)
+        
+        camera.capture_frames()
+        time.sleep(0.1)
+        assert layout.update(canvas, [camera]) == 1
+        time.sleep(0.1)
+        assert layout.update(canvas, [camera]) == 0
+        camera.stop()
+        
+        assert camera.frame_sequence == 1
+        mock_imread.assert_called_once_with('still.jpg')
+        assert (canvas == 90).all()
+    
     def test_mock_camera_frame_generation_content(self, mock_camera_config):
         """Test that generated frames have correct content and properties"""
         config = {**mock_camera_config, 'source': 'generated', 'width': 320, 'height': 240}
@@ -142,6 +163,21 @@ class TestMockCamera:
         
         camera.stop()
     
+    def test_mock_camera_frame_sequence_advances(self, mock_camera_config):
+        """Test that published frames carry an increasing sequence number"""
+        camera = MockCamera(0, mock_camera_config)
+        assert camera.frame_sequence == 0
+        
+        camera.capture_frames()
+        time.sleep(0.2)
+        
+        first = camera.frame_sequence
+        time.sleep(0.1)
+        assert first > 0
+        assert camera.frame_sequence > first
+        
+        camera.stop()
+    
     def test_mock_camera_ptz_commands(self, mock_camera_config):
         """Test PTZ command handling"""
         camera = MockCamera(0, mock_camera_config)
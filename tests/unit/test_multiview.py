@@ -0,0 +1,268 @@
+"""
+Unit tests for the frame pyramid and the operator multiview
+
+Tests that each camera frame is reduced once and shared by the programme
+tiles and the multiview cells, that the grid shows the programme, the next
+layout and every camera, and that the compositor publishes it to its own
+outputs.
+"""
+
+import time
+import pytest
+import numpy as np
+import cv2
+
+from src.background_cache import BackgroundCache
+from src.compositor import Compositor
+from src.frame_pyramid import FramePyramid, half_size, reduce_half
+from src.layout_plan import compile_layouts
+from src.multiview import Multiview, multiview_interval
+from src.output_sink import OutputSink
+from src.pixel_format import PIXEL_FORMAT_I420, frame_shape, from_bgr, to_bgr
+
+CANVAS_WIDTH, CANVAS_HEIGHT = 320, 180
+
+MODES = {
+    'full': {'type': 'full_screen', 'pos': [0, 0], 'scale': 100},
+    'dual': {'type': 'dual_view', 'cam_top_left': 0, 'pos_top_left': [0, 0], 'scale_top_left': 50,
+             'cam_bottom_right': 1, 'pos_bottom_right': [160, 90], 'scale_bottom_right': 50},
+}
+
+
+class SequencedCamera:
+    """Camera stand-in with a flat frame the test advances by hand"""
+
+    def __init__(self, camera_id, value, size=(CANVAS_WIDTH, CANVAS_HEIGHT)):
+        self.camera_id = camera_id
+        self.frame = np.full((size[1], size[0], 3), value, np.uint8)
+        self.frame_sequence = 1
+
+    def get_frame(self):
+        return self.frame
+
+    def show(self, value):
+        self.frame = np.full_like(self.frame, value)
+        self.frame_sequence += 1
+
+
+@pytest.fixture
+def background(tmp_path):
+    path = str(tmp_path / "background.png")
+    cv2.imwrite(path, np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 40, np.uint8))
+    return BackgroundCache(path)
+
+
+def cell(canvas, index, columns=2, cell_size=(160, 90)):
+    """Pixels of a multiview cell below its label"""
+    width, height = cell_size
+    x, y = (index % columns) * width, (index // columns) * height
+    return canvas[y + height // 2:y + height, x:x + width]
+
+
+class TestFramePyramid:
+    """Test suite for FramePyramid"""
+
+    def test_reduced_once_per_frame(self):
+        """Test a camera frame is reduced once and its buffer reused"""
+        pyramid = FramePyramid((32, 24))
+        frame = np.full((48, 64, 3), 9, np.uint8)
+        source = (slice(0, 48), slice(0, 64))
+        first = pyramid.level('cam', 1, frame, 'bgr', source)
+        assert pyramid.level('cam', 1, frame, 'bgr', source) is first
+        again = pyramid.level('cam', 2, frame, 'bgr', source)
+        assert np.shares_memory(first, again)
+        assert pyramid.get_stats() == {'reductions': 2, 'hits': 1}
+        assert first.shape == (24, 32, 3) and (first == 9).all()
+
+    def test_other_interpolation_reduced_again(self):
+        """Test a level reduced with one interpolation is not reused for another"""
+        pyramid = FramePyramid((32, 24))
+        frame = np.zeros((48, 64, 3), np.uint8)
+        source = (slice(0, 48), slice(0, 64))
+        pyramid.level('cam', 1, frame, 'bgr', source, cv2.INTER_AREA)
+        pyramid.level('cam', 1, frame, 'bgr', source, cv2.INTER_LINEAR)
+        pyramid.level('cam', 1, frame, 'bgr', source, cv2.INTER_LINEAR)
+        assert pyramid.get_stats() == {'reductions': 2, 'hits': 1}
+
+    def test_frames_without_sequence_never_reused(self):
+        """Test frames of cameras without a sequence are always reduced"""
+        pyramid = FramePyramid((32, 24))
+        frame = np.zeros((48, 64, 3), np.uint8)
+        for _ in range(2):
+            pyramid.level('cam', None, frame, 'bgr', (slice(0, 48), slice(0, 64)))
+        assert pyramid.reductions == 2
+
+    def test_reduce_half_yuv(self):
+        """Test YUV frames are reduced plane by plane to even sizes"""
+        frame = from_bgr(np.full((92, 130, 3), 128, np.uint8), PIXEL_FORMAT_I420)
+        reduced = reduce_half(frame, PIXEL_FORMAT_I420)
+        assert half_size(130, 92, PIXEL_FORMAT_I420) == (64, 46)
+        assert reduced.shape == frame_shape(64, 46, PIXEL_FORMAT_I420)
+        assert np.abs(to_bgr(reduced, PIXEL_FORMAT_I420).astype(int) - 128).max() <= 2
+
+
+class TestSharedTiles:
+    """Test suite for programme tiles drawn from the pyramid"""
+
+    def test_tile_of_level_size_shares_reduction(self):
+        """Test a tile of the level size copies the level, matching a direct resize"""
+        cameras = [SequencedCamera(0, 0, (640, 360)), SequencedCamera(1, 0, (640, 360))]
+        y, x = np.mgrid[0:360, 0:640]
+        for camera in cameras:
+            camera.frame = np.dstack([x % 256, y % 256, (x + y) % 256]).astype(np.uint8)
+        layout = compile_layouts(MODES, (CANVAS_HEIGHT, CANVAS_WIDTH))['dual']
+        pyramid = FramePyramid((160, 90))
+
+        shared = layout.render(np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH, 3), np.uint8), cameras, pyramid=pyramid)
+        direct = layout.render(np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH, 3), np.uint8), cameras)
+        assert pyramid.reductions == 2
+        assert np.array_equal(shared, direct)
+
+    def test_tile_of_other_size_resized_directly(self):
+        """Test tiles that are not of the level size leave the pyramid alone"""
+        cameras = [SequencedCamera(0, 50, (640, 360))]
+        layout = compile_layouts(MODES, (CANVAS_HEIGHT, CANVAS_WIDTH))['full']
+        pyramid = FramePyramid((160, 90))
+        layout.render(np.zeros((CANVAS_HEIGHT, CANVAS_WIDTH, 3), np.uint8), cameras, pyramid=pyramid)
+        assert pyramid.reductions == 0
+
+
+class TestMultiview:
+    """Test suite for Multiview"""
+
+    def test_grid_shows_programme_next_and_cameras(self, background):
+        """Test every cell shows its source at half size"""
+        cameras = [SequencedCamera(7, 100, (640, 360)), SequencedCamera(8, 200, (640, 360))]
+        layouts = compile_layouts(MODES, background.image.shape)
+        multiview = Multiview(cameras, layouts, background)
+        assert multiview.size == (320, 180)
+        multiview.set_next_layout('full')
+
+        programme = np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 60, np.uint8)
+        assert multiview.update(programme, True)
+        canvas = multiview.canvas
+        assert (cell(canvas, 0) == 60).all()
+        assert (cell(canvas, 1) == 100).all()  # Camera 0 full screen
+        assert (cell(canvas, 2) == 100).all()
+        assert (cell(canvas, 3) == 200).all()
+
+        # Nothing changed: nothing redrawn
+        assert not multiview.update(programme, False)
+        cameras[1].show(150)
+        assert multiview.update(programme, False)
+        assert (cell(multiview.canvas, 3) == 150).all()
+
+    def test_camera_frames_reduced_once(self, background):
+        """Test the programme and the multiview share one reduction per camera frame"""
+        cameras = [SequencedCamera(0, 100, (640, 360)), SequencedCamera(1, 200, (640, 360))]
+        layouts = compile_layouts(MODES, background.image.shape)
+        multiview = Multiview(cameras, layouts, background)
+        multiview.set_next_layout('dual')
+        canvas = background.new_canvas()
+
+        for value in (110, 120, 130):
+            for camera in cameras:
+                camera.show(value)
+            layouts['dual'].update(canvas, cameras, background.image, multiview.pyramid)
+            multiview.update(canvas, True)
+        stats = multiview.get_stats()['pyramid']
+        assert stats['reductions'] == 6
+        assert stats['hits'] >= 6
+        assert (cell(multiview.canvas, 2) == 130).all()
+
+    def test_yuv_canvas(self, tmp_path):
+        """Test the multiview composes in the programme's YUV format"""
+        path = str(tmp_path / "background.png")
+        cv2.imwrite(path, np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 40, np.uint8))
+        background = BackgroundCache(path, PIXEL_FORMAT_I420)
+        cameras = [SequencedCamera(0, 128, (640, 360))]
+        multiview = Multiview(cameras, compile_layouts(MODES, (CANVAS_HEIGHT, CANVAS_WIDTH), PIXEL_FORMAT_I420),
+                              background, columns=3)
+        assert multiview.size == (480, 90)
+        assert multiview.update(background.new_canvas(), True)
+        assert multiview.canvas.shape == frame_shape(480, 90, PIXEL_FORMAT_I420)
+        assert np.abs(to_bgr(multiview.canvas, PIXEL_FORMAT_I420)[60:, 330:].astype(int) - 128).max() <= 2
+
+    def test_stale_camera_cell_labelled(self, background):
+        """Test a frozen camera cell is labelled stale until it gets frames again"""
+        cameras = [SequencedCamera(7, 100, (640, 360)), SequencedCamera(8, 200, (640, 360))]
+        for camera in cameras:
+            camera.frame_timestamp = time.time()
+        multiview = Multiview(cameras, compile_layouts(MODES, background.image.shape), background)
+        programme = np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 60, np.uint8)
+        assert multiview.update(programme, True)
+        assert not multiview.update(programme, False)
+        label_area = (slice(90, 120), slice(160, 320))
+        fresh_label = multiview.canvas[label_area].copy()
+
+        # Camera 8 stalled (e.g. reconnecting): its cell is redrawn with a stale label
+        cameras[1].frame_timestamp = time.time() - 10
+        assert multiview.update(programme, False)
+        assert multiview.get_stats()['stale_cells'] == ['CAM 8']
+        assert not np.array_equal(multiview.canvas[label_area], fresh_label)
+        assert not multiview.update(programme, False)
+
+        cameras[1].frame_timestamp = time.time()
+        assert multiview.update(programme, False)
+        assert multiview.get_stats()['stale_cells'] == []
+        assert np.array_equal(multiview.canvas[label_area], fresh_label)
+
+    def test_live_camera_read_long_ago_not_stale(self, background):
+        """Test a camera with new frames is live however old its last read frame is"""
+        cameras = [SequencedCamera(7, 100, (640, 360))]
+        multiview = Multiview(cameras, compile_layouts(MODES, background.image.shape), background)
+        programme = np.full((CANVAS_HEIGHT, CANVAS_WIDTH, 3), 60, np.uint8)
+        assert multiview.update(programme, True)
+
+        # Last read a multiview interval ago, but it has published since
+        cameras[0].frame_timestamp = time.time() - 10
+        cameras[0].show(120)
+        assert multiview.update(programme, False)
+        assert multiview.get_stats()['stale_cells'] == []
+
+    def test_default_interval_from_canvas(self, background):
+        """Test canvases above 720p default to a rarer multiview frame"""
+        assert multiview_interval(1920, 1080) == 150
+        assert multiview_interval(1280, 720) == 100
+        assert Multiview([], {}, background).interval == 100
+        assert Multiview([], {}, background, interval=3).interval == 3
+
+    def test_invalid_settings(self, background):
+        """Test a zero interval is refused"""
+        with pytest.raises(ValueError):
+            Multiview([], {}, background, interval=0)
+
+
+class RecordingSink(OutputSink):
+    """Sink recording the frames it is given"""
+
+    def __init__(self, width, height):
+        super().__init__(width, height, 50, 'bgr')
+        self.frames = []
+
+    def write(self, frame):
+        self.frames.append(frame)
+
+
+def test_compositor_publishes_multiview(background):
+    """Test the compositor feeds the multiview outputs at its interval"""
+    cameras = [SequencedCamera(0, 100), SequencedCamera(1, 200)]
+    layouts = compile_layouts(MODES, background.image.shape)
+    multiview = Multiview(cameras, layouts, background, interval=2)
+    programme_sink, multiview_sink = RecordingSink(320, 180), RecordingSink(*multiview.size)
+    compositor = Compositor(cameras, layouts, background, 50, [programme_sink], multiview, [multiview_sink])
+    compositor.start()
+    compositor.switch_layout('dual')
+    compositor.set_next_layout('full')
+    deadline = time.time() + 5
+    while len(multiview_sink.frames) < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    compositor.stop()
+
+    frame = multiview_sink.frames[-1]
+    assert frame.shape == (180, 320, 3)
+    assert (cell(frame, 1) == 100).all()
+    assert (cell(frame, 3) == 200).all()
+    stats = compositor.get_stats()['multiview']
+    assert stats['frames_composed'] >= 1
+    assert stats['outputs'][0]['name'] == 'RecordingSink'
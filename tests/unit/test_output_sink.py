@@ -0,0 +1,122 @@
+"""
+Unit tests for the output sinks
+
+Tests creating sinks from the 'outputs' config and the preview and null
+sinks, with the OpenCV window calls patched out.
+"""
+
+import threading
+import time
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from src.output_sink import (
+    DEFAULT_OUTPUTS, NullSink, PreviewSink, create_output_sinks, list_sink_types
+)
+from src.pixel_format import PIXEL_FORMAT_I420, from_bgr
+
+
+class TestCreateOutputSinks:
+    """Test suite for creating sinks from config"""
+
+    def test_default_is_preview(self):
+        """Test the default outputs are a single preview window"""
+        sinks = create_output_sinks(DEFAULT_OUTPUTS, 64, 48, 25, 'bgr')
+        assert len(sinks) == 1
+        assert isinstance(sinks[0], PreviewSink)
+
+    def test_options_passed(self):
+        """Test config options and canvas geometry reach the sinks"""
+        sinks = create_output_sinks([{'type': 'preview', 'window_name': 'Programme'}, {'type': 'null'}],
+                                    64, 48, 25, PIXEL_FORMAT_I420)
+        assert sinks[0].window_name == 'Programme'
+        assert isinstance(sinks[1], NullSink)
+        assert (sinks[1].width, sinks[1].height, sinks[1].pixel_format) == (64, 48, PIXEL_FORMAT_I420)
+
+    def test_unknown_type(self):
+        """Test an unknown output type is refused"""
+        assert {'preview', 'null'} <= set(list_sink_types())
+        with pytest.raises(ValueError):
+            create_output_sinks([{'type': 'hologram'}], 64, 48, 25, 'bgr')
+
+
+class TestPreviewSink:
+    """Test suite for the preview window"""
+
+    def test_shows_bgr(self):
+        """Test a YUV canvas is converted to BGR and shown from the GUI thread"""
+        sink = PreviewSink(64, 48, 25, PIXEL_FORMAT_I420, window_name='Preview')
+        canvas = from_bgr(np.full((48, 64, 3), 128, np.uint8), PIXEL_FORMAT_I420)
+        threads = []
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+
+        with patch('cv2.imshow', side_effect=record_thread) as imshow, patch('cv2.waitKey', return_value=-1), \
+                patch('cv2.destroyWindow') as destroy_window:
+            sink.start()
+            sink.write(canvas)
+            sink.stop()
+        name, image = imshow.call_args[0]
+        assert name == 'Preview'
+        assert image.shape == (48, 64, 3)
+        assert threads == ['HighGUI']
+        destroy_window.assert_called_once_with('Preview')
+        assert sink.get_stats()['frames_shown'] == 1
+
+    def test_quit_key(self):
+        """Test 'q' in the window requests quit"""
+        sink = PreviewSink(64, 48, 25, 'bgr')
+        with patch('cv2.waitKey', return_value=-1):
+            sink.start()
+            time.sleep(0.05)
+            assert not sink.poll()
+            with patch('cv2.waitKey', return_value=ord('q')):
+                deadline = time.time() + 2
+                while not sink.poll() and time.time() < deadline:
+                    time.sleep(0.01)
+                assert sink.poll()
+            sink.stop()
+
+    def test_previews_share_one_gui_thread(self):
+        """Test two previews on their own threads make every HighGUI call from one thread"""
+        sinks = [PreviewSink(64, 48, 25, 'bgr', window_name=name) for name in ('Programme', 'Multiview')]
+        threads = set()
+
+        def record(*args):
+            threads.add(threading.current_thread().name)
+            return -1
+
+        with patch('cv2.imshow', side_effect=record), patch('cv2.waitKey', side_effect=record), \
+                patch('cv2.destroyWindow', side_effect=record):
+            def show(sink):
+                sink.start()
+                for _ in range(20):
+                    sink.write(np.zeros((48, 64, 3), np.uint8))
+                sink.stop()
+
+            workers = [threading.Thread(target=show, args=(sink,)) for sink in sinks]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join(timeout=5)
+
+        assert threads == {'HighGUI'}
+        assert [sink.get_stats()['frames_shown'] for sink in sinks] == [20, 20]
+
+    def test_stop_without_window(self):
+        """Test stopping a preview that never showed a frame"""
+        PreviewSink(64, 48, 25, 'bgr').stop()
+        sink = PreviewSink(64, 48, 25, 'bgr')
+        with patch('cv2.waitKey', return_value=-1):
+            sink.start()
+            sink.stop()
+
+
+def test_null_sink_counts():
+    """Test the null sink only counts frames"""
+    sink = NullSink(64, 48, 25, 'bgr')
+    sink.write(np.zeros((48, 64, 3), np.uint8))
+    sink.repeat(3)
+    assert sink.get_stats() == {'written': 1, 'repeated': 3}
@@ -0,0 +1,112 @@
+"""
+Unit tests for YUV 4:2:0 composition
+
+Tests plane views of I420/NV12 frames and that layouts composed directly
+in YUV match converting the BGR composite, for YUV and BGR cameras.
+"""
+
+import pytest
+import cv2
+import numpy as np
+from unittest.mock import Mock
+
+from src.pixel_format import (
+    PIXEL_FORMAT_BGR, PIXEL_FORMAT_I420, PIXEL_FORMAT_NV12,
+    from_bgr, frame_shape, image_size, paste, planes, to_bgr
+)
+from src.layout_plan import LayoutPlan
+from src.background_cache import BackgroundCache
+
+CANVAS_SHAPE = (360, 640)
+
+DUAL_VIEW = {'type': 'dual_view', 'cam_top_left': 0, 'pos_top_left': [0, 0], 'scale_top_left': 51,
+             'cam_bottom_right': 1, 'pos_bottom_right': [311, 177], 'scale_bottom_right': 51}
+
+
+def pattern(width, height, seed=0):
+    """Smooth BGR test pattern (even-sized)"""
+    y, x = np.mgrid[0:height, 0:width]
+    image = np.empty((height, width, 3), dtype=np.uint8)
+    image[..., 0] = (x * 255 // width + seed * 40) % 256
+    image[..., 1] = y * 255 // height
+    image[..., 2] = ((x + y) * 127 // (width + height) + seed * 20) % 256
+    return image
+
+
+def camera(frame, pixel_format=PIXEL_FORMAT_BGR):
+    cam = Mock()
+    cam.get_frame.return_value = frame
+    cam.pixel_format = pixel_format
+    return cam
+
+
+@pytest.mark.parametrize("pixel_format", [PIXEL_FORMAT_I420, PIXEL_FORMAT_NV12])
+class TestPlanes:
+    """Test suite for YUV plane handling"""
+
+    def test_round_trip(self, pixel_format):
+        """Test BGR -> YUV -> BGR keeps the picture"""
+        image = pattern(64, 54)
+        frame = from_bgr(image, pixel_format)
+        assert frame.shape == frame_shape(64, 54, pixel_format) == (81, 64)
+        assert image_size(frame, pixel_format) == (64, 54)
+        assert np.abs(to_bgr(frame, pixel_format).astype(int) - image).mean() < 3
+
+    def test_planes_are_views(self, pixel_format):
+        """Test planes alias the frame, including chroma not starting on a row boundary"""
+        frame = from_bgr(pattern(64, 54), pixel_format)
+        split = planes(frame, pixel_format)
+        assert split[0].shape == (54, 64)
+        assert split[1].shape[:2] == (27, 32)
+        for plane in split:
+            assert np.shares_memory(plane, frame)
+
+    def test_paste_clips(self, pixel_format):
+        """Test pasting near the edge writes only the visible part"""
+        canvas = from_bgr(np.zeros((40, 40, 3), np.uint8), pixel_format)
+        paste(canvas, from_bgr(np.full((20, 20, 3), 255, np.uint8), pixel_format), (30, 30), pixel_format)
+        bgr = to_bgr(canvas, pixel_format)
+        assert bgr[35, 35].min() > 200
+        assert bgr[10, 10].max() < 30
+
+
+@pytest.mark.parametrize("pixel_format", [PIXEL_FORMAT_I420, PIXEL_FORMAT_NV12])
+@pytest.mark.parametrize("camera_format", [PIXEL_FORMAT_BGR, 'yuv'])
+def test_yuv_layout_matches_bgr_composite(pixel_format, camera_format):
+    """Test composing in YUV gives the picture of converting the BGR composite"""
+    sources = [pattern(320, 180, 0), pattern(320, 180, 1)]
+    frame_format = pixel_format if camera_format == 'yuv' else PIXEL_FORMAT_BGR
+    cameras = [camera(from_bgr(source, frame_format), frame_format) for source in sources]
+    bgr_cameras = [camera(source) for source in sources]
+
+    expected = LayoutPlan('dual', DUAL_VIEW, CANVAS_SHAPE).render(np.zeros(CANVAS_SHAPE + (3,), np.uint8),
+                                                                  bgr_cameras)
+    canvas = from_bgr(np.zeros(CANVAS_SHAPE + (3,), np.uint8), pixel_format)
+    LayoutPlan('dual', DUAL_VIEW, CANVAS_SHAPE, pixel_format).render(canvas, cameras)
+
+    assert canvas.shape == frame_shape(640, 360, pixel_format)
+    # Tiles grow by up to a pixel to even edges; compare away from the borders
+    difference = np.abs(to_bgr(canvas, pixel_format).astype(int) - expected.astype(int))
+    assert difference[4:176, 4:320].mean() < 4
+    assert difference[182:356, 316:636].mean() < 4
+
+
+def test_yuv_background_reset(tmp_path):
+    """Test the background is converted once and restored plane by plane"""
+    path = str(tmp_path / "background.png")
+    cv2.imwrite(path, pattern(640, 360, 2))
+    cache = BackgroundCache(path, PIXEL_FORMAT_I420)
+    assert cache.size == (640, 360)
+    assert cache.image.shape == (540, 640)
+
+    canvas = np.zeros_like(cache.image)
+    cache.reset(canvas, [(slice(0, 100), slice(0, 200))])
+    bgr = to_bgr(canvas, PIXEL_FORMAT_I420)
+    assert np.abs(bgr[:100, :200].astype(int) - pattern(640, 360, 2)[:100, :200]).mean() < 3
+    assert not canvas[200:360, 300:].any()  # Luma outside the region untouched
+
+
+def test_unknown_pixel_format():
+    """Test unsupported formats are refused"""
+    with pytest.raises(ValueError):
+        LayoutPlan('dual', DUAL_VIEW, CANVAS_SHAPE, 'rgb565')
@@ -0,0 +1,79 @@
+"""
+Unit tests for the PTZ token manager
+
+Tests token caching, lease-driven refresh and re-login against the local
+stand-in camera API.
+"""
+
+import time
+import pytest
+
+from src.ptz_auth import TokenManager, is_login_required
+
+
+class TestIsLoginRequired:
+    """Test suite for is_login_required"""
+
+    def test_login_required_response(self):
+        """Test the expired-token response is recognised"""
+        assert is_login_required({'cmd': 'PtzCtrl', 'code': 1, 'error': {'rspCode': -6}})
+
+    def test_other_responses(self):
+        """Test success and unrelated errors are not"""
+        assert not is_login_required({'cmd': 'PtzCtrl', 'code': 0})
+        assert not is_login_required({'cmd': 'PtzCtrl', 'code': 1, 'error': {'rspCode': -9}})
+
+
+class TestTokenManager:
+    """Test suite for TokenManager"""
+
+    def test_token_cached(self, fake_camera_api):
+        """Test repeated get_token calls log in once"""
+        manager = TokenManager(fake_camera_api.url, 'admin', 'admin')
+
+        token = manager.get_token()
+        assert token is not None
+        assert manager.get_token() == token
+        assert fake_camera_api.logins == 1
+        assert manager.get_stats()['expires_in'] == pytest.approx(3600, abs=5)
+
+    def test_expired_lease_logs_in_again(self, fake_camera_api):
+        """Test a token past its lease is replaced on the next call"""
+        fake_camera_api.lease_time = 1
+        manager = TokenManager(fake_camera_api.url, 'admin', 'admin')
+        first = manager.get_token()
+
+        time.sleep(1.05)
+
+        assert manager.get_token() != first
+        assert fake_camera_api.logins == 2
+
+    def test_renew_shared_by_concurrent_callers(self, fake_camera_api):
+        """Test only the first caller with a rejected token logs in"""
+        manager = TokenManager(fake_camera_api.url, 'admin', 'admin')
+        rejected = manager.get_token()
+
+        renewed = manager.renew(rejected)
+        assert renewed != rejected
+        assert manager.renew(rejected) == renewed
+        assert fake_camera_api.logins == 2
+
+    def test_background_refresh_before_expiry(self, fake_camera_api):
+        """Test the refresh thread renews the token within the lease"""
+        fake_camera_api.lease_time = 1
+        manager = TokenManager(fake_camera_api.url, 'admin', 'admin')
+        first = manager.get_token()
+        manager.start()
+
+        time.sleep(0.8)
+        manager.stop()
+
+        assert manager.token != first
+        assert manager.is_valid()
+
+    def test_failed_login(self, fake_camera_api):
+        """Test wrong credentials yield no token"""
+        manager = TokenManager(fake_camera_api.url, 'admin', 'wrong')
+
+        assert manager.get_token() is None
+        assert manager.get_stats()['login_failures'] == 1
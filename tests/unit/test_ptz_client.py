@@ -0,0 +1,207 @@
+"""
+Unit tests for the asynchronous PTZ client
+
+Tests payload construction and the pooled, non-blocking transport against
+the local stand-in camera API.
+"""
+
+import asyncio
+import time
+import pytest
+import requests
+
+from src.ptz_auth import TokenManager
+from src.ptz_client import AsyncPTZClient, build_ptz_payload, coalesce_ptz_commands
+
+
+def login(api):
+    """Obtain a token from the stand-in API"""
+    payload = [{"cmd": "Login", "param": {"User": {"Version": "0", "userName": "admin", "password": "admin"}}}]
+    response = requests.post(f"{api.url}?cmd=Login", json=payload, timeout=5)
+    return response.json()[0]["value"]["Token"]["name"]
+
+
+class TestBuildPayload:
+    """Test suite for build_ptz_payload"""
+
+    def test_move_payload(self):
+        """Test directional moves carry a speed"""
+        assert build_ptz_payload("PtzCtrl", "Left") == [
+            {"cmd": "PtzCtrl", "param": {"channel": 0, "op": "Left", "speed": 32}}]
+
+    def test_preset_payload(self):
+        """Test ToPos carries the preset id"""
+        payload = build_ptz_payload("PtzCtrl", "ToPos", 3)
+        assert payload[0]["param"]["id"] == 3
+
+    def test_stop_payload(self):
+        """Test Stop has no speed"""
+        assert build_ptz_payload("PtzCtrl", "Stop") == [
+            {"cmd": "PtzCtrl", "param": {"channel": 0, "op": "Stop"}}]
+
+    @pytest.mark.parametrize("command,parameter", [("PtzCtrl", "Spin"), ("GetDevInfo", "Left")])
+    def test_invalid_commands(self, command, parameter):
+        """Test unsupported commands produce no payload"""
+        assert build_ptz_payload(command, parameter) is None
+
+
+def entries(*ops):
+    """Payload entries for PtzCtrl operations ("ToPos:3" for presets)"""
+    result = []
+    for op in ops:
+        op, _, preset = op.partition(':')
+        result.append(build_ptz_payload("PtzCtrl", op, int(preset or 0))[0])
+    return result
+
+
+class TestCoalesce:
+    """Test suite for coalesce_ptz_commands"""
+
+    def test_stop_between_pan_moves_dropped(self):
+        """Test a Stop is redundant when the next move reverses direction"""
+        assert coalesce_ptz_commands(entries("Left", "Stop", "Right")) == [True, False, True]
+
+    def test_stop_between_groups_kept(self):
+        """Test a Stop ending a zoom is kept before a pan"""
+        assert coalesce_ptz_commands(entries("ZoomInc", "Stop", "Left")) == [True, True, True]
+
+    def test_trailing_stop_kept(self):
+        """Test the final Stop always goes out"""
+        assert coalesce_ptz_commands(entries("Left", "Stop")) == [True, True]
+
+    def test_repeated_preset_deduped(self):
+        """Test a repeated ToPos to the same preset is dropped, a different one is not"""
+        assert coalesce_ptz_commands(entries("ToPos:2", "ToPos:2", "ToPos:3")) == [True, False, True]
+
+    def test_against_last_sent(self):
+        """Test coalescing continues from commands already sent"""
+        left = entries("Left")[0]
+        assert coalesce_ptz_commands(entries("Stop", "Right"), left, "Left") == [False, True]
+        assert coalesce_ptz_commands(entries("Left"), left, "Left") == [False]
+
+
+class TestAsyncPTZClient:
+    """Test suite for AsyncPTZClient"""
+
+    def test_send_sync(self, fake_camera_api):
+        """Test a blocking send reaches the camera"""
+        token = login(fake_camera_api)
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token)
+
+        assert client.send_sync("PtzCtrl", "Left") is True
+        assert fake_camera_api.commands[-1]['op'] == "Left"
+        client.close()
+
+    def test_rejected_token_reports_failure(self, fake_camera_api):
+        """Test an API error response counts as failure"""
+        client = AsyncPTZClient(fake_camera_api.url, lambda: "bogus")
+
+        assert client.send_sync("PtzCtrl", "Left") is False
+        assert client.get_stats()['failed'] == 1
+        client.close()
+
+    def test_send_does_not_block_event_loop(self, fake_camera_api):
+        """Test the loop keeps ticking while a slow camera responds"""
+        token = login(fake_camera_api)
+        fake_camera_api.latency = 0.2
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token)
+        ticks = []
+
+        async def ticker():
+            for _ in range(10):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        async def scenario():
+            return await asyncio.gather(client.send("PtzCtrl", "Right"), ticker())
+
+        result, _ = asyncio.run(scenario())
+        assert result is True
+        assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.1
+        client.close()
+
+    def test_commands_keep_order_and_connection(self, fake_camera_api):
+        """Test queued commands arrive in order over one keep-alive connection"""
+        token = login(fake_camera_api)
+        connections_before = fake_camera_api.connections
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token)
+        ops = ["Left", "Stop", "ZoomInc", "Stop", "Up", "Stop"]
+
+        async def scenario():
+            return await asyncio.gather(*(client.send("PtzCtrl", op) for op in ops))
+
+        assert all(asyncio.run(scenario()))
+        assert [c['op'] for c in fake_camera_api.commands] == ops
+        assert fake_camera_api.connections - connections_before == 1
+        client.close()
+
+    def test_concurrency_limit(self, fake_camera_api):
+        """Test that up to max_concurrency requests overlap"""
+        token = login(fake_camera_api)
+        fake_camera_api.latency = 0.1
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token, max_concurrency=3)
+
+        async def scenario():
+            return await asyncio.gather(*(client.send("PtzCtrl", "Left") for _ in range(3)))
+
+        start = time.monotonic()
+        assert all(asyncio.run(scenario()))
+        assert time.monotonic() - start < 0.25
+        client.close()
+
+    def test_queued_commands_batched(self, fake_camera_api):
+        """Test commands queued behind an in-flight request share one request"""
+        token = login(fake_camera_api)
+        fake_camera_api.latency = 0.05
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token)
+
+        async def scenario():
+            return await asyncio.gather(*(client.send("PtzCtrl", op) for op in ["Up", "Stop", "ZoomInc", "Stop"]))
+
+        requests_before = fake_camera_api.requests
+        assert all(asyncio.run(scenario()))
+        assert [c['op'] for c in fake_camera_api.commands] == ["Up", "Stop", "ZoomInc", "Stop"]
+        assert fake_camera_api.requests - requests_before == 2
+        assert fake_camera_api.commands[1]['batch'] == fake_camera_api.commands[3]['batch']
+        client.close()
+
+    def test_send_many_coalesces_stop(self, fake_camera_api):
+        """Test a Stop between two pan moves never reaches the camera"""
+        token = login(fake_camera_api)
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token)
+
+        async def scenario():
+            await client.send("PtzCtrl", "Left")
+            return await client.send_many([("PtzCtrl", "Stop", 0), ("PtzCtrl", "Right", 0)])
+
+        assert asyncio.run(scenario()) == [True, True]
+        assert [c['op'] for c in fake_camera_api.commands] == ["Left", "Right"]
+        assert client.get_stats()['coalesced'] == 1
+        client.close()
+
+    def test_max_batch_one_disables_batching(self, fake_camera_api):
+        """Test max_batch=1 sends one command per request"""
+        token = login(fake_camera_api)
+        client = AsyncPTZClient(fake_camera_api.url, lambda: token, max_batch=1)
+
+        async def scenario():
+            return await client.send_many([("PtzCtrl", "Up", 0), ("PtzCtrl", "Stop", 0)])
+
+        requests_before = fake_camera_api.requests
+        assert asyncio.run(scenario()) == [True, True]
+        assert fake_camera_api.requests - requests_before == 2
+        client.close()
+
+    def test_relogin_after_token_expiry(self, fake_camera_api):
+        """Test a rejected token triggers one re-login and a retry"""
+        manager = TokenManager(fake_camera_api.url, 'admin', 'admin')
+        client = AsyncPTZClient(fake_camera_api.url, manager.get_token, token_refresher=manager.renew)
+        assert client.send_sync("PtzCtrl", "Left") is True
+
+        fake_camera_api.expire_tokens()
+
+        assert client.send_sync("PtzCtrl", "Stop") is True
+        assert [c['op'] for c in fake_camera_api.commands] == ["Left", "Stop"]
+        assert fake_camera_api.logins == 2
+        assert client.get_stats()['relogins'] == 1
+        client.close()
@@ -0,0 +1,121 @@
+"""
+Unit tests for the PTZ move scheduler
+
+Tests per-camera routing of camera_move tasks and parallel execution
+across cameras.
+"""
+
+import asyncio
+import time
+import pytest
+
+from src.ptz_scheduler import PTZScheduler
+
+
+class RecordingCamera:
+    """Camera stand-in recording PTZ commands with timestamps"""
+
+    def __init__(self, camera_id, latency=0.0):
+        self.camera_id = camera_id
+        self.latency = latency
+        self.commands = []
+        self.batches = []
+
+    async def send_ptz_command_async(self, command, parameter, id=0):
+        await asyncio.sleep(self.latency)
+        self.commands.append((parameter, id, time.monotonic()))
+        return True
+
+    async def send_ptz_commands_async(self, commands):
+        self.batches.append([parameter for _, parameter, _ in commands])
+        return [await self.send_ptz_command_async(*command) for command in commands]
+
+
+def move(camera, op, duration=0.05, **extra):
+    return {'action': 'camera_move', 'camera': camera, 'type': op, 'duration': duration, **extra}
+
+
+class TestPTZScheduler:
+    """Test suite for PTZScheduler"""
+
+    def test_tasks_routed_by_camera_field(self):
+        """Test that the camera field selects the camera"""
+        cameras = [RecordingCamera(0), RecordingCamera(1)]
+        scheduler = PTZScheduler(cameras)
+        scheduler.enqueue(move(1, 'Left'))
+        scheduler.enqueue(move(0, 'ToPos', marker=3))
+
+        asyncio.run(scheduler.run())
+
+        assert [c[:2] for c in cameras[0].commands] == [('ToPos', 3), ('Stop', 0)]
+        assert [c[:2] for c in cameras[1].commands] == [('Left', 0), ('Stop', 0)]
+        assert len(scheduler) == 0
+
+    def test_camera_defaults_to_zero(self):
+        """Test that tasks without a camera field drive camera 0"""
+        cameras = [RecordingCamera(0)]
+        scheduler = PTZScheduler(cameras)
+        scheduler.enqueue({'action': 'camera_move', 'type': 'Up', 'duration': 0})
+
+        asyncio.run(scheduler.run())
+
+        assert [c[0] for c in cameras[0].commands] == ['Up', 'Stop']
+
+    def test_cameras_run_in_parallel(self):
+        """Test that moves on different cameras overlap in time"""
+        cameras = [RecordingCamera(i) for i in range(3)]
+        scheduler = PTZScheduler(cameras)
+        for index in range(3):
+            scheduler.enqueue(move(index, 'Left', 0.1))
+            scheduler.enqueue(move(index, 'Right', 0.1))
+
+        start = time.monotonic()
+        asyncio.run(scheduler.run())
+
+        assert time.monotonic() - start < 0.3
+        for camera in cameras:
+            assert [c[0] for c in camera.commands] == ['Left', 'Stop', 'Right', 'Stop']
+
+    def test_stop_sent_with_next_move(self):
+        """Test that the Stop ending a move is sent together with the next start"""
+        camera = RecordingCamera(0)
+        scheduler = PTZScheduler([camera])
+        scheduler.enqueue(move(0, 'Left', 0))
+        scheduler.enqueue(move(0, 'Right', 0))
+
+        asyncio.run(scheduler.run())
+
+        assert camera.batches == [['Stop', 'Right']]
+        assert [c[0] for c in camera.commands] == ['Left', 'Stop', 'Right', 'Stop']
+
+    def test_move_duration_compensates_latency(self):
+        """Test that command latency does not stretch the move"""
+        camera = RecordingCamera(0, latency=0.1)
+        scheduler = PTZScheduler([camera])
+        scheduler.enqueue(move(0, 'Left', 0.2))
+
+        asyncio.run(scheduler.run())
+
+        (_, _, started), (_, _, stopped) = camera.commands
+        assert stopped - started == pytest.approx(0.2, abs=0.03)
+        stats = scheduler.get_stats()[0]
+        assert stats['moves'] == 1
+        assert stats['last_achieved'] == pytest.approx(0.2, abs=0.03)
+        assert stats['rtt'] == pytest.approx(0.1, abs=0.03)
+
+    def test_unknown_camera_dropped(self):
+        """Test that moves for a missing camera are dropped"""
+        scheduler = PTZScheduler([RecordingCamera(0)])
+        scheduler.enqueue(move(5, 'Left'))
+
+        asyncio.run(scheduler.run())
+
+        assert len(scheduler) == 0
+
+    def test_pending_lists_all_queues(self):
+        """Test that pending returns every queued task"""
+        scheduler = PTZScheduler([RecordingCamera(0), RecordingCamera(1)])
+        scheduler.enqueue(move(0, 'Left'))
+        scheduler.enqueue(move(1, 'Right'))
+
+        assert {task['type'] for task in scheduler.pending()} == {'Left', 'Right'}
@@ -0,0 +1,211 @@
+"""
+Unit tests for the shared-memory frame ring and the process capture backend
+
+Tests seqlock-validated zero-copy reads, held slots, decoding in place,
+cross-process mapping and a mock camera captured in its own process.
+"""
+
+import subprocess
+import sys
+import time
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from src.shared_frame_ring import SharedFrameRing
+from src.process_camera import ProcessCamera, _RingFrameBuffer
+
+
+def frame_of(value, shape=(24, 32, 3)):
+    return np.full(shape, value, dtype=np.uint8)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing.create((24, 32, 3), slots=3)
+    yield ring
+    ring.close()
+
+
+class TestSharedFrameRing:
+    """Test suite for SharedFrameRing"""
+
+    def test_empty_ring(self, ring):
+        """Test nothing is read before the first write"""
+        assert ring.sequence == 0
+        assert ring.latest() == (None, 0, 0.0)
+        assert ring.read() == (None, 0, 0.0)
+
+    def test_latest_is_zero_copy_view(self, ring):
+        """Test latest() maps the slot instead of copying it"""
+        ring.write(frame_of(7), timestamp=12.5)
+        frame, sequence, timestamp = ring.latest()
+        assert (sequence, timestamp) == (1, 12.5)
+        assert np.all(frame == 7)
+        assert not frame.flags.writeable
+        assert np.shares_memory(frame, ring._frames)
+
+    def test_held_view_survives_writes(self, ring):
+        """Test the writer skips the slot the reader holds until its next latest()"""
+        ring.write(frame_of(1))
+        view, _, _ = ring.latest()
+        for value in range(2, 10):
+            ring.write(frame_of(value))
+        assert np.all(view == 1)
+        newest, sequence, _ = ring.latest()
+        assert sequence == 9 and np.all(newest == 9)
+        ring.write(frame_of(10))
+        ring.write(frame_of(11))
+        assert not np.all(view == 1)
+        assert np.all(newest == 9)
+
+    def test_writable_fills_slot_in_place(self, ring):
+        """Test a frame decoded into writable() is published without a copy"""
+        slot = ring.writable()
+        assert ring.writable() is slot
+        slot[:] = 6
+        assert ring.latest()[0] is None
+        assert ring.publish(4.0) == 1
+        frame, sequence, timestamp = ring.latest()
+        assert (sequence, timestamp) == (1, 4.0)
+        assert np.shares_memory(frame, slot) and np.all(frame == 6)
+
+    def test_too_few_slots(self):
+        """Test a ring too small to keep a held slot apart is refused"""
+        with pytest.raises(ValueError):
+            SharedFrameRing.create((24, 32, 3), slots=2)
+
+    def test_torn_slot_is_rejected(self, ring):
+        """Test a slot whose seqlock is odd (mid-write) is not returned"""
+        ring.write(frame_of(1))
+        ring._locks[0] += 1
+        assert ring.latest()[0] is None
+        assert ring.read()[0] is None
+        ring._locks[0] += 1
+        assert ring.latest()[1] == 1
+
+    def test_read_copies(self, ring):
+        """Test read() returns a copy into a preallocated array"""
+        ring.write(frame_of(5))
+        out = np.empty((24, 32, 3), np.uint8)
+        frame, sequence, _ = ring.read(out)
+        assert frame is out and sequence == 1
+        assert not np.shares_memory(frame, ring._frames)
+
+    def test_shape_mismatch(self, ring):
+        """Test frames of another size are refused"""
+        with pytest.raises(ValueError):
+            ring.write(frame_of(1, (10, 10, 3)))
+
+    def test_attach_from_other_process(self, ring):
+        """Test frames written by another process are mapped by name"""
+        script = ("import sys, numpy as np; sys.path.insert(0, 'src'); "
+                  "from shared_frame_ring import SharedFrameRing; "
+                  f"ring = SharedFrameRing.attach('{ring.name}'); "
+                  "ring.write(np.full(ring.shape, 9, np.uint8), 3.0); ring.close()")
+        subprocess.run([sys.executable, '-c', script], check=True)
+        frame, sequence, timestamp = ring.latest()
+        assert (sequence, timestamp) == (1, 3.0)
+        assert np.all(frame == 9)
+
+    def test_attach_rejects_foreign_block(self):
+        """Test a block that is not a ring is refused"""
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(create=True, size=4096)
+        try:
+            with pytest.raises(ValueError):
+                SharedFrameRing(shm, owner=False)
+        finally:
+            shm.close()
+            shm.unlink()
+
+
+class TestRingFrameBuffer:
+    """Test suite for the capture process's ring-backed frame buffer"""
+
+    @pytest.fixture
+    def frames(self):
+        rings = []
+        frames = _RingFrameBuffer(3, rings.append)
+        frames.rings = rings
+        yield frames
+        frames.close()
+
+    def test_decodes_into_ring(self, frames):
+        """Test a plugin filling writable() writes straight into shared memory"""
+        frames.preallocate((24, 32, 3))
+        buffer = frames.writable()
+        assert np.shares_memory(buffer, frames.ring._frames)
+        buffer[:] = 3
+        assert frames.publish(buffer, 2.0) == 1
+        assert frames.get_stats()['reused'] == 1
+        frame, sequence, timestamp = frames.rings[0].latest()
+        assert (sequence, timestamp) == (1, 2.0) and np.all(frame == 3)
+
+    def test_foreign_frame_resizes_ring(self, frames):
+        """Test a frame the plugin allocated itself is copied into a ring of its shape"""
+        assert frames.writable() is None
+        frames.publish(frame_of(5))
+        frames.publish(frame_of(8, (12, 16, 3)))
+        assert [ring.shape for ring in frames.rings] == [(24, 32, 3), (12, 16, 3)]
+        assert frames.sequence == 2 and frames.get_stats()['reused'] == 0
+        assert np.all(frames.ring.latest()[0] == 8)
+
+    def test_wait_for_frame(self, frames):
+        """Test the capture loop is woken by a publish"""
+        assert not frames.wait_for_frame(0, 0.01)
+        frames.publish(frame_of(1))
+        assert frames.wait_for_frame(0, 0.01)
+        assert frames.latest()[1] == 1
+
+
+class TestProcessCamera:
+    """Test suite for cameras captured in a separate process"""
+
+    def test_mock_camera_in_process(self, mock_camera_config):
+        """Test frames and PTZ commands cross the process boundary"""
+        config = dict(mock_camera_config, width=64, height=48, capture_backend='process')
+        camera = ProcessCamera('mock', 0, config)
+        try:
+            camera.capture_frames()
+            deadline = time.time() + 20
+            while camera.frame_sequence < 3 and time.time() < deadline:
+                time.sleep(0.05)
+            assert camera.frame_sequence >= 3
+            frame = camera.get_frame()
+            assert frame.shape == (48, 64, 3)
+            assert camera.frame_timestamp > 0
+            assert camera.send_ptz_command("PtzCtrl", "Left") is True
+            assert camera.get_camera_info()['ring']['shape'] == (48, 64, 3)
+        finally:
+            camera.stop()
+        assert camera._process.returncode == 0
+        assert not camera.is_connected()
+
+    def test_unknown_camera_type(self):
+        """Test a plugin that fails to start leaves a disconnected camera"""
+        camera = ProcessCamera('no_such_camera', 1, {})
+        try:
+            camera._process.wait(timeout=20)
+            camera._reader.join(timeout=5)
+            assert not camera.is_connected()
+            assert camera.get_frame() is None
+        finally:
+            camera.stop()
+
+    def test_stop_before_child_connects(self):
+        """Test stop() ends the reader thread when the child never connected"""
+        popen = subprocess.Popen
+
+        def silent_child(args, **kwargs):
+            return popen([sys.executable, '-c', 'import sys; sys.stdin.read()'], **kwargs)
+
+        with patch('subprocess.Popen', silent_child):
+            camera = ProcessCamera('mock', 2, {})
+        camera._process.wait(timeout=20)
+        start = time.time()
+        camera.stop()
+
+        assert not camera._reader.is_alive()
+        assert time.time() - start < 2
+        assert not camera.is_connected()